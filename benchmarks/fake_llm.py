@@ -0,0 +1,90 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+FAKE_SUMMARY = """# Acta de Reunion - {fecha}
+
+## Participantes
+- No identificados explicitamente
+
+## Resumen General
+Resumen sintetico generado por el servidor LLM de prueba.
+"""
+
+
+class FakeLLMServer:
+    """Servidor local que imita `/api/generate` de Ollama.
+
+    La latencia simulada es fija por llamada mas un costo por cada 1000
+    caracteres de prompt, para que el benchmark refleje el tamanio del
+    prompt que envia el Summarizer sin depender de un modelo real.
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0,
+                 base_latency: float = 0.05, latency_per_kchar: float = 0.002):
+        self.base_latency = base_latency
+        self.latency_per_kchar = latency_per_kchar
+        self.calls = 0
+        self.prompt_chars = 0
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._handler_class())
+        self._thread: threading.Thread | None = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def _handler_class(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                body = json.loads(self.rfile.read(length) or b"{}")
+                prompt = (body.get("system") or "") + (body.get("prompt") or "")
+                with fake._lock:
+                    fake.calls += 1
+                    fake.prompt_chars += len(prompt)
+                time.sleep(fake.base_latency + fake.latency_per_kchar * len(prompt) / 1000)
+
+                final = {
+                    "model": body.get("model"),
+                    "response": FAKE_SUMMARY.format(fecha="2025-01-01"),
+                    "done": True,
+                    "prompt_eval_count": len(prompt) // 4,
+                }
+                if body.get("stream"):
+                    # NDJSON like Ollama: the text arrives line by line, then the stats
+                    lines = [{"response": line + "\n", "done": False}
+                             for line in final.pop("response").splitlines()]
+                    final["response"] = ""
+                    payload = "".join(json.dumps(c) + "\n" for c in lines + [final]).encode()
+                else:
+                    payload = json.dumps(final).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+    def start(self) -> "FakeLLMServer":
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self) -> "FakeLLMServer":
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
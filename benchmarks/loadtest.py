@@ -0,0 +1,347 @@
+"""Prueba de carga de la API FastAPI con backends simulados.
+
+Levanta `create_app` en un uvicorn local con recorder/transcriber/summarizer
+falsos (o Whisper `tiny` real con --real-whisper) y lanza usuarios
+concurrentes que importan, procesan, consultan y eliminan grabaciones.
+
+Uso:
+    python -m benchmarks.loadtest --users 20 --duration 60
+    python -m benchmarks.loadtest --users 5 --real-whisper
+"""
+import argparse
+import asyncio
+import io
+import json
+import shutil
+import socket
+import sys
+import threading
+import time
+from collections import defaultdict
+from pathlib import Path
+
+import requests
+
+import config
+from benchmarks import synth
+from benchmarks.metrics import percentile
+
+LOOP_PROBE_INTERVAL = 0.01
+# Lag above this counts as time the event loop was blocked
+LOOP_BLOCK_THRESHOLD = 0.02
+FINAL_STATUSES = ("completed", "error")
+USER_THREAD_PREFIX = "loadtest-user"
+
+
+# -- Stub backends --
+
+class StubRecorder:
+    def is_recording(self) -> bool:
+        return False
+
+    @property
+    def current_recording_id(self) -> str | None:
+        return None
+
+    def capture_health(self) -> dict | None:
+        return None
+
+    def is_armed(self) -> bool:
+        return False
+
+    def list_devices(self) -> list[dict]:
+        return []
+
+    def device_topology(self) -> dict | None:
+        return None
+
+    def terminate(self):
+        pass
+
+
+class StubTranscriber:
+    """Simula Whisper: tarda rtf * duracion del audio y escribe txt/json."""
+
+    def __init__(self, audio_secs: int, realtime_factor: float = 0.05):
+        self.audio_secs = audio_secs
+        self.realtime_factor = realtime_factor
+        self.is_loaded = True
+
+    def transcribe(self, audio_path: str, output_dir: str) -> dict:
+        time.sleep(self.audio_secs * self.realtime_factor)
+
+        output_dir = Path(output_dir)
+        output_dir.mkdir(parents=True, exist_ok=True)
+        stem = Path(audio_path).stem
+        txt_path = output_dir / f"{stem}.txt"
+        json_path = output_dir / f"{stem}.json"
+        text = synth.transcript_text(self.audio_secs * synth.TRANSCRIPT_CHARS_PER_SEC)
+        txt_path.write_text(text, encoding="utf-8")
+        json_path.write_text(
+            json.dumps({"language": "es", "duration": self.audio_secs, "segments": []}),
+            encoding="utf-8",
+        )
+        return {
+            "txt_path": str(txt_path),
+            "json_path": str(json_path),
+            "language": "es",
+            "duration_secs": self.audio_secs,
+        }
+
+
+class StubSummarizer:
+    def __init__(self, latency: float = 0.5):
+        self.latency = latency
+
+    def stats(self) -> dict:
+        return {}
+
+    def summarize(self, transcript_path: str, output_dir: str, recording_date: str,
+                  speech_map: dict | None = None) -> str:
+        time.sleep(self.latency)
+        output_dir = Path(output_dir)
+        output_dir.mkdir(parents=True, exist_ok=True)
+        out = output_dir / f"{Path(transcript_path).stem}.md"
+        out.write_text(f"# Acta de Reunion - {recording_date}\n", encoding="utf-8")
+        return str(out)
+
+
+# -- Server side probes --
+
+class LoopMonitor:
+    """Mide cuanto se atrasa el event loop de uvicorn y cuantos hilos del servidor hay vivos."""
+
+    def __init__(self):
+        self.lags: list[float] = []
+        self.blocked_secs = 0.0
+        self.max_threads = 0
+        self._task: asyncio.Task | None = None
+
+    async def _probe(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            start = loop.time()
+            await asyncio.sleep(LOOP_PROBE_INTERVAL)
+            lag = loop.time() - start - LOOP_PROBE_INTERVAL
+            self.lags.append(lag)
+            if lag > LOOP_BLOCK_THRESHOLD:
+                self.blocked_secs += lag
+            server_threads = sum(
+                1 for t in threading.enumerate() if not t.name.startswith(USER_THREAD_PREFIX)
+            )
+            self.max_threads = max(self.max_threads, server_threads)
+
+    async def start(self):
+        self._task = asyncio.create_task(self._probe())
+
+    def report(self) -> dict:
+        return {
+            "lag_p50_ms": round(percentile(self.lags, 50) * 1000, 1),
+            "lag_p99_ms": round(percentile(self.lags, 99) * 1000, 1),
+            "lag_max_ms": round(max(self.lags, default=0) * 1000, 1),
+            "blocked_secs": round(self.blocked_secs, 2),
+            "max_threads": self.max_threads,
+        }
+
+
+def _free_port() -> int:
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+        s.bind((config.HOST, 0))
+        return s.getsockname()[1]
+
+
+def _use_workdir(workdir: Path):
+    # Paths are stored relative to BASE_DIR, so the workdir must live under it
+    config.DATA_DIR = workdir
+    config.RECORDINGS_DIR = workdir / "recordings"
+    config.TRANSCRIPTS_DIR = workdir / "transcripts"
+    config.SUMMARIES_DIR = workdir / "summaries"
+    config.DB_PATH = workdir / "callscribe.db"
+    for d in [config.RECORDINGS_DIR, config.TRANSCRIPTS_DIR, config.SUMMARIES_DIR]:
+        d.mkdir(parents=True, exist_ok=True)
+
+
+def start_server(args, monitor: LoopMonitor):
+    import uvicorn
+
+    from db.database import Database
+    from processing import events
+    from server.app import create_app
+
+    if args.real_whisper:
+        from processing.transcriber import Transcriber
+        transcriber = Transcriber(model_size="tiny", language=config.WHISPER_LANGUAGE)
+    else:
+        transcriber = StubTranscriber(args.audio_secs, args.transcribe_rtf)
+
+    db = Database(config.DB_PATH, on_change=events.publish)
+    app = create_app(db, StubRecorder(), transcriber, StubSummarizer(args.summarize_latency))
+    app.router.on_startup.append(monitor.start)
+
+    port = _free_port()
+    server = uvicorn.Server(uvicorn.Config(app, host=config.HOST, port=port, log_level="warning"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        if not thread.is_alive():
+            raise RuntimeError("El servidor no pudo iniciar")
+        time.sleep(0.05)
+    return server, thread, f"http://{config.HOST}:{port}/api"
+
+
+# -- Client side --
+
+class Stats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latencies: dict[str, list[float]] = defaultdict(list)
+        self.errors: dict[str, int] = defaultdict(int)
+        self.rejected: dict[str, int] = defaultdict(int)
+
+    def record(self, endpoint: str, latency: float, status: int | None):
+        with self._lock:
+            self.latencies[endpoint].append(latency)
+            if status is None or status >= 500:
+                self.errors[endpoint] += 1
+            elif status >= 400:
+                self.rejected[endpoint] += 1
+
+    def report(self, elapsed: float) -> dict:
+        result = {}
+        for endpoint, values in sorted(self.latencies.items()):
+            result[endpoint] = {
+                "count": len(values),
+                "rps": round(len(values) / elapsed, 2),
+                "p50_ms": round(percentile(values, 50) * 1000, 1),
+                "p90_ms": round(percentile(values, 90) * 1000, 1),
+                "p99_ms": round(percentile(values, 99) * 1000, 1),
+                "max_ms": round(max(values) * 1000, 1),
+                "errors": self.errors[endpoint],
+                "rejected_4xx": self.rejected[endpoint],
+                "error_rate": round(self.errors[endpoint] / len(values), 4),
+            }
+        return result
+
+
+class VirtualUser:
+    def __init__(self, base: str, stats: Stats, upload: bytes, poll_interval: float,
+                 max_polls: int):
+        self.base = base
+        self.stats = stats
+        self.upload = upload
+        self.poll_interval = poll_interval
+        self.max_polls = max_polls
+        self.session = requests.Session()
+
+    def _call(self, endpoint: str, method: str, path: str, **kwargs) -> requests.Response | None:
+        start = time.perf_counter()
+        try:
+            resp = self.session.request(method, f"{self.base}{path}", timeout=120, **kwargs)
+        except requests.RequestException:
+            self.stats.record(endpoint, time.perf_counter() - start, None)
+            return None
+        self.stats.record(endpoint, time.perf_counter() - start, resp.status_code)
+        return resp
+
+    def iteration(self):
+        resp = self._call(
+            "POST /recordings/import", "POST", "/recordings/import",
+            files={"file": ("loadtest.wav", io.BytesIO(self.upload), "audio/wav")},
+        )
+        if resp is None or not resp.ok:
+            return
+        recording_id = resp.json()["id"]
+
+        self._call("POST /recordings/{id}/process", "POST", f"/recordings/{recording_id}/process")
+
+        for i in range(self.max_polls):
+            time.sleep(self.poll_interval)
+            detail = self._call("GET /recordings/{id}", "GET", f"/recordings/{recording_id}")
+            if i % 3 == 0:
+                self._call("GET /recordings", "GET", "/recordings")
+            if detail is not None and detail.ok and detail.json()["status"] in FINAL_STATUSES:
+                break
+
+        self._call("DELETE /recordings/{id}", "DELETE", f"/recordings/{recording_id}")
+
+    def run(self, deadline: float):
+        while time.monotonic() < deadline:
+            self.iteration()
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Prueba de carga de la API de CallScribe")
+    parser.add_argument("--users", type=int, default=10, help="Usuarios concurrentes")
+    parser.add_argument("--duration", type=float, default=30, help="Segundos de carga")
+    parser.add_argument("--audio-secs", type=int, default=30, help="Duracion del audio importado")
+    parser.add_argument("--poll-interval", type=float, default=0.5)
+    parser.add_argument("--max-polls", type=int, default=120)
+    parser.add_argument("--transcribe-rtf", type=float, default=0.05,
+                        help="Segundos de transcripcion simulada por segundo de audio")
+    parser.add_argument("--summarize-latency", type=float, default=0.5)
+    parser.add_argument("--real-whisper", action="store_true", help="Usa Whisper tiny real")
+    parser.add_argument("--output", type=Path, help="Escribe el reporte en este JSON")
+    parser.add_argument("--keep", action="store_true", help="No borra el directorio de trabajo")
+    args = parser.parse_args(argv)
+
+    workdir = config.BASE_DIR / "data" / f"loadtest-{int(time.time())}"
+    _use_workdir(workdir)
+
+    wav_path = synth.write_wav(workdir / "upload.wav", args.audio_secs, channels=2)
+    upload = wav_path.read_bytes()
+
+    monitor = LoopMonitor()
+    server, thread, base = start_server(args, monitor)
+    print(f"Servidor en {base}, {args.users} usuarios durante {args.duration:.0f}s...")
+
+    stats = Stats()
+    deadline = time.monotonic() + args.duration
+    start = time.perf_counter()
+    users = [
+        threading.Thread(
+            target=VirtualUser(base, stats, upload, args.poll_interval, args.max_polls).run,
+            args=(deadline,),
+            name=f"{USER_THREAD_PREFIX}-{i}",
+        )
+        for i in range(args.users)
+    ]
+    for u in users:
+        u.start()
+    for u in users:
+        u.join()
+    elapsed = time.perf_counter() - start
+
+    server.should_exit = True
+    thread.join(timeout=10)
+
+    report = {
+        "users": args.users,
+        "elapsed_secs": round(elapsed, 1),
+        "real_whisper": args.real_whisper,
+        "endpoints": stats.report(elapsed),
+        "event_loop": monitor.report(),
+    }
+
+    print(f"\n{'endpoint':<32}{'n':>6}{'p50':>9}{'p90':>9}{'p99':>9}{'max':>9}{'err':>6}{'4xx':>6}")
+    for endpoint, r in report["endpoints"].items():
+        print(
+            f"{endpoint:<32}{r['count']:>6}{r['p50_ms']:>9}{r['p90_ms']:>9}"
+            f"{r['p99_ms']:>9}{r['max_ms']:>9}{r['errors']:>6}{r['rejected_4xx']:>6}"
+        )
+    loop = report["event_loop"]
+    print(
+        f"\nEvent loop: lag p50 {loop['lag_p50_ms']} ms, p99 {loop['lag_p99_ms']} ms, "
+        f"max {loop['lag_max_ms']} ms, bloqueado {loop['blocked_secs']} s; "
+        f"hilos maximos {loop['max_threads']}"
+    )
+
+    if args.output:
+        args.output.write_text(json.dumps(report, indent=2), encoding="utf-8")
+    if not args.keep:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    return 1 if any(r["errors"] for r in report["endpoints"].values()) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,365 @@
+"""Benchmarks de los caminos criticos de audio, transcripcion y resumen.
+
+Uso:
+    python -m benchmarks.run                       # casos y duraciones por defecto
+    python -m benchmarks.run --cases mix_to_stereo,capture_downmix --durations 1m,4h
+    python -m benchmarks.run --save                # guarda el resultado como baseline
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import sys
+import tempfile
+import time
+import traceback
+from datetime import datetime, timezone
+from pathlib import Path
+from queue import Empty
+
+from benchmarks import synth
+from benchmarks.metrics import peak_rss_mb
+
+DEFAULT_BASELINE = Path(__file__).parent / "baseline.json"
+DEFAULT_WORKDIR = Path(tempfile.gettempdir()) / "callscribe-bench"
+
+# Relative slowdown tolerated before a result is flagged as a regression
+DEFAULT_TOLERANCE = 0.20
+# Absolute floors so that noise on tiny measurements is not flagged
+MIN_WALL_DELTA_SECS = 0.05
+MIN_RSS_DELTA_MB = 10.0
+
+
+def parse_duration(text: str) -> int:
+    text = text.strip().lower()
+    units = {"s": 1, "m": 60, "h": 3600}
+    if text[-1] in units:
+        return int(float(text[:-1]) * units[text[-1]])
+    return int(text)
+
+
+def format_duration(secs: int) -> str:
+    if secs % 3600 == 0:
+        return f"{secs // 3600}h"
+    if secs % 60 == 0:
+        return f"{secs // 60}m"
+    return f"{secs}s"
+
+
+# -- Inputs (generated once and cached in the workdir) --
+
+def _input_wav(workdir: Path, duration: int, channels: int, seed: int = 0) -> Path:
+    path = workdir / f"speech_{format_duration(duration)}_{channels}ch_s{seed}.wav"
+    if not path.exists():
+        tmp = path.with_suffix(".partial")
+        synth.write_wav(tmp, duration, channels, seed=seed)
+        tmp.replace(path)
+    return path
+
+
+def _input_transcript(workdir: Path, duration: int) -> Path:
+    path = workdir / f"transcript_{format_duration(duration)}.txt"
+    if not path.exists():
+        path.write_text(synth.transcript_text(duration * synth.TRANSCRIPT_CHARS_PER_SEC), encoding="utf-8")
+    return path
+
+
+# -- Cases: each prepares its inputs and returns run(), which returns extra metrics --
+
+def case_mix_to_stereo(workdir: Path, duration: int):
+    from recorder.mixer import mix_to_stereo
+
+    loopback = _input_wav(workdir, duration, 1, seed=0)
+    mic = _input_wav(workdir, duration, 1, seed=1)
+    out = workdir / "out_stereo.wav"
+
+    def run():
+        mix_to_stereo(loopback, mic, out)
+        return {"output_mb": round(out.stat().st_size / 1e6, 1)}
+
+    return run
+
+
+def case_mix_sources(workdir: Path, duration: int):
+    from recorder.mixer import MixInput, mix_sources
+
+    # Two remote and two local sources, one of them delayed 120 ms
+    inputs = [MixInput(_input_wav(workdir, duration, 1, seed=i), "LR"[i % 2], 0.8, 1920 * (i == 3))
+              for i in range(4)]
+    out = workdir / "out_stereo.wav"
+
+    def run():
+        frames = mix_sources(inputs, out)
+        return {"sources": len(inputs), "frames": frames}
+
+    return run
+
+
+def case_capture_downmix(workdir: Path, duration: int):
+    from recorder.mixer import downmix_resample
+
+    def run():
+        chunks = 0
+        for chunk in synth.capture_chunks(duration, channels=2, rate=48000):
+            downmix_resample(chunk, 2, 48000, 16000)
+            chunks += 1
+        return {"chunks": chunks}
+
+    return run
+
+
+def case_wav_to_mp3(workdir: Path, duration: int):
+    from recorder.mixer import wav_to_mp3
+
+    wav = _input_wav(workdir, duration, 2)
+    out = workdir / "out_wav_to_mp3.mp3"
+
+    def run():
+        wav_to_mp3(wav, out)
+        return {"output_mb": round(out.stat().st_size / 1e6, 1)}
+
+    return run
+
+
+def case_convert_to_mp3(workdir: Path, duration: int):
+    from recorder.mixer import convert_to_mp3
+
+    wav = _input_wav(workdir, duration, 2)
+    out = workdir / "out_convert.mp3"
+
+    def run():
+        convert_to_mp3(wav, out)
+        return {"output_mb": round(out.stat().st_size / 1e6, 1)}
+
+    return run
+
+
+def case_stream_decode(workdir: Path, duration: int):
+    """Lectura por ventanas solapadas que usa la transcripcion de grabaciones largas."""
+    import numpy as np
+
+    import config
+    from processing.audio_stream import PcmStream
+
+    wav = _input_wav(workdir, duration, 2)
+
+    def run():
+        windows = 0
+        with PcmStream(wav, config.SAMPLE_RATE) as stream:
+            for _, audio, _ in stream.windows(config.DECODE_WINDOW_SECS, config.DECODE_OVERLAP_SECS):
+                float(np.sqrt(np.mean(audio * audio)))
+                windows += 1
+        return {"windows": windows, "window_secs": config.DECODE_WINDOW_SECS}
+
+    return run
+
+
+def case_transcribe_tiny(workdir: Path, duration: int, profile: str = "accurate"):
+    from processing.transcriber import Transcriber
+
+    wav = _input_wav(workdir, duration, 2)
+    out_dir = workdir / "transcripts"
+    transcriber = Transcriber(model_size="tiny", language="es")
+    load_start = time.perf_counter()
+    transcriber._load_model()
+    load_secs = time.perf_counter() - load_start
+
+    def run():
+        result = transcriber.transcribe(str(wav), str(out_dir), profile=profile)
+        segments = json.loads(Path(result["json_path"]).read_text(encoding="utf-8"))["segments"]
+        return {"model_load_secs": round(load_secs, 2), "segments": len(segments),
+                "rtf": result["decoding"]["rtf"]}
+
+    return run
+
+
+def case_transcribe_tiny_fast(workdir: Path, duration: int):
+    return case_transcribe_tiny(workdir, duration, profile="fast")
+
+
+GROUP_SIZE = 6
+
+
+def case_transcribe_tiny_group(workdir: Path, duration: int):
+    """GROUP_SIZE grabaciones cortas: una por una vs. en un solo lote."""
+    from processing.transcriber import Transcriber
+
+    wavs = [_input_wav(workdir, duration, 2, seed=i) for i in range(GROUP_SIZE)]
+    out_dir = workdir / "transcripts"
+    transcriber = Transcriber(model_size="tiny", language="es")
+    transcriber._load_model()
+
+    def run():
+        start = time.perf_counter()
+        for wav in wavs:
+            transcriber.transcribe(str(wav), str(out_dir), profile="fast")
+        sequential = time.perf_counter() - start
+
+        start = time.perf_counter()
+        transcriber.transcribe_many([(wav, None) for wav in wavs], str(out_dir), profile="fast")
+        grouped = time.perf_counter() - start
+        return {"sequential_secs": round(sequential, 2), "grouped_secs": round(grouped, 2),
+                "speedup": round(sequential / grouped, 2)}
+
+    return run
+
+
+def case_summarize(workdir: Path, duration: int):
+    from benchmarks.fake_llm import FakeLLMServer
+    from processing.summarizer import Summarizer
+
+    transcript = _input_transcript(workdir, duration)
+    out_dir = workdir / "summaries"
+    server = FakeLLMServer().start()
+    summarizer = Summarizer(provider="ollama", ollama_url=server.url, ollama_model="fake")
+
+    def run():
+        try:
+            summarizer.summarize(str(transcript), str(out_dir), "2025-01-01")
+        finally:
+            server.stop()
+        return {"llm_calls": server.calls, "prompt_chars": server.prompt_chars}
+
+    return run
+
+
+CASES = {
+    "mix_to_stereo": (case_mix_to_stereo, ["1m", "10m", "1h"]),
+    "mix_sources": (case_mix_sources, ["1m", "10m", "1h"]),
+    "capture_downmix": (case_capture_downmix, ["1m", "10m"]),
+    "wav_to_mp3": (case_wav_to_mp3, ["1m", "10m", "1h"]),
+    "convert_to_mp3": (case_convert_to_mp3, ["1m", "10m", "1h", "8h"]),
+    "stream_decode": (case_stream_decode, ["1h", "8h"]),
+    "transcribe_tiny": (case_transcribe_tiny, ["1m"]),
+    "transcribe_tiny_fast": (case_transcribe_tiny_fast, ["1m"]),
+    "transcribe_tiny_group": (case_transcribe_tiny_group, ["1m"]),
+    "summarize": (case_summarize, ["10m", "1h", "4h"]),
+}
+
+
+def _run_case_in_child(name: str, workdir: str, duration: int, queue):
+    # Runs in a fresh process so peak RSS belongs to this case only
+    try:
+        factory = CASES[name][0]
+        run = factory(Path(workdir), duration)
+        rss_before = peak_rss_mb()
+        start = time.perf_counter()
+        extra = run() or {}
+        wall = time.perf_counter() - start
+        queue.put({
+            "wall_secs": round(wall, 3),
+            "audio_secs": duration,
+            "realtime_factor": round(duration / wall, 1) if wall > 0 else None,
+            "peak_rss_mb": round(peak_rss_mb(), 1),
+            "setup_rss_mb": round(rss_before, 1),
+            **extra,
+        })
+    except Exception as e:
+        queue.put({"error": f"{type(e).__name__}: {e}", "traceback": traceback.format_exc()})
+
+
+def run_case(name: str, workdir: Path, duration: int) -> dict:
+    ctx = multiprocessing.get_context("spawn")
+    queue = ctx.Queue()
+    proc = ctx.Process(target=_run_case_in_child, args=(name, str(workdir), duration, queue))
+    proc.start()
+    while True:
+        try:
+            result = queue.get(timeout=1)
+            break
+        except Empty:
+            if not proc.is_alive():
+                result = {"error": f"El proceso termino con codigo {proc.exitcode}"}
+                break
+    proc.join()
+    return result
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list[str]:
+    regressions = []
+    for key, current in results.items():
+        base = baseline.get("results", {}).get(key)
+        if not base or "error" in current or "error" in base:
+            continue
+        for metric, floor in (("wall_secs", MIN_WALL_DELTA_SECS), ("peak_rss_mb", MIN_RSS_DELTA_MB)):
+            old, new = base.get(metric), current.get(metric)
+            if old is None or new is None:
+                continue
+            if new > old * (1 + tolerance) and new - old > floor:
+                regressions.append(
+                    f"{key}: {metric} {old} -> {new} (+{(new / old - 1) * 100:.0f}%)"
+                )
+    return regressions
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmarks de CallScribe")
+    parser.add_argument("--cases", help=f"Lista separada por comas: {', '.join(CASES)}")
+    parser.add_argument("--durations", help="Duraciones separadas por comas (ej. 1m,1h,4h)")
+    parser.add_argument("--workdir", type=Path, default=DEFAULT_WORKDIR)
+    parser.add_argument("--baseline", type=Path, default=DEFAULT_BASELINE)
+    parser.add_argument("--output", type=Path, help="Escribe los resultados en este JSON")
+    parser.add_argument("--save", action="store_true", help="Guarda los resultados como baseline")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE)
+    args = parser.parse_args(argv)
+
+    names = args.cases.split(",") if args.cases else list(CASES)
+    unknown = [n for n in names if n not in CASES]
+    if unknown:
+        parser.error(f"Casos desconocidos: {', '.join(unknown)}")
+
+    args.workdir.mkdir(parents=True, exist_ok=True)
+    results = {}
+    for name in names:
+        durations = args.durations.split(",") if args.durations else CASES[name][1]
+        for d in durations:
+            duration = parse_duration(d)
+            key = f"{name}@{format_duration(duration)}"
+            print(f"{key:<28}", end=" ", flush=True)
+            result = run_case(name, args.workdir, duration)
+            results[key] = result
+            if "error" in result:
+                print(f"ERROR {result['error']}")
+            else:
+                print(
+                    f"{result['wall_secs']:>9.3f}s  x{result['realtime_factor'] or 0:<8} "
+                    f"{result['peak_rss_mb']:>8.1f} MB"
+                )
+
+    report = {
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "machine": {
+            "platform": platform.platform(),
+            "python": platform.python_version(),
+            "cpu_count": os.cpu_count(),
+        },
+        "results": results,
+    }
+
+    if args.output:
+        args.output.write_text(json.dumps(report, indent=2), encoding="utf-8")
+
+    regressions = []
+    if args.baseline.exists():
+        baseline = json.loads(args.baseline.read_text(encoding="utf-8"))
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions:
+            print("\nRegresiones respecto al baseline:")
+            for r in regressions:
+                print(f"  - {r}")
+        else:
+            print("\nSin regresiones respecto al baseline.")
+
+    if args.save:
+        if args.baseline.exists():
+            previous = json.loads(args.baseline.read_text(encoding="utf-8"))
+            report["results"] = {**previous.get("results", {}), **results}
+        args.baseline.write_text(json.dumps(report, indent=2), encoding="utf-8")
+        print(f"Baseline guardado en {args.baseline}")
+
+    return 1 if regressions and not args.save else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,124 @@
+import math
+import random
+import struct
+import wave
+from pathlib import Path
+
+import config
+
+BLOCK_SECS = 1
+POOL_SIZE = 8
+# Speech runs at roughly 15 characters per second once transcribed
+TRANSCRIPT_CHARS_PER_SEC = 15
+
+
+def _speech_block(rng: random.Random, rate: int, amplitude: float) -> bytes:
+    """Un segundo de ruido con forma de habla: ruido filtrado paso-bajo
+    modulado por una envolvente silabica (~4 Hz) con pequenas pausas.
+    """
+    samples = []
+    prev = 0.0
+    syllable_hz = rng.uniform(3.0, 5.5)
+    phase = rng.uniform(0, math.tau)
+    for i in range(rate * BLOCK_SECS):
+        prev = 0.85 * prev + 0.15 * rng.uniform(-1.0, 1.0)
+        envelope = max(0.0, math.sin(phase + math.tau * syllable_hz * i / rate))
+        samples.append(int(prev * envelope * amplitude * 32767))
+    return struct.pack(f"<{len(samples)}h", *samples)
+
+
+def _silence_block(rate: int) -> bytes:
+    return b"\x00\x00" * rate * BLOCK_SECS
+
+
+class AudioPattern:
+    """Generador determinista de bloques de 1 s de habla sintetica o silencio.
+
+    Los bloques se toman de un pool precalculado para que generar 4 horas
+    de audio cueste lo mismo que escribirlas a disco.
+    """
+
+    def __init__(self, rate: int = config.SAMPLE_RATE, seed: int = 0,
+                 speech_ratio: float = 0.7, amplitude: float = 0.3):
+        self.rate = rate
+        self.speech_ratio = speech_ratio
+        self._rng = random.Random(seed)
+        self._pool = [_speech_block(self._rng, rate, amplitude) for _ in range(POOL_SIZE)]
+        self._silence = _silence_block(rate)
+
+    def blocks(self, duration_secs: int):
+        talking = True
+        for _ in range(duration_secs // BLOCK_SECS):
+            # Alternate talk spurts and pauses of a few seconds
+            if self._rng.random() < 0.2:
+                talking = self._rng.random() < self.speech_ratio
+            yield self._rng.choice(self._pool) if talking else self._silence
+
+
+def _interleave(left: bytes, right: bytes) -> bytes:
+    l_samples = struct.unpack(f"<{len(left) // 2}h", left)
+    r_samples = struct.unpack(f"<{len(right) // 2}h", right)
+    stereo = [0] * (len(l_samples) * 2)
+    stereo[0::2] = l_samples
+    stereo[1::2] = r_samples
+    return struct.pack(f"<{len(stereo)}h", *stereo)
+
+
+def write_wav(path: Path, duration_secs: int, channels: int = 1,
+              rate: int = config.SAMPLE_RATE, seed: int = 0,
+              speech_ratio: float = 0.7) -> Path:
+    """Escribe un WAV PCM16 sintetico de duration_secs segundos.
+    En stereo cada canal usa una semilla distinta (dos interlocutores).
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    left = AudioPattern(rate, seed, speech_ratio).blocks(duration_secs)
+    right = AudioPattern(rate, seed + 1, speech_ratio).blocks(duration_secs) if channels == 2 else None
+
+    with wave.open(str(path), "wb") as wf:
+        wf.setnchannels(channels)
+        wf.setsampwidth(2)
+        wf.setframerate(rate)
+        for block in left:
+            wf.writeframes(_interleave(block, next(right)) if right else block)
+    return path
+
+
+def write_silence(path: Path, duration_secs: int, channels: int = 1,
+                  rate: int = config.SAMPLE_RATE) -> Path:
+    return write_wav(path, duration_secs, channels, rate, speech_ratio=0.0)
+
+
+def capture_chunks(duration_secs: int, channels: int = 2, rate: int = 48000,
+                   chunk_ms: int = 30, seed: int = 0):
+    """Bloques PCM16 multicanal como los que entrega PortAudio en la captura."""
+    chunk_bytes = max(1, int(rate * chunk_ms / 1000)) * channels * 2
+    buffer = bytearray()
+    for block in AudioPattern(rate, seed, speech_ratio=1.0).blocks(POOL_SIZE):
+        samples = struct.unpack(f"<{len(block) // 2}h", block)
+        frames = [s for s in samples for _ in range(channels)]
+        buffer += struct.pack(f"<{len(frames)}h", *frames)
+    buffer = bytes(buffer)
+
+    offset = 0
+    for _ in range(int(duration_secs * 1000 / chunk_ms)):
+        if offset + chunk_bytes > len(buffer):
+            offset = 0
+        yield buffer[offset : offset + chunk_bytes]
+        offset += chunk_bytes
+
+
+def transcript_text(n_chars: int, seed: int = 0) -> str:
+    """Transcripcion sintetica de n_chars caracteres, una linea por segmento."""
+    rng = random.Random(seed)
+    words = (
+        "bueno entonces la reunion proyecto cliente fecha entrega revisar "
+        "presupuesto equipo tarea semana proxima acuerdo pendiente informe "
+        "vale perfecto claro necesitamos documento version servidor prueba"
+    ).split()
+    lines = []
+    size = 0
+    while size < n_chars:
+        line = " ".join(rng.choice(words) for _ in range(rng.randint(4, 16))).capitalize() + "."
+        lines.append(line)
+        size += len(line) + 1
+    return "\n".join(lines)[:n_chars]
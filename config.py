@@ -1,3 +1,4 @@
+import json
 import os
 from pathlib import Path
 
@@ -11,9 +12,12 @@ DATA_DIR = BASE_DIR / "data"
 RECORDINGS_DIR = DATA_DIR / "recordings"
 TRANSCRIPTS_DIR = DATA_DIR / "transcripts"
 SUMMARIES_DIR = DATA_DIR / "summaries"
+SPEECH_DIR = DATA_DIR / "speech"
+PROFILES_DIR = DATA_DIR / "profiles"
+TIMELINES_DIR = DATA_DIR / "timelines"
 DB_PATH = DATA_DIR / "callscribe.db"
 
-# Servidor
+# Servidor: la interfaz y su API no tienen autenticacion, solo escuchan en loopback
 HOST = "127.0.0.1"
 PORT = 8787
 
@@ -22,10 +26,40 @@ SAMPLE_RATE = 16000
 CHANNELS = 1
 AUDIO_FORMAT = "mp3"
 
+# Formatos aceptados al importar (cualquier formato soportado por ffmpeg)
+ALLOWED_EXTENSIONS = {
+    ".mp4", ".mp3", ".wav", ".webm", ".ogg", ".flac",
+    ".m4a", ".mkv", ".avi", ".mov", ".wma", ".aac",
+}
+
 # Whisper
 WHISPER_MODEL = os.getenv("CALLSCRIBE_WHISPER_MODEL", "medium")
 WHISPER_LANGUAGE = os.getenv("CALLSCRIBE_LANGUAGE", "es")
 WHISPER_DEVICE = "auto"  # se autodetecta: "cuda" si hay GPU, sino "cpu"
+# Perfil de decodificacion: fast, balanced, accurate o auto (segun cola y duracion)
+WHISPER_PROFILE = os.getenv("CALLSCRIBE_WHISPER_PROFILE", "auto")
+WHISPER_BATCH_SIZE = int(os.getenv("CALLSCRIBE_WHISPER_BATCH_SIZE", "8"))
+# Calibrar hilos/compute_type en CPU la primera vez que se carga cada modelo
+WHISPER_AUTOTUNE = os.getenv("CALLSCRIBE_WHISPER_AUTOTUNE", "1") == "1"
+WHISPER_TUNING_PATH = DATA_DIR / "whisper_tuning.json"
+# Transcripciones a la vez mientras se graba (0 = esperar a que termine la captura)
+WHISPER_RECORDING_DECODES = int(os.getenv("CALLSCRIBE_WHISPER_RECORDING_DECODES", "1"))
+# Grabaciones de hasta SHORT_CALL_SECS en cola se transcriben juntas, hasta
+# SHORT_CALL_BATCH por pasada (perfil auto; 0 o 1 lo desactiva)
+SHORT_CALL_SECS = int(os.getenv("CALLSCRIBE_SHORT_CALL_SECS", "300"))
+SHORT_CALL_BATCH = int(os.getenv("CALLSCRIBE_SHORT_CALL_BATCH", "8"))
+# Dos pasadas: borrador rapido con WHISPER_DRAFT_MODEL y refinado en segundo plano
+TWO_PASS = os.getenv("CALLSCRIBE_TWO_PASS", "0") == "1"
+WHISPER_DRAFT_MODEL = os.getenv("CALLSCRIBE_WHISPER_DRAFT_MODEL", "base")
+# Politica "auto": perfil fast con esta cola pendiente o grabaciones de esta duracion;
+# balanced con cualquier cola o desde la mitad de esa duracion
+PROFILE_FAST_BACKLOG = int(os.getenv("CALLSCRIBE_PROFILE_FAST_BACKLOG", "3"))
+PROFILE_FAST_SECS = int(os.getenv("CALLSCRIBE_PROFILE_FAST_SECS", "5400"))
+# Grabaciones de mas de STREAM_DECODE_SECS se leen de ffmpeg por ventanas de
+# DECODE_WINDOW_SECS (solapadas DECODE_OVERLAP_SECS) en vez de cargarlas enteras
+STREAM_DECODE_SECS = int(os.getenv("CALLSCRIBE_STREAM_DECODE_SECS", "1800"))
+DECODE_WINDOW_SECS = int(os.getenv("CALLSCRIBE_DECODE_WINDOW_SECS", "600"))
+DECODE_OVERLAP_SECS = int(os.getenv("CALLSCRIBE_DECODE_OVERLAP_SECS", "10"))
 
 # LLM
 LLM_PROVIDER = os.getenv("CALLSCRIBE_LLM_PROVIDER", "ollama")
@@ -33,7 +67,66 @@ ANTHROPIC_API_KEY = os.getenv("ANTHROPIC_API_KEY", "")
 ANTHROPIC_MODEL = "claude-sonnet-4-5-20250929"
 OLLAMA_MODEL = os.getenv("CALLSCRIBE_OLLAMA_MODEL", "minimax-m2:cloud")
 OLLAMA_URL = os.getenv("CALLSCRIBE_OLLAMA_URL", "http://localhost:11434")
+# keep_alive de Ollama mientras hay actas en curso y al terminar la ultima
+OLLAMA_KEEP_ALIVE = os.getenv("CALLSCRIBE_OLLAMA_KEEP_ALIVE", "30m")
+OLLAMA_IDLE_KEEP_ALIVE = os.getenv("CALLSCRIBE_OLLAMA_IDLE_KEEP_ALIVE", "5m")
+# Router de proveedores: lanzar el secundario si el principal tarda mas de N segundos (0 = no)
+LLM_HEDGE_AFTER_SECS = float(os.getenv("CALLSCRIBE_LLM_HEDGE_AFTER_SECS", "0"))
+# Circuit breaker: fallos seguidos para saltar un proveedor y durante cuanto
+LLM_BREAKER_FAILURES = int(os.getenv("CALLSCRIBE_LLM_BREAKER_FAILURES", "3"))
+LLM_BREAKER_COOLDOWN_SECS = float(os.getenv("CALLSCRIBE_LLM_BREAKER_COOLDOWN_SECS", "300"))
+# Segundos sin recibir tokens antes de dar la llamada por colgada
+LLM_IDLE_TIMEOUT_SECS = float(os.getenv("CALLSCRIBE_LLM_IDLE_TIMEOUT_SECS", "120"))
+# Compactar la transcripcion (parrafos, sin muletillas ni alucinaciones) antes del LLM
+TRANSCRIPT_COMPACTION = os.getenv("CALLSCRIBE_TRANSCRIPT_COMPACTION", "1") == "1"
+# Marcas de minuto en la transcripcion compactada
+TRANSCRIPT_MINUTE_MARKERS = os.getenv("CALLSCRIBE_TRANSCRIPT_MINUTE_MARKERS", "1") == "1"
+
+# Trabajos en segundo plano (conversion, transcripcion, actas) ejecutados a la vez
+JOB_WORKERS = int(os.getenv("CALLSCRIBE_JOB_WORKERS", "2"))
+# Depuracion: perfil por muestreo de cada trabajo (data/profiles/<id>/<etapa>.folded)
+PROFILE_JOBS = os.getenv("CALLSCRIBE_PROFILE_JOBS", "0") == "1"
+PROFILE_INTERVAL_MS = int(os.getenv("CALLSCRIBE_PROFILE_INTERVAL_MS", "10"))
+
+# Carpetas vigiladas: rutas separadas por os.pathsep (";" en Windows)
+WATCH_DIRS = [p for p in os.getenv("CALLSCRIBE_WATCH_DIRS", "").split(os.pathsep) if p.strip()]
+WATCH_POLL_SECS = float(os.getenv("CALLSCRIBE_WATCH_POLL_SECS", "5"))
+# Segundos sin cambios de tamanio/mtime para considerar un archivo terminado
+WATCH_SETTLE_SECS = float(os.getenv("CALLSCRIBE_WATCH_SETTLE_SECS", "10"))
+# Maximo de archivos de la carpeta vigilada en cola o en proceso a la vez
+WATCH_MAX_PENDING = int(os.getenv("CALLSCRIBE_WATCH_MAX_PENDING", "2"))
+WATCH_AUTO_PROCESS = os.getenv("CALLSCRIBE_WATCH_AUTO_PROCESS", "1") == "1"
+
+# Workers remotos: la instancia principal reparte transcripciones y actas
+REMOTE_WORKERS = os.getenv("CALLSCRIBE_REMOTE_WORKERS", "0") == "1"
+WORKER_TOKEN = os.getenv("CALLSCRIBE_WORKER_TOKEN", "")
+# Los workers usan un listener aparte que solo expone /api/workers
+WORKER_HOST = os.getenv("CALLSCRIBE_WORKER_HOST", "0.0.0.0")
+WORKER_PORT = int(os.getenv("CALLSCRIBE_WORKER_PORT", "8788"))
+WORKER_LEASE_SECS = float(os.getenv("CALLSCRIBE_WORKER_LEASE_SECS", "60"))
+WORKER_MAX_ATTEMPTS = int(os.getenv("CALLSCRIBE_WORKER_MAX_ATTEMPTS", "3"))
+
+# Procesamiento por lotes (python main.py batch <dir>)
+BATCH_WORKERS = int(os.getenv("CALLSCRIBE_BATCH_WORKERS", "1"))
+
+# Almacenamiento: recodificar a Opus las grabaciones con mas de N dias (0 = nunca)
+COMPACT_AFTER_DAYS = int(os.getenv("CALLSCRIBE_COMPACT_AFTER_DAYS", "30"))
+COMPACT_BITRATE = os.getenv("CALLSCRIBE_COMPACT_BITRATE", "24k")
+# Retencion (0 = sin limite): borrar el audio ya transcrito / la grabacion completa
+RETENTION_AUDIO_DAYS = int(os.getenv("CALLSCRIBE_RETENTION_AUDIO_DAYS", "0"))
+RETENTION_DAYS = int(os.getenv("CALLSCRIBE_RETENTION_DAYS", "0"))
+# Espacio maximo en MB; al superarlo se borra el audio transcrito mas antiguo
+STORAGE_LIMIT_MB = int(os.getenv("CALLSCRIBE_STORAGE_LIMIT_MB", "0"))
+STORAGE_INTERVAL_SECS = float(os.getenv("CALLSCRIBE_STORAGE_INTERVAL_SECS", "3600"))
 
 # Dispositivos de audio (None = autodetectar)
 LOOPBACK_DEVICE_INDEX = None
 MIC_DEVICE_INDEX = None
+# Fuentes de captura adicionales (JSON): cada una en su propio stream, mezclada
+# en el canal L (remoto), R (local) o LR, p. ej.
+# [{"name": "mic2", "kind": "input", "device": 3, "channel": "R", "gain": 0.8}]
+EXTRA_SOURCES = json.loads(os.getenv("CALLSCRIBE_EXTRA_SOURCES", "[]"))
+# Cada cuantos segundos se vuelve a enumerar los dispositivos (0 = solo a demanda)
+DEVICE_REFRESH_SECS = float(os.getenv("CALLSCRIBE_DEVICE_REFRESH_SECS", "30"))
+# Mantener abiertos los streams de captura para empezar a grabar al instante
+RECORDER_ARMED = os.getenv("CALLSCRIBE_RECORDER_ARMED", "0") == "1"
@@ -1,15 +1,21 @@
 import sqlite3
 import threading
+from collections.abc import Callable
+from datetime import datetime, timezone
 from pathlib import Path
 
-from db.models import SCHEMA_SQL
+from db.models import COLUMN_MIGRATIONS, SCHEMA_SQL
 
 _local = threading.local()
 
 
 class Database:
-    def __init__(self, db_path: Path):
+    def __init__(self, db_path: Path, on_change: Callable[..., None] | None = None):
+        """`on_change(topic, **datos)` se llama despues de cada alta, cambio o
+        baja de una grabacion (recording.created/updated/deleted).
+        """
         self.db_path = db_path
+        self.on_change = on_change
         self.db_path.parent.mkdir(parents=True, exist_ok=True)
         self._init_schema()
 
@@ -22,9 +28,20 @@ class Database:
 
     def _init_schema(self):
         conn = self._get_conn()
+        self._migrate_columns(conn)
         conn.executescript(SCHEMA_SQL)
         conn.commit()
 
+    def _migrate_columns(self, conn: sqlite3.Connection):
+        for table, column, definition in COLUMN_MIGRATIONS:
+            existing = {row["name"] for row in conn.execute(f"PRAGMA table_info({table})")}
+            if existing and column not in existing:
+                conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+
+    def _changed(self, topic: str, **data):
+        if self.on_change is not None:
+            self.on_change(topic, **data)
+
     def execute(self, sql: str, params: tuple = ()) -> sqlite3.Cursor:
         conn = self._get_conn()
         cursor = conn.execute(sql, params)
@@ -45,22 +62,130 @@ class Database:
             "INSERT INTO recordings (id, title, started_at, status) VALUES (?, ?, ?, 'recording')",
             (recording_id, title, started_at),
         )
-        return self.get_recording(recording_id)
+        rec = self.get_recording(recording_id)
+        self._changed("recording.created", recording_id=recording_id, status=rec["status"])
+        return rec
 
     def get_recording(self, recording_id: str) -> dict | None:
         return self.fetchone("SELECT * FROM recordings WHERE id = ?", (recording_id,))
 
+    def find_by_source_hash(self, source_hash: str) -> dict | None:
+        return self.fetchone(
+            "SELECT * FROM recordings WHERE source_hash = ? ORDER BY created_at DESC",
+            (source_hash,),
+        )
+
     def list_recordings(self) -> list[dict]:
         return self.fetchall("SELECT * FROM recordings ORDER BY started_at DESC")
 
+    def list_recordings_by_status(self, statuses: tuple[str, ...]) -> list[dict]:
+        placeholders = ", ".join("?" for _ in statuses)
+        return self.fetchall(
+            f"SELECT * FROM recordings WHERE status IN ({placeholders}) ORDER BY started_at",
+            statuses,
+        )
+
+    def query_recordings(self, since: str | None = None, until: str | None = None,
+                         statuses: tuple[str, ...] = (), ids: tuple[str, ...] = ()) -> list[dict]:
+        """Grabaciones filtradas por fecha de inicio (ISO, `until` exclusivo), estado e ids."""
+        clauses, params = [], []
+        if since:
+            clauses.append("started_at >= ?")
+            params.append(since)
+        if until:
+            clauses.append("started_at < ?")
+            params.append(until)
+        for column, values in (("status", statuses), ("id", ids)):
+            if values:
+                clauses.append(f"{column} IN ({', '.join('?' for _ in values)})")
+                params.extend(values)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        return self.fetchall(f"SELECT * FROM recordings {where} ORDER BY started_at", tuple(params))
+
+    def list_draft_recordings(self) -> list[dict]:
+        return self.fetchall("SELECT * FROM recordings WHERE transcript_draft = 1")
+
     def update_recording(self, recording_id: str, **fields) -> dict | None:
         if not fields:
             return self.get_recording(recording_id)
         set_clause = ", ".join(f"{k} = ?" for k in fields)
         values = list(fields.values()) + [recording_id]
         self.execute(f"UPDATE recordings SET {set_clause} WHERE id = ?", tuple(values))
-        return self.get_recording(recording_id)
+        rec = self.get_recording(recording_id)
+        if rec is not None:
+            # Every status change goes through here, whoever makes it
+            self._changed("recording.updated", recording_id=recording_id, status=rec["status"],
+                          fields=sorted(fields))
+        return rec
+
+    def set_transcript(self, recording_id: str, transcript_path: str, **fields) -> dict | None:
+        """Registra una transcripcion nueva. Cada una incrementa
+        transcript_generation, con la que un refinado detecta que quedo viejo.
+        """
+        self.execute(
+            "UPDATE recordings SET transcript_generation = transcript_generation + 1 WHERE id = ?",
+            (recording_id,),
+        )
+        return self.update_recording(recording_id, transcript_path=transcript_path, **fields)
 
     def delete_recording(self, recording_id: str) -> bool:
+        self.execute("DELETE FROM storage_usage WHERE recording_id = ?", (recording_id,))
         cursor = self.execute("DELETE FROM recordings WHERE id = ?", (recording_id,))
+        if cursor.rowcount:
+            self._changed("recording.deleted", recording_id=recording_id)
         return cursor.rowcount > 0
+
+    # -- Storage usage index --
+
+    def upsert_storage_usage(self, recording_id: str, audio_bytes: int, transcript_bytes: int,
+                             summary_bytes: int, other_bytes: int):
+        self.execute(
+            """INSERT INTO storage_usage
+                   (recording_id, audio_bytes, transcript_bytes, summary_bytes, other_bytes, updated_at)
+               VALUES (?, ?, ?, ?, ?, ?)
+               ON CONFLICT(recording_id) DO UPDATE SET
+                   audio_bytes = excluded.audio_bytes,
+                   transcript_bytes = excluded.transcript_bytes,
+                   summary_bytes = excluded.summary_bytes,
+                   other_bytes = excluded.other_bytes,
+                   updated_at = excluded.updated_at""",
+            (recording_id, audio_bytes, transcript_bytes, summary_bytes, other_bytes,
+             datetime.now(timezone.utc).isoformat()),
+        )
+
+    def get_storage_usage(self, recording_id: str) -> dict | None:
+        return self.fetchone("SELECT * FROM storage_usage WHERE recording_id = ?", (recording_id,))
+
+    def list_storage_usage(self) -> list[dict]:
+        return self.fetchall(
+            """SELECT r.id, r.title, r.started_at, r.status, u.audio_bytes, u.transcript_bytes,
+                      u.summary_bytes, u.other_bytes, u.updated_at
+               FROM storage_usage u JOIN recordings r ON r.id = u.recording_id
+               ORDER BY (u.audio_bytes + u.transcript_bytes + u.summary_bytes + u.other_bytes) DESC"""
+        )
+
+    # -- Remote jobs --
+
+    def insert_remote_job(self, job_id: str, recording_id: str, kind: str) -> dict:
+        self.execute(
+            "INSERT INTO remote_jobs (id, recording_id, kind) VALUES (?, ?, ?)",
+            (job_id, recording_id, kind),
+        )
+        return self.get_remote_job(job_id)
+
+    def get_remote_job(self, job_id: str) -> dict | None:
+        return self.fetchone("SELECT * FROM remote_jobs WHERE id = ?", (job_id,))
+
+    def list_remote_jobs(self, statuses: tuple[str, ...]) -> list[dict]:
+        placeholders = ", ".join("?" for _ in statuses)
+        return self.fetchall(
+            f"SELECT * FROM remote_jobs WHERE status IN ({placeholders}) ORDER BY created_at",
+            statuses,
+        )
+
+    def update_remote_job(self, job_id: str, **fields) -> dict | None:
+        fields["updated_at"] = datetime.now(timezone.utc).isoformat()
+        set_clause = ", ".join(f"{k} = ?" for k in fields)
+        values = list(fields.values()) + [job_id]
+        self.execute(f"UPDATE remote_jobs SET {set_clause} WHERE id = ?", tuple(values))
+        return self.get_remote_job(job_id)
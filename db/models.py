@@ -10,6 +10,45 @@ CREATE TABLE IF NOT EXISTS recordings (
     summary_path    TEXT,
     status          TEXT NOT NULL DEFAULT 'recording',
     error_message   TEXT,
+    source_hash     TEXT,
+    speech_path     TEXT,
+    transcript_draft INTEGER NOT NULL DEFAULT 0,
+    transcript_generation INTEGER NOT NULL DEFAULT 0,
     created_at      TEXT NOT NULL DEFAULT (datetime('now'))
 );
+
+CREATE INDEX IF NOT EXISTS idx_recordings_source_hash ON recordings (source_hash);
+
+CREATE TABLE IF NOT EXISTS remote_jobs (
+    id               TEXT PRIMARY KEY,
+    recording_id     TEXT NOT NULL,
+    kind             TEXT NOT NULL,
+    status           TEXT NOT NULL DEFAULT 'queued',
+    worker_id        TEXT,
+    lease_expires_at REAL,
+    attempts         INTEGER NOT NULL DEFAULT 0,
+    error_message    TEXT,
+    created_at       TEXT NOT NULL DEFAULT (datetime('now')),
+    updated_at       TEXT
+);
+
+CREATE INDEX IF NOT EXISTS idx_remote_jobs_status ON remote_jobs (status, created_at);
+
+CREATE TABLE IF NOT EXISTS storage_usage (
+    recording_id     TEXT PRIMARY KEY,
+    audio_bytes      INTEGER NOT NULL DEFAULT 0,
+    transcript_bytes INTEGER NOT NULL DEFAULT 0,
+    summary_bytes    INTEGER NOT NULL DEFAULT 0,
+    other_bytes      INTEGER NOT NULL DEFAULT 0,
+    updated_at       TEXT NOT NULL
+);
 """
+
+# Columns added after the first release: (table, column, definition).
+# Applied with ALTER TABLE on databases created before they existed.
+COLUMN_MIGRATIONS = [
+    ("recordings", "source_hash", "TEXT"),
+    ("recordings", "speech_path", "TEXT"),
+    ("recordings", "transcript_draft", "INTEGER NOT NULL DEFAULT 0"),
+    ("recordings", "transcript_generation", "INTEGER NOT NULL DEFAULT 0"),
+]
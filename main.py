@@ -1,18 +1,13 @@
+import argparse
 import logging
 import sys
 import threading
 import webbrowser
-
-import requests
-import uvicorn
+from pathlib import Path
 
 import config
-from db.database import Database
 from processing.summarizer import Summarizer
 from processing.transcriber import Transcriber
-from recorder.audio_capture import AudioRecorder
-from server.app import create_app
-from tray.tray_icon import TrayIcon
 
 logging.basicConfig(
     level=logging.INFO,
@@ -20,6 +15,9 @@ logging.basicConfig(
 )
 logger = logging.getLogger("callscribe")
 
+FINALIZE_ON_EXIT_TIMEOUT = 300
+LOOPBACK_HOSTS = {"127.0.0.1", "localhost", "::1"}
+
 
 def find_available_port(start: int, end: int) -> int:
     import socket
@@ -33,11 +31,109 @@ def find_available_port(start: int, end: int) -> int:
     raise RuntimeError(f"No se encontro un puerto disponible entre {start} y {end}")
 
 
-def main():
-    # Ensure data directories exist
-    for d in [config.RECORDINGS_DIR, config.TRANSCRIPTS_DIR, config.SUMMARIES_DIR]:
+def ensure_data_dirs():
+    for d in [config.RECORDINGS_DIR, config.TRANSCRIPTS_DIR, config.SUMMARIES_DIR,
+              config.SPEECH_DIR]:
         d.mkdir(parents=True, exist_ok=True)
 
+
+def build_transcriber(capture_active=None) -> Transcriber:
+    return Transcriber(
+        model_size=config.WHISPER_MODEL,
+        language=config.WHISPER_LANGUAGE,
+        capture_active=capture_active,
+    )
+
+
+def build_summarizer() -> Summarizer:
+    return Summarizer(
+        provider=config.LLM_PROVIDER,
+        api_key=config.ANTHROPIC_API_KEY,
+        model=config.ANTHROPIC_MODEL,
+        ollama_url=config.OLLAMA_URL,
+        ollama_model=config.OLLAMA_MODEL,
+        compact=config.TRANSCRIPT_COMPACTION,
+        minute_markers=config.TRANSCRIPT_MINUTE_MARKERS,
+        hedge_after_secs=config.LLM_HEDGE_AFTER_SECS,
+        breaker_failures=config.LLM_BREAKER_FAILURES,
+        breaker_cooldown_secs=config.LLM_BREAKER_COOLDOWN_SECS,
+        idle_timeout_secs=config.LLM_IDLE_TIMEOUT_SECS,
+        keep_alive=config.OLLAMA_KEEP_ALIVE,
+        idle_keep_alive=config.OLLAMA_IDLE_KEEP_ALIVE,
+    )
+
+
+def batch_command(args):
+    # Headless: no tray, browser, server or PyAudio
+    from processing.batch import run_batch
+
+    if not args.directory.is_dir():
+        logger.error("No existe el directorio %s", args.directory)
+        sys.exit(1)
+
+    ensure_data_dirs()
+    summarizer = None if args.no_summary else build_summarizer()
+    report = run_batch(
+        args.directory,
+        build_transcriber(),
+        summarizer,
+        workers=args.workers,
+        recursive=args.recursive,
+        report_path=args.report,
+    )
+    if report["interrupted"]:
+        logger.warning("Esperando a que terminen las etapas en curso...")
+        sys.exit(130)
+    if report["counts"].get("error"):
+        sys.exit(2)
+
+
+def worker_command(args):
+    # Only Transcriber/Summarizer: no tray, browser, server or PyAudio
+    from processing.worker import RemoteWorker
+
+    summarizer = None if args.no_summary else build_summarizer()
+    worker = RemoteWorker(
+        args.server,
+        build_transcriber(),
+        summarizer,
+        token=args.token,
+        worker_id=args.worker_id,
+        poll_secs=args.poll_secs,
+    )
+    try:
+        worker.run()
+    except KeyboardInterrupt:
+        worker.stop()
+
+
+def calibrate_command(args):
+    from processing import tuning
+
+    ensure_data_dirs()
+    for model_size in args.models:
+        profile = tuning.calibrate(model_size, config.WHISPER_LANGUAGE)
+        print(f"{model_size}: compute_type={profile['compute_type']} "
+              f"cpu_threads={profile['cpu_threads']} num_workers={profile['num_workers']} "
+              f"RTF={profile['rtf']}")
+
+
+def run_app():
+    import uvicorn
+
+    from db.database import Database
+    from processing import events, pipeline
+    from processing.coordinator import Coordinator
+    from processing.jobs import JobQueue
+    from processing.storage import StorageCompactor
+    from processing.watcher import FolderWatcher
+    from recorder.audio_capture import AudioRecorder
+    from recorder.sources import configured_sources
+    from server.app import create_app, create_worker_app
+    from tray.tray_icon import TrayIcon
+
+    ensure_data_dirs()
+
     # Find available port
     try:
         port = find_available_port(config.PORT, 8800)
@@ -50,19 +146,18 @@ def main():
     config.PORT = port
 
     # Initialize components
-    db = Database(config.DB_PATH)
-    recorder = AudioRecorder(str(config.RECORDINGS_DIR))
-    transcriber = Transcriber(
-        model_size=config.WHISPER_MODEL,
-        language=config.WHISPER_LANGUAGE,
-    )
-    summarizer = Summarizer(
-        provider=config.LLM_PROVIDER,
-        api_key=config.ANTHROPIC_API_KEY,
-        model=config.ANTHROPIC_MODEL,
-        ollama_url=config.OLLAMA_URL,
-        ollama_model=config.OLLAMA_MODEL,
-    )
+    # Recording changes reach the tray, the UI (SSE) and the metrics through the bus
+    db = Database(config.DB_PATH, on_change=events.publish)
+    recorder = AudioRecorder(str(config.RECORDINGS_DIR), refresh_secs=config.DEVICE_REFRESH_SECS)
+    try:
+        recorder.topology.start()
+        if config.RECORDER_ARMED:
+            recorder.arm(configured_sources())
+    except Exception as e:
+        logger.warning("No se pudieron preparar los dispositivos de audio: %s", e)
+    # Whisper runs with fewer threads while a capture is active
+    transcriber = build_transcriber(capture_active=recorder.is_recording)
+    summarizer = build_summarizer()
 
     # Load Whisper model in background
     def preload_whisper():
@@ -72,44 +167,95 @@ def main():
         except Exception as e:
             logger.warning("No se pudo pre-cargar Whisper: %s", e)
 
-    threading.Thread(target=preload_whisper, daemon=True).start()
+    # Remote workers do the heavy lifting, no need for the model here
+    coordinator = None
+    if config.REMOTE_WORKERS:
+        if config.WORKER_HOST not in LOOPBACK_HOSTS and not config.WORKER_TOKEN:
+            logger.error("CALLSCRIBE_WORKER_TOKEN es obligatorio si los workers escuchan en %s",
+                         config.WORKER_HOST)
+            sys.exit(1)
+        coordinator = Coordinator(
+            db,
+            lease_secs=config.WORKER_LEASE_SECS,
+            max_attempts=config.WORKER_MAX_ATTEMPTS,
+        )
+        coordinator.start()
+        logger.info("Modo coordinador: las transcripciones se reparten entre workers remotos")
+    else:
+        # Remote jobs survive restarts via their leases; local ones died with the process
+        pipeline.recover_interrupted(db)
+        threading.Thread(target=preload_whisper, daemon=True).start()
+
+    # Recover captures cut short by a crash before anything new is recorded
+    compactor = StorageCompactor(
+        db,
+        capture_active=recorder.is_recording,
+        interval_secs=config.STORAGE_INTERVAL_SECS,
+        compact_after_days=config.COMPACT_AFTER_DAYS,
+        compact_bitrate=config.COMPACT_BITRATE,
+        retention_audio_days=config.RETENTION_AUDIO_DAYS,
+        retention_days=config.RETENTION_DAYS,
+        storage_limit_mb=config.STORAGE_LIMIT_MB,
+    )
+    compactor.recover_orphans()
+    compactor.start()
 
     # Create FastAPI app
-    app = create_app(db, recorder, transcriber, summarizer)
+    jobs = JobQueue(workers=config.JOB_WORKERS)
+    # Stopped recordings are mixed and encoded here, one at a time
+    finalizer = JobQueue(workers=1, name="finalize")
+    app = create_app(db, recorder, transcriber, summarizer, jobs, coordinator, finalizer,
+                     compactor)
+
+    # Optional watch-folder ingestion
+    watcher = None
+    if config.WATCH_DIRS:
+        watcher = FolderWatcher(
+            db, jobs, transcriber, summarizer,
+            [Path(d) for d in config.WATCH_DIRS],
+            poll_secs=config.WATCH_POLL_SECS,
+            settle_secs=config.WATCH_SETTLE_SECS,
+            max_pending=config.WATCH_MAX_PENDING,
+            auto_process=config.WATCH_AUTO_PROCESS,
+            coordinator=coordinator,
+        )
+        watcher.start()
 
     # Toggle recording callback for tray
     def toggle_recording():
-        base = f"http://{config.HOST}:{config.PORT}/api"
-        if recorder.is_recording():
-            requests.post(f"{base}/recording/stop", timeout=10)
-        else:
-            requests.post(f"{base}/recording/start", json={}, timeout=10)
-        tray.update_state(recorder.is_recording())
+        try:
+            if recorder.is_recording():
+                pipeline.stop_recording(db, recorder, jobs, finalizer)
+            else:
+                pipeline.start_recording(db, recorder, sources=configured_sources())
+        except (pipeline.CaptureError, ValueError) as e:
+            logger.error("No se pudo cambiar el estado de la grabacion: %s", e)
 
     # Quit callback
-    server_should_stop = threading.Event()
-
     def quit_app():
         logger.info("Cerrando CallScribe...")
+        if watcher:
+            watcher.stop()
+        compactor.stop()
+        if coordinator:
+            coordinator.stop()
         if recorder.is_recording():
             try:
-                recorder.stop()
-            except Exception:
-                pass
+                pipeline.stop_recording(db, recorder, jobs, finalizer)
+            except pipeline.CaptureError as e:
+                logger.error("No se pudo detener la grabacion: %s", e)
+        jobs.shutdown()
+        # Let recordings stopped just before quitting finish encoding
+        finalizer.wait_idle(timeout=FINALIZE_ON_EXIT_TIMEOUT)
+        finalizer.shutdown()
         recorder.terminate()
-        server_should_stop.set()
 
     # Setup tray icon
     tray = TrayIcon(on_toggle_recording=toggle_recording, on_quit=quit_app)
 
-    # Periodic tray state update
-    def update_tray_state():
-        import time
-        while not server_should_stop.is_set():
-            tray.update_state(recorder.is_recording())
-            time.sleep(2)
-
-    threading.Thread(target=update_tray_state, daemon=True).start()
+    # The tray follows the capture, whoever started or stopped it
+    events.subscribe(lambda e: tray.update_state(e["topic"] == "capture.started"),
+                     "capture.started", "capture.stopped")
 
     # Start server in background thread
     server_config = uvicorn.Config(
@@ -126,6 +272,18 @@ def main():
     server_thread = threading.Thread(target=run_server, daemon=True)
     server_thread.start()
 
+    # Workers get their own listener: the UI's API stays on loopback
+    worker_server = None
+    if coordinator:
+        worker_server = uvicorn.Server(uvicorn.Config(
+            create_worker_app(db, coordinator),
+            host=config.WORKER_HOST,
+            port=config.WORKER_PORT,
+            log_level="warning",
+        ))
+        threading.Thread(target=worker_server.run, daemon=True).start()
+        logger.info("Workers remotos en http://%s:%d", config.WORKER_HOST, config.WORKER_PORT)
+
     # Open browser
     url = f"http://{config.HOST}:{config.PORT}"
     logger.info("CallScribe iniciado en %s", url)
@@ -139,6 +297,42 @@ def main():
     finally:
         quit_app()
         server.should_exit = True
+        if worker_server:
+            worker_server.should_exit = True
+
+
+def main(argv: list[str] | None = None):
+    parser = argparse.ArgumentParser(prog="callscribe", description="CallScribe")
+    subparsers = parser.add_subparsers(dest="command")
+
+    batch = subparsers.add_parser("batch", help="Procesa todos los archivos de un directorio")
+    batch.add_argument("directory", type=Path)
+    batch.add_argument("--workers", type=int, default=config.BATCH_WORKERS,
+                       help="Archivos procesados en paralelo")
+    batch.add_argument("--recursive", action="store_true", help="Incluye subdirectorios")
+    batch.add_argument("--no-summary", action="store_true", help="Solo transcribe")
+    batch.add_argument("--report", type=Path, help="Ruta del reporte JSON")
+
+    worker = subparsers.add_parser("worker", help="Procesa trabajos de una instancia principal")
+    worker.add_argument("--server", required=True, help="URL de la instancia principal")
+    worker.add_argument("--token", default=config.WORKER_TOKEN, help="Token compartido")
+    worker.add_argument("--worker-id", help="Identificador del worker (por defecto host + aleatorio)")
+    worker.add_argument("--poll-secs", type=float, default=5)
+    worker.add_argument("--no-summary", action="store_true", help="Solo acepta transcripciones")
+
+    calibrate = subparsers.add_parser("calibrate", help="Calibra Whisper para esta CPU")
+    calibrate.add_argument("models", nargs="*", default=[config.WHISPER_MODEL],
+                           help="Tamanios de modelo (por defecto el configurado)")
+
+    args = parser.parse_args(argv)
+    if args.command == "batch":
+        batch_command(args)
+    elif args.command == "worker":
+        worker_command(args)
+    elif args.command == "calibrate":
+        calibrate_command(args)
+    else:
+        run_app()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,157 @@
+"""Lectura de audio por ventanas a traves de un pipe de ffmpeg.
+
+`decode_audio` de faster-whisper y pydub cargan el archivo entero en memoria
+(unos 230 MB por hora a 16 kHz mono en float32, el doble en stereo). Aqui
+ffmpeg decodifica a PCM por stdout y el audio se consume en orden, por
+ventanas o por tramos: en memoria solo esta lo que se esta procesando, asi
+que el pico no depende de la duracion de la grabacion.
+"""
+import json
+import subprocess
+import tempfile
+from pathlib import Path
+
+import numpy as np
+
+import config
+
+FFMPEG = "ffmpeg"
+FFPROBE = "ffprobe"
+# Audio between requested ranges is read and dropped in pieces of this size
+SKIP_FRAMES = 1 << 20
+# Only the end of ffmpeg's stderr goes into error messages
+STDERR_TAIL_CHARS = 500
+
+
+def _stderr_tail(data: bytes) -> str:
+    return data.decode("utf-8", errors="replace").strip()[-STDERR_TAIL_CHARS:]
+
+
+def probe_duration(path: Path) -> float | None:
+    """Duracion en segundos segun ffprobe, o None si no se puede leer."""
+    cmd = [FFPROBE, "-v", "error", "-show_entries", "format=duration", "-of", "json", str(path)]
+    try:
+        out = subprocess.run(cmd, capture_output=True, check=True, timeout=60).stdout
+        return float(json.loads(out)["format"]["duration"])
+    except (OSError, subprocess.SubprocessError, ValueError, KeyError, TypeError):
+        return None
+
+
+def transcode(input_path: Path, output_path: Path, *args: str):
+    """Convierte con ffmpeg de archivo a archivo: el audio no pasa por Python."""
+    cmd = [FFMPEG, "-nostdin", "-v", "error", "-y", "-i", str(input_path), "-vn",
+           *args, str(output_path)]
+    result = subprocess.run(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+    if result.returncode != 0:
+        raise RuntimeError(f"ffmpeg no pudo convertir {Path(input_path).name}: "
+                           f"{_stderr_tail(result.stderr)}")
+
+
+class PcmStream:
+    """Audio de un archivo en float32, leido en orden de la salida de ffmpeg.
+
+    Con `ranges()` o `windows()` se piden tramos crecientes; solo el tramo en
+    curso (y el solapamiento con el siguiente) queda en memoria.
+    """
+
+    def __init__(self, path: Path, rate: int = config.SAMPLE_RATE, channels: int = 1,
+                 start_secs: float = 0.0):
+        self.path = Path(path)
+        self.rate = rate
+        self.channels = channels
+        self.eof = False
+        cmd = [FFMPEG, "-nostdin", "-v", "error"]
+        if start_secs > 0:
+            cmd += ["-ss", f"{start_secs:.3f}"]
+        cmd += ["-i", str(self.path), "-vn", "-f", "s16le", "-ac", str(channels),
+                "-ar", str(rate), "-"]
+        # A stderr pipe nobody reads could fill up and stall ffmpeg
+        self._stderr = tempfile.TemporaryFile()
+        self._proc = subprocess.Popen(cmd, stdin=subprocess.DEVNULL, stdout=subprocess.PIPE,
+                                      stderr=self._stderr)
+        self._frame_bytes = 2 * channels
+        self._buffer = np.zeros((0, channels), dtype=np.float32)
+        # Absolute frame of self._buffer[0]
+        self._buffer_start = round(start_secs * rate)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        if self._proc.poll() is None:
+            self._proc.kill()
+        self._proc.wait()
+        self._proc.stdout.close()
+        self._stderr.close()
+        self._buffer = self._buffer[:0]
+
+    def _finish(self):
+        self.eof = True
+        if self._proc.wait() != 0:
+            self._stderr.seek(0)
+            raise RuntimeError(f"ffmpeg no pudo decodificar {self.path.name}: "
+                               f"{_stderr_tail(self._stderr.read())}")
+
+    def _read(self, frames: int) -> np.ndarray:
+        """Hasta `frames` frames del pipe; menos al llegar al final del audio."""
+        data = self._proc.stdout.read(frames * self._frame_bytes)
+        if len(data) < frames * self._frame_bytes:
+            self._finish()
+        usable = len(data) // self._frame_bytes * self.channels
+        pcm = np.frombuffer(data, dtype="<i2", count=usable).reshape(-1, self.channels)
+        audio = pcm.astype(np.float32)
+        audio *= 1 / 32768.0
+        return audio
+
+    def _skip(self, frames: int):
+        while frames > 0 and not self.eof:
+            read = len(self._read(min(frames, SKIP_FRAMES)))
+            self._buffer_start += read
+            frames -= read
+
+    def ranges(self, spans):
+        """Produce (inicio, audio) para cada (inicio, fin) en segundos, en orden
+        de inicio. Un tramo puede solaparse con el anterior; el audio entre
+        tramos se lee y se descarta. En mono el audio es 1-D, en stereo (N, 2).
+        """
+        for start, end in spans:
+            a = max(round(start * self.rate), self._buffer_start)
+            b = round(end * self.rate)
+            # Keep only what this span shares with the previous one
+            drop = min(a - self._buffer_start, len(self._buffer))
+            self._buffer = self._buffer[drop:]
+            self._buffer_start += drop
+            self._skip(a - self._buffer_start)
+
+            missing = b - self._buffer_start - len(self._buffer)
+            if missing > 0 and not self.eof:
+                self._buffer = np.concatenate([self._buffer, self._read(missing)])
+            audio = self._buffer[a - self._buffer_start:b - self._buffer_start]
+            if not len(audio):
+                return
+            yield a / self.rate, audio[:, 0] if self.channels == 1 else audio
+
+    def windows(self, window_secs: float, overlap_secs: float = 0.0):
+        """Ventanas consecutivas de window_secs que se solapan overlap_secs,
+        hasta el final del audio. Produce (inicio, audio, es_la_ultima).
+        """
+        step = window_secs - overlap_secs
+        if step <= 0:
+            raise ValueError("El solapamiento debe ser menor que la ventana")
+        first = self._buffer_start / self.rate
+        window_frames = round(window_secs * self.rate)
+
+        def spans():
+            k = 0
+            while True:
+                yield first + k * step, first + k * step + window_secs
+                k += 1
+
+        for offset, audio in self.ranges(spans()):
+            last = len(audio) < window_frames
+            yield offset, audio, last
+            if last:
+                return
@@ -0,0 +1,178 @@
+"""Procesamiento por lotes de un directorio de grabaciones, sin tray ni navegador."""
+import json
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timezone
+from pathlib import Path
+
+import config
+from db.database import Database
+from processing import pipeline
+from processing.summarizer import Summarizer
+from processing.transcriber import Transcriber
+
+logger = logging.getLogger(__name__)
+
+
+def find_files(directory: Path, recursive: bool = False) -> list[Path]:
+    pattern = "**/*" if recursive else "*"
+    return sorted(
+        p for p in directory.glob(pattern)
+        if p.is_file() and p.suffix.lower() in config.ALLOWED_EXTENSIONS
+    )
+
+
+class BatchInterrupted(Exception):
+    """El lote se interrumpio antes de la etapa indicada."""
+
+
+class BatchRunner:
+    """Importa, transcribe y resume cada archivo de un directorio.
+
+    Cada archivo se identifica por el hash de su contenido, de modo que una
+    segunda ejecucion omite los ya completados y retoma los que quedaron a
+    medias (importados pero sin transcripcion, o transcritos sin acta).
+    Al interrumpir, los archivos en curso se detienen al terminar su etapa
+    actual y los pendientes no se empiezan.
+    """
+
+    def __init__(self, db: Database, transcriber: Transcriber, summarizer: Summarizer | None,
+                 workers: int = 1):
+        self.db = db
+        self.transcriber = transcriber
+        self.summarizer = summarizer
+        self.workers = max(1, workers)
+        self.results: list[dict] = []
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+
+    def _backlog(self, total: int) -> int:
+        # Files not yet picked up by any batch worker
+        with self._lock:
+            return max(0, total - len(self.results) - self.workers)
+
+    def _checkpoint(self, stage: str):
+        if self._stop.is_set():
+            raise BatchInterrupted(stage)
+
+    def _process_file(self, path: Path, total: int) -> dict:
+        entry = {"file": str(path), "recording_id": None, "status": None, "timings": {}}
+        start = time.perf_counter()
+
+        def timed(stage: str, fn, *args, **kwargs):
+            t0 = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                entry["timings"][stage] = round(time.perf_counter() - t0, 2)
+
+        try:
+            source_hash = timed("hash", pipeline.file_hash, path)
+            rec = self.db.find_by_source_hash(source_hash)
+
+            if rec and (
+                rec["status"] == "completed"
+                or (self.summarizer is None and rec["transcript_path"])
+            ):
+                entry.update(recording_id=rec["id"], status="skipped")
+                return entry
+
+            if rec is None:
+                self._checkpoint("import")
+                started_at = datetime.fromtimestamp(path.stat().st_mtime, timezone.utc).isoformat()
+                rec = timed(
+                    "import", pipeline.import_file, self.db, path, f"Importado - {path.stem}",
+                    started_at=started_at, source_hash=source_hash,
+                )
+            entry["recording_id"] = rec["id"]
+
+            transcript = config.BASE_DIR / rec["transcript_path"] if rec["transcript_path"] else None
+            if transcript is None or not transcript.exists():
+                self._checkpoint("transcribe")
+                self.db.update_recording(rec["id"], status="transcribing", error_message=None)
+                next_status = "summarizing" if self.summarizer else "transcribed"
+                rec = timed("transcribe", pipeline.transcribe, self.db, self.transcriber, rec,
+                            next_status=next_status, backlog=self._backlog(total))
+                entry["decoding"] = pipeline.decoding_info(rec)
+
+            if self.summarizer:
+                self._checkpoint("summarize")
+                rec = self.db.update_recording(rec["id"], status="summarizing", error_message=None)
+                rec = timed("summarize", pipeline.summarize, self.db, self.summarizer, rec)
+
+            entry["status"] = rec["status"]
+        except BatchInterrupted as e:
+            logger.info("%s detenido antes de %s", path.name, e)
+            entry["status"] = "interrupted"
+        except Exception as e:
+            logger.error("Error procesando %s: %s", path.name, e)
+            if entry["recording_id"]:
+                self.db.update_recording(entry["recording_id"], status="error", error_message=str(e))
+            entry.update(status="error", error=str(e))
+        finally:
+            entry["timings"]["total"] = round(time.perf_counter() - start, 2)
+            with self._lock:
+                self.results.append(entry)
+                logger.info("[%d/%d] %s: %s (%.1fs)", len(self.results), total, path.name,
+                            entry["status"], entry["timings"]["total"])
+        return entry
+
+    def run(self, files: list[Path]) -> list[dict]:
+        pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="batch")
+        try:
+            futures = [pool.submit(self._process_file, f, len(files)) for f in files]
+            for future in as_completed(futures):
+                future.result()
+        except KeyboardInterrupt:
+            logger.warning("Interrumpido: los archivos pendientes se retomaran en la proxima ejecucion")
+            # Files in progress finish their current stage, queued ones are dropped
+            self._stop.set()
+            pool.shutdown(wait=False, cancel_futures=True)
+            raise
+        pool.shutdown()
+        return self.results
+
+
+def build_report(directory: Path, results: list[dict], elapsed: float,
+                 interrupted: bool = False) -> dict:
+    counts = {}
+    for r in results:
+        counts[r["status"]] = counts.get(r["status"], 0) + 1
+    return {
+        "directory": str(directory),
+        "finished_at": datetime.now(timezone.utc).isoformat(),
+        "interrupted": interrupted,
+        "elapsed_secs": round(elapsed, 1),
+        "counts": counts,
+        "files": sorted(results, key=lambda r: r["file"]),
+    }
+
+
+def run_batch(directory: Path, transcriber: Transcriber, summarizer: Summarizer | None,
+              workers: int = 1, recursive: bool = False, report_path: Path | None = None) -> dict:
+    """Procesa el directorio y escribe el reporte. Si se interrumpe con Ctrl+C
+    devuelve el reporte con `interrupted` en True; los hilos que siguen en una
+    etapa larga la terminan antes de que el interprete salga.
+    """
+    files = find_files(directory, recursive)
+    logger.info("%d archivos encontrados en %s", len(files), directory)
+
+    db = Database(config.DB_PATH)
+    runner = BatchRunner(db, transcriber, summarizer, workers)
+    interrupted = False
+    start = time.perf_counter()
+    try:
+        runner.run(files)
+    except KeyboardInterrupt:
+        interrupted = True
+
+    report = build_report(directory, list(runner.results), time.perf_counter() - start, interrupted)
+    if report_path is None:
+        stamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        report_path = config.DATA_DIR / "batch_reports" / f"batch_{stamp}.json"
+    report_path.parent.mkdir(parents=True, exist_ok=True)
+    report_path.write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding="utf-8")
+    logger.info("Reporte: %s (%s)", report_path, report["counts"])
+    return report
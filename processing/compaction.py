@@ -0,0 +1,165 @@
+"""Compactacion de transcripciones antes de enviarlas al LLM.
+
+Whisper produce una linea por segmento, muletillas y, en los silencios,
+frases alucinadas que se repiten en bucle. Todo eso infla el prompt sin
+aportar contenido. Esta etapa parte de los segmentos del .json (la
+transcripcion original no se modifica) y:
+
+- descarta las alucinaciones conocidas y los segmentos repetidos en bucle,
+- colapsa las repeticiones dentro de un mismo segmento,
+- quita las muletillas,
+- une segmentos contiguos del mismo hablante en parrafos (con mapa de voz el
+  hablante sale del canal: microfono = local, loopback = remoto),
+- opcionalmente marca el minuto en lugar de cada marca de tiempo.
+"""
+import math
+import re
+import unicodedata
+
+CHARS_PER_TOKEN = 4
+# A new paragraph starts after a pause this long or once it grows this big
+PARAGRAPH_GAP_SECS = 2.0
+MAX_PARAGRAPH_CHARS = 800
+# A segment identical to one of the last N kept ones is a decoding loop;
+# short replies ("Si.", "Vale.") legitimately repeat and are left alone
+LOOP_WINDOW = 4
+LOOP_MIN_WORDS = 3
+# Share of a segment's time a channel must hold to be its speaker
+SPEAKER_DOMINANCE = 0.6
+
+SPEAKER_LABELS = {"mic": "Local", "loopback": "Remoto"}
+SPEAKER_LEGEND = ("(Local = microfono de quien grabo la llamada; "
+                  "Remoto = resto de participantes)")
+
+FILLER_RE = re.compile(
+    r"(?<![\w])(?:e+h+|e+m+|m+h*m+|h+m+|a+h+|u+h+|u+m+|u+h+m+)(?![\w])[,.]?\s*",
+    re.IGNORECASE,
+)
+# Phrases Whisper is known to hallucinate over silence or music
+HALLUCINATIONS = (
+    "subtitulos realizados por la comunidad de amara.org",
+    "subtitulos por la comunidad de amara.org",
+    "gracias por ver el video",
+    "suscribete al canal",
+    "thanks for watching",
+    "thank you for watching",
+)
+# A word or short phrase repeated three or more times in a row
+REPEAT_RE = re.compile(r"\b(\w+(?:[\s,]+\w+){0,3}?)(?:[\s,.]+\1\b){2,}", re.IGNORECASE)
+
+
+def estimate_tokens(text: str) -> int:
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+def _normalize(text: str) -> str:
+    return re.sub(r"[^\w\s]", "", text.lower()).strip()
+
+
+def _strip_accents(text: str) -> str:
+    decomposed = unicodedata.normalize("NFKD", text)
+    return "".join(c for c in decomposed if not unicodedata.combining(c))
+
+
+def _is_hallucination(text: str) -> bool:
+    norm = _strip_accents(_normalize(text))
+    return any(norm == _normalize(h) for h in HALLUCINATIONS)
+
+
+def _clean(text: str) -> tuple[str, int]:
+    """Texto sin repeticiones internas ni muletillas y cuantas muletillas se quitaron."""
+    text = REPEAT_RE.sub(r"\1", text)
+    text, fillers = FILLER_RE.subn("", text)
+    text = re.sub(r"\s{2,}", " ", text).strip(" ,")
+    if text:
+        text = text[0].upper() + text[1:]
+    return text, fillers
+
+
+def _overlap(start: float, end: float, regions: list[list[float]]) -> float:
+    return sum(max(0.0, min(end, e) - max(start, s)) for s, e in regions)
+
+
+def _speaker(seg: dict, channels: dict | None) -> str | None:
+    if not channels or "start" not in seg:
+        return None
+    length = max(seg["end"] - seg["start"], 0.01)
+    best, share = None, 0.0
+    for name, regions in channels.items():
+        label = SPEAKER_LABELS.get(name)
+        if label is None:
+            continue
+        overlap = _overlap(seg["start"], seg["end"], regions) / length
+        if overlap > share:
+            best, share = label, overlap
+    return best if share >= SPEAKER_DOMINANCE else None
+
+
+def paragraphs(segments: list[dict], speech_map: dict | None = None) -> tuple[list[dict], dict]:
+    """Parrafos {start, speaker, text} y contadores de lo descartado."""
+    channels = speech_map.get("channels") if speech_map else None
+    stats = {"segments": len(segments), "hallucinations": 0, "loops": 0, "fillers": 0}
+    recent: list[str] = []
+    result: list[dict] = []
+    last_end = None
+
+    for seg in segments:
+        if _is_hallucination(seg["text"]):
+            stats["hallucinations"] += 1
+            continue
+        norm = _normalize(seg["text"])
+        if len(norm.split()) >= LOOP_MIN_WORDS and norm in recent:
+            stats["loops"] += 1
+            continue
+        text, fillers = _clean(seg["text"])
+        stats["fillers"] += fillers
+        if not text:
+            continue
+        recent = (recent + [norm])[-LOOP_WINDOW:]
+
+        start = seg.get("start")
+        speaker = _speaker(seg, channels)
+        current = result[-1] if result else None
+        if (current is not None and current["speaker"] == speaker
+                and (start is None or last_end is None or start - last_end < PARAGRAPH_GAP_SECS)
+                and len(current["text"]) + len(text) < MAX_PARAGRAPH_CHARS):
+            current["text"] += " " + text
+        else:
+            result.append({"start": start, "speaker": speaker, "text": text})
+        last_end = seg.get("end", last_end)
+
+    stats["paragraphs"] = len(result)
+    return result, stats
+
+
+def render(paras: list[dict], minute_markers: bool = True) -> str:
+    lines = []
+    if any(p["speaker"] for p in paras):
+        lines.append(SPEAKER_LEGEND)
+    minute = None
+    for p in paras:
+        if minute_markers and p["start"] is not None and int(p["start"] // 60) != minute:
+            minute = int(p["start"] // 60)
+            lines.append(f"[min {minute}]")
+        lines.append(f"{p['speaker']}: {p['text']}" if p["speaker"] else p["text"])
+    return "\n".join(lines)
+
+
+def compact(raw_text: str, segments: list[dict] | None, speech_map: dict | None = None,
+            minute_markers: bool = True) -> tuple[str, list[dict], dict]:
+    """Devuelve (texto compacto, parrafos, estadisticas). Sin segmentos con
+    tiempos (p. ej. en un worker remoto) se trabaja sobre las lineas del .txt.
+    """
+    if not segments:
+        segments = [{"text": line} for line in raw_text.splitlines() if line.strip()]
+        speech_map = None
+    paras, stats = paragraphs(segments, speech_map)
+    text = render(paras, minute_markers)
+    raw_tokens = estimate_tokens(raw_text)
+    compact_tokens = estimate_tokens(text)
+    stats.update({
+        "raw_tokens": raw_tokens,
+        "compact_tokens": compact_tokens,
+        "reduction": round(1 - compact_tokens / raw_tokens, 3) if raw_tokens else 0.0,
+    })
+    return text, paras, stats
@@ -0,0 +1,256 @@
+import json
+import logging
+import threading
+import time
+import uuid
+from pathlib import Path
+
+import config
+from db.database import Database
+from processing import pipeline, subtitles
+
+logger = logging.getLogger(__name__)
+
+JOB_KINDS = ("transcribe", "summarize", "process")
+
+
+class LeaseLost(Exception):
+    """El trabajo ya no pertenece a este worker (lease vencido o reasignado)."""
+
+
+class Coordinator:
+    """Reparte trabajos de transcripcion/resumen entre workers remotos.
+
+    Los trabajos viven en la tabla remote_jobs. Un worker los reclama con un
+    lease de `lease_secs` que renueva con heartbeats; si deja de hacerlo el
+    lease vence y el trabajo vuelve a la cola (lo revisa un hilo cada medio
+    lease, y tambien cada claim), hasta `max_attempts` intentos.
+    """
+
+    def __init__(self, db: Database, lease_secs: float = 60, max_attempts: int = 3):
+        self.db = db
+        self.lease_secs = lease_secs
+        self.max_attempts = max_attempts
+        self._lock = threading.Lock()
+        # worker_id -> {"last_seen": epoch, "job_id": str | None, "kinds": [...]}
+        self._workers: dict[str, dict] = {}
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="lease-reaper", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=5)
+
+    def _run(self):
+        while not self._stop.wait(self.lease_secs / 2):
+            try:
+                self.reap_expired()
+            except Exception as e:
+                logger.error("Error revisando leases vencidos: %s", e)
+
+    def reap_expired(self) -> int:
+        """Devuelve a la cola los trabajos cuyo lease vencio. Devuelve cuantos."""
+        with self._lock:
+            return self._reap_expired(time.time())
+
+    def _reap_expired(self, now: float) -> int:
+        reaped = 0
+        for job in self.db.list_remote_jobs(("leased",)):
+            if (job["lease_expires_at"] or 0) > now:
+                continue
+            reaped += 1
+            logger.warning("Lease vencido de %s en el trabajo %s", job["worker_id"], job["id"])
+            rec = self.db.get_recording(job["recording_id"])
+            if rec is None:
+                self.db.update_remote_job(job["id"], status="failed", lease_expires_at=None,
+                                          error_message="Grabacion eliminada")
+            elif job["attempts"] >= self.max_attempts:
+                self._give_up(job, "Se agotaron los intentos de los workers")
+            else:
+                self.db.update_remote_job(job["id"], kind=self._resume_kind(job, rec),
+                                          status="queued", worker_id=None,
+                                          lease_expires_at=None)
+        return reaped
+
+    # -- Main instance side --
+
+    def enqueue(self, recording_id: str, kind: str) -> dict:
+        if kind not in JOB_KINDS:
+            raise ValueError(f"Tipo de trabajo desconocido: {kind}")
+        job = self.db.insert_remote_job(str(uuid.uuid4()), recording_id, kind)
+        logger.info("Trabajo remoto %s (%s) encolado para %s", job["id"], kind, recording_id)
+        return job
+
+    def stats(self) -> dict:
+        now = time.time()
+        jobs = self.db.list_remote_jobs(("queued", "leased"))
+        with self._lock:
+            workers = [
+                {"id": wid, "idle_secs": round(now - w["last_seen"]), **{
+                    k: v for k, v in w.items() if k != "last_seen"
+                }}
+                for wid, w in self._workers.items()
+            ]
+        return {
+            "queued": sum(1 for j in jobs if j["status"] == "queued"),
+            "leased": sum(1 for j in jobs if j["status"] == "leased"),
+            "workers": workers,
+        }
+
+    # -- Worker side --
+
+    def _touch_worker(self, worker_id: str, job_id: str | None, kinds: list[str] | None = None):
+        with self._lock:
+            entry = self._workers.setdefault(worker_id, {"kinds": kinds or list(JOB_KINDS)})
+            entry["last_seen"] = time.time()
+            entry["job_id"] = job_id
+            if kinds:
+                entry["kinds"] = kinds
+
+    def claim(self, worker_id: str, kinds: list[str]) -> dict | None:
+        """Asigna al worker el trabajo mas antiguo que pueda ejecutar."""
+        now = time.time()
+        with self._lock:
+            self._reap_expired(now)
+            for job in self.db.list_remote_jobs(("queued",)):
+                if job["kind"] not in kinds:
+                    continue
+
+                rec = self.db.get_recording(job["recording_id"])
+                if rec is None:
+                    self.db.update_remote_job(job["id"], status="failed",
+                                              error_message="Grabacion eliminada")
+                    continue
+
+                job = self.db.update_remote_job(
+                    job["id"],
+                    kind=self._resume_kind(job, rec),
+                    status="leased",
+                    worker_id=worker_id,
+                    lease_expires_at=now + self.lease_secs,
+                    attempts=job["attempts"] + 1,
+                )
+                break
+            else:
+                job = None
+
+        self._touch_worker(worker_id, job["id"] if job else None, kinds)
+        if job is None:
+            return None
+
+        logger.info("Trabajo %s (%s) asignado a %s", job["id"], job["kind"], worker_id)
+        return {
+            "job_id": job["id"],
+            "kind": job["kind"],
+            "recording_id": rec["id"],
+            "recording_date": pipeline.recording_date(rec),
+            "lease_secs": self.lease_secs,
+        }
+
+    def get_leased_job(self, job_id: str, worker_id: str) -> dict:
+        job = self.db.get_remote_job(job_id)
+        if (
+            job is None
+            or job["status"] != "leased"
+            or job["worker_id"] != worker_id
+            or (job["lease_expires_at"] or 0) < time.time()
+        ):
+            raise LeaseLost(job_id)
+        return job
+
+    def _leased_recording(self, job: dict) -> dict:
+        rec = self.db.get_recording(job["recording_id"])
+        if rec is None:
+            self.db.update_remote_job(job["id"], status="failed", lease_expires_at=None,
+                                      error_message="Grabacion eliminada")
+            raise LeaseLost(job["id"])
+        return rec
+
+    def heartbeat(self, job_id: str, worker_id: str) -> dict:
+        with self._lock:
+            self.get_leased_job(job_id, worker_id)
+            job = self.db.update_remote_job(job_id, lease_expires_at=time.time() + self.lease_secs)
+        self._touch_worker(worker_id, job_id)
+        return job
+
+    def complete_transcript(self, job_id: str, worker_id: str, text: str,
+                            segments: list[dict], language: str | None,
+                            duration: float | None) -> dict:
+        with self._lock:
+            job = self.get_leased_job(job_id, worker_id)
+            rec = self._leased_recording(job)
+
+            stem = Path(rec["audio_path"]).stem
+            config.TRANSCRIPTS_DIR.mkdir(parents=True, exist_ok=True)
+            txt_path = config.TRANSCRIPTS_DIR / f"{stem}.txt"
+            json_path = config.TRANSCRIPTS_DIR / f"{stem}.json"
+            txt_path.write_text(text, encoding="utf-8")
+            json_path.write_text(json.dumps({
+                "language": language,
+                "duration": duration,
+                "segments": segments,
+            }, ensure_ascii=False, indent=2), encoding="utf-8")
+            txt_path.with_suffix(".srt").write_text(subtitles.to_srt(segments), encoding="utf-8")
+            txt_path.with_suffix(".vtt").write_text(subtitles.to_vtt(segments), encoding="utf-8")
+
+            # A process job keeps its lease: the same worker summarizes next
+            next_status = "summarizing" if job["kind"] == "process" else "transcribed"
+            rel_path = str(txt_path.relative_to(config.BASE_DIR))
+            self.db.set_transcript(rec["id"], rel_path, status=next_status)
+            if job["kind"] == "process":
+                job = self.db.update_remote_job(job_id, lease_expires_at=time.time() + self.lease_secs)
+            else:
+                job = self.db.update_remote_job(job_id, status="done", lease_expires_at=None)
+
+        self._touch_worker(worker_id, None if job["status"] == "done" else job_id)
+        logger.info("Transcripcion remota recibida para %s (%d segmentos)", rec["id"], len(segments))
+        return job
+
+    def complete_summary(self, job_id: str, worker_id: str, markdown: str) -> dict:
+        with self._lock:
+            job = self.get_leased_job(job_id, worker_id)
+            rec = self._leased_recording(job)
+
+            config.SUMMARIES_DIR.mkdir(parents=True, exist_ok=True)
+            stem = Path(rec["transcript_path"]).stem
+            md_path = config.SUMMARIES_DIR / f"{stem}.md"
+            md_path.write_text(markdown, encoding="utf-8")
+
+            rel_path = str(md_path.relative_to(config.BASE_DIR))
+            self.db.update_recording(rec["id"], status="completed", summary_path=rel_path)
+            job = self.db.update_remote_job(job_id, status="done", lease_expires_at=None)
+
+        self._touch_worker(worker_id, None)
+        logger.info("Acta remota recibida para %s", rec["id"])
+        return job
+
+    def fail(self, job_id: str, worker_id: str, error: str) -> dict:
+        with self._lock:
+            job = self.get_leased_job(job_id, worker_id)
+            if job["attempts"] >= self.max_attempts:
+                job = self._give_up(job, error)
+            else:
+                logger.warning("Trabajo %s fallo en %s (%s), se reintentara", job_id, worker_id, error)
+                rec = self.db.get_recording(job["recording_id"])
+                job = self.db.update_remote_job(job_id, kind=self._resume_kind(job, rec),
+                                                status="queued", worker_id=None,
+                                                lease_expires_at=None, error_message=error)
+        self._touch_worker(worker_id, None)
+        return job
+
+    def _resume_kind(self, job: dict, rec: dict | None) -> str:
+        # A process job that already delivered its transcript only needs the summary
+        if job["kind"] == "process" and rec and rec["status"] == "summarizing":
+            return "summarize"
+        return job["kind"]
+
+    def _give_up(self, job: dict, error: str) -> dict:
+        logger.error("Trabajo %s fallido: %s", job["id"], error)
+        self.db.update_recording(job["recording_id"], status="error", error_message=error)
+        return self.db.update_remote_job(job["id"], status="failed", lease_expires_at=None,
+                                         error_message=error)
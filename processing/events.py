@@ -0,0 +1,64 @@
+"""Bus de eventos en proceso.
+
+El recorder, la cola de trabajos y las rutas publican lo que pasa (empezo o
+termino una captura, empezo o termino un trabajo, se creo o cambio una
+grabacion); la bandeja, el canal de eventos del navegador y las metricas se
+suscriben. Asi nadie tiene que sondear el estado ni llamar a la API local.
+
+Los manejadores se ejecutan en el hilo que publica y deben ser rapidos: los
+que necesitan hacer algo lento lo pasan a su propia cola o hilo. Un error en
+un manejador se registra y no afecta al publicador ni a los demas.
+
+Temas:
+- capture.started / capture.stopped / capture.finalized
+- job.queued / job.started / job.finished
+- recording.created / recording.updated / recording.deleted, tras cada
+  escritura de una grabacion (rutas, pipeline, coordinador, carpetas
+  vigiladas...): main.py conecta el `on_change` de Database a `publish`
+- recording.progress, el avance de una transcripcion en curso
+"""
+import logging
+import threading
+from datetime import datetime, timezone
+from typing import Callable
+
+logger = logging.getLogger(__name__)
+
+Handler = Callable[[dict], None]
+
+
+class EventBus:
+    def __init__(self):
+        self._subscribers: list[tuple[tuple[str, ...], Handler]] = []
+        self._lock = threading.Lock()
+
+    def subscribe(self, handler: Handler, *prefixes: str) -> Callable[[], None]:
+        """Suscribe `handler` a los temas que empiezan por alguno de los
+        prefijos (todos si no se indica ninguno). Retorna la funcion que
+        cancela la suscripcion.
+        """
+        entry = (prefixes, handler)
+        with self._lock:
+            self._subscribers = [*self._subscribers, entry]
+
+        def unsubscribe():
+            with self._lock:
+                self._subscribers = [s for s in self._subscribers if s is not entry]
+
+        return unsubscribe
+
+    def publish(self, topic: str, **data):
+        event = {"topic": topic, "at": datetime.now(timezone.utc).isoformat(), **data}
+        # Copy-on-write list: no lock held while handlers run
+        for prefixes, handler in self._subscribers:
+            if prefixes and not topic.startswith(prefixes):
+                continue
+            try:
+                handler(event)
+            except Exception as e:
+                logger.warning("Error en el manejador del evento %s: %s", topic, e)
+
+
+bus = EventBus()
+publish = bus.publish
+subscribe = bus.subscribe
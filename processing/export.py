@@ -0,0 +1,110 @@
+"""Exportacion masiva de grabaciones en un ZIP generado en streaming.
+
+El archivo se escribe sobre un sumidero en memoria que se vacia tras cada
+bloque, de modo que nunca se construye un ZIP temporal ni se carga un archivo
+entero: la memoria usada es del orden de CHUNK_BYTES sea cual sea el tamanio
+de la exportacion. Las entradas usan descriptores de datos (el zipfile de la
+libreria estandar los emplea al escribir sobre un flujo no posicionable) y
+ZIP64 cuando hace falta, asi que las exportaciones de varios GB funcionan.
+"""
+import json
+import re
+import zipfile
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Iterator
+
+from processing.storage import recording_files
+
+CHUNK_BYTES = 1024 * 1024
+KINDS = ("audio", "transcript", "summary")
+TRANSCRIPT_SUFFIXES = (".txt", ".json", ".srt")
+# Audio is already compressed (mp3/opus); deflating it only burns CPU
+STORED_SUFFIXES = (".mp3", ".opus", ".ogg", ".wav")
+
+
+class _Sink:
+    """Destino de escritura del ZIP: acumula lo escrito hasta el proximo drain()."""
+
+    def __init__(self):
+        self._chunks: list[bytes] = []
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def _slug(text: str) -> str:
+    return re.sub(r"[^A-Za-z0-9]+", "-", text).strip("-")[:40] or "grabacion"
+
+
+def folder_name(rec: dict) -> str:
+    return f"{rec['started_at'][:10]}_{_slug(rec['title'] or '')}_{rec['id'][:8]}"
+
+
+def export_files(rec: dict, kinds: tuple[str, ...] = KINDS) -> list[tuple[str, Path]]:
+    """(nombre dentro del ZIP, ruta en disco) de los archivos a exportar."""
+    files = recording_files(rec)
+    folder = folder_name(rec)
+    entries = []
+    for kind in kinds:
+        for path in files[kind]:
+            if kind == "transcript" and path.suffix not in TRANSCRIPT_SUFFIXES:
+                continue
+            if path.exists():
+                entries.append((f"{folder}/{kind}{path.suffix}", path))
+    return entries
+
+
+def _entry(name: str, size: int, mtime: float) -> zipfile.ZipInfo:
+    date_time = datetime.fromtimestamp(max(mtime, 315532800)).timetuple()[:6]
+    info = zipfile.ZipInfo(name, date_time=date_time)
+    info.compress_type = (zipfile.ZIP_STORED if name.endswith(STORED_SUFFIXES)
+                          else zipfile.ZIP_DEFLATED)
+    # Known size up front lets zipfile pick ZIP64 headers for files > 4 GB
+    info.file_size = size
+    return info
+
+
+def stream_zip(recordings: list[dict], kinds: tuple[str, ...] = KINDS) -> Iterator[bytes]:
+    sink = _Sink()
+    manifest = []
+    with zipfile.ZipFile(sink, "w", allowZip64=True) as zf:
+        for rec in recordings:
+            exported = []
+            for name, path in export_files(rec, kinds):
+                try:
+                    stat = path.stat()
+                    src = path.open("rb")
+                except OSError:
+                    # Deleted by the compactor/retention while exporting
+                    continue
+                with src, zf.open(_entry(name, stat.st_size, stat.st_mtime), "w") as dst:
+                    while chunk := src.read(CHUNK_BYTES):
+                        dst.write(chunk)
+                        if data := sink.drain():
+                            yield data
+                exported.append(name)
+                if data := sink.drain():
+                    yield data
+            manifest.append({
+                "id": rec["id"],
+                "title": rec["title"],
+                "started_at": rec["started_at"],
+                "duration_secs": rec["duration_secs"],
+                "status": rec["status"],
+                "files": exported,
+            })
+        zf.writestr("manifest.json", json.dumps({
+            "exported_at": datetime.now(timezone.utc).isoformat(),
+            "recordings": manifest,
+        }, ensure_ascii=False, indent=2))
+    yield sink.drain()
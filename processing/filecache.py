@@ -0,0 +1,59 @@
+"""Cache en memoria de archivos leidos por los endpoints de lectura.
+
+Las transcripciones, actas y JSON auxiliares se releen en cada sondeo del
+detalle de una grabacion. Aqui se guardan ya leidos/parseados y se invalidan
+cuando cambia el mtime o el tamanio del archivo, asi que una escritura (o un
+os.replace) se ve en la siguiente lectura. Lo devuelto es compartido: no
+modificarlo.
+"""
+import json
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Callable
+
+MAX_ENTRIES = 128
+
+_entries: OrderedDict[tuple[str, str], tuple[tuple[int, int], object]] = OrderedDict()
+_lock = threading.Lock()
+
+
+def signature(path: Path | None) -> tuple[int, int] | None:
+    """(mtime_ns, tamanio) del archivo, o None si no existe."""
+    if path is None:
+        return None
+    try:
+        stat = path.stat()
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+def _cached(path: Path, kind: str, parse: Callable[[str], object]):
+    sig = signature(path)
+    if sig is None:
+        return None
+    key = (str(path), kind)
+    with _lock:
+        entry = _entries.get(key)
+        if entry and entry[0] == sig:
+            _entries.move_to_end(key)
+            return entry[1]
+    try:
+        value = parse(path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+    with _lock:
+        _entries[key] = (sig, value)
+        _entries.move_to_end(key)
+        while len(_entries) > MAX_ENTRIES:
+            _entries.popitem(last=False)
+    return value
+
+
+def read_text(path: Path) -> str | None:
+    return _cached(path, "text", lambda text: text)
+
+
+def read_json(path: Path):
+    return _cached(path, "json", json.loads)
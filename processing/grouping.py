@@ -0,0 +1,80 @@
+import logging
+import threading
+
+from db.database import Database
+from processing import pipeline
+from processing.jobs import JobQueue
+from processing.transcriber import Transcriber
+
+logger = logging.getLogger(__name__)
+
+
+class ShortCallBatcher:
+    """Agrupa las transcripciones de grabaciones cortas en cola.
+
+    En lugar de un trabajo por grabacion se encola un unico trabajo de
+    grupo; cuando llega su turno toma todas las grabaciones cortas que se
+    acumularon mientras esperaba (hasta `max_group`) y las transcribe en una
+    sola pasada por lotes. Lo que queda se agrupa en el siguiente trabajo.
+    """
+
+    def __init__(self, db: Database, transcriber: Transcriber, jobs: JobQueue,
+                 max_secs: int = 300, max_group: int = 8):
+        self.db = db
+        self.transcriber = transcriber
+        self.jobs = jobs
+        self.max_secs = max_secs
+        self.max_group = max_group
+        # (rec, status after transcription, callback(rec) run afterwards as its own job)
+        self._pending: list[tuple[dict, str, object]] = []
+        self._scheduled = False
+        self._lock = threading.Lock()
+
+    def accepts(self, rec: dict) -> bool:
+        return self.max_group > 1 and 0 < (rec["duration_secs"] or 0) <= self.max_secs
+
+    def add(self, rec: dict, next_status: str = "transcribed", then=None):
+        with self._lock:
+            self._pending.append((rec, next_status, then))
+            if not self._scheduled:
+                self._scheduled = True
+                self.jobs.submit(self._run, name="transcribe:grupo")
+
+    def pending(self) -> int:
+        with self._lock:
+            return len(self._pending)
+
+    def _run(self):
+        with self._lock:
+            group = self._pending[: self.max_group]
+            del self._pending[: self.max_group]
+            if self._pending:
+                self.jobs.submit(self._run, name="transcribe:grupo")
+            else:
+                self._scheduled = False
+
+        # Recordings deleted while waiting in the queue
+        group = [entry for entry in group if self.db.get_recording(entry[0]["id"])]
+        if not group:
+            return
+
+        recs = [rec for rec, _, _ in group]
+        try:
+            if len(group) == 1:
+                rec, next_status, _ = group[0]
+                updated = [pipeline.transcribe(self.db, self.transcriber, rec,
+                                               next_status=next_status,
+                                               backlog=self.jobs.pending())]
+            else:
+                updated = pipeline.transcribe_group(
+                    self.db, self.transcriber, recs, [status for _, status, _ in group],
+                )
+        except Exception as e:
+            logger.error("Error transcribiendo el grupo %s: %s", [r["id"] for r in recs], e)
+            for rec in recs:
+                self.db.update_recording(rec["id"], status="error", error_message=str(e))
+            return
+
+        for rec, (_, _, then) in zip(updated, group):
+            if then is not None:
+                self.jobs.submit(then, rec, name=f"summarize:{rec['id']}")
@@ -0,0 +1,175 @@
+import heapq
+import itertools
+import logging
+import re
+import threading
+import time
+from contextlib import contextmanager
+
+from processing import events, profiler, timeline
+
+logger = logging.getLogger(__name__)
+
+# Lower value runs first
+PRIORITY_HIGH = 0
+PRIORITY_NORMAL = 10
+PRIORITY_LOW = 20
+
+# Recording ids are uuid4 strings
+RECORDING_ID_PATTERN = r"[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}"
+_RECORDING_ID_RE = re.compile(rf"^{RECORDING_ID_PATTERN}$")
+# Job names are "<stage>:<recording id>" (or another key, e.g. "transcribe:grupo")
+_JOB_NAME_RE = re.compile(rf"^(\w+):({RECORDING_ID_PATTERN})$")
+
+
+def is_recording_id(value: str) -> bool:
+    return bool(_RECORDING_ID_RE.match(value))
+
+
+def parse_job_name(name: str) -> tuple[str, str] | None:
+    """(etapa, id de grabacion) de un nombre de trabajo, o None si el trabajo
+    no es de una sola grabacion (grupos, carpetas vigiladas).
+    """
+    match = _JOB_NAME_RE.match(name)
+    return (match.group(1), match.group(2)) if match else None
+
+
+@contextmanager
+def _job_context(name: str):
+    # Only single-recording jobs get a timeline run and a profile
+    parsed = parse_job_name(name)
+    if parsed is None:
+        yield
+        return
+    stage, recording_id = parsed
+    with timeline.trace(recording_id, stage), profiler.profile(recording_id, stage):
+        yield
+
+
+class Job:
+    def __init__(self, job_id: int, name: str, priority: int, fn, args: tuple, kwargs: dict):
+        self.id = job_id
+        self.name = name
+        self.priority = priority
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+        self.submitted_at = time.monotonic()
+        self.started_at: float | None = None
+        self.finished_at: float | None = None
+        self.result = None
+        self.error: Exception | None = None
+        self._done = threading.Event()
+
+    def wait(self, timeout: float | None = None) -> bool:
+        return self._done.wait(timeout)
+
+    @property
+    def done(self) -> bool:
+        return self._done.is_set()
+
+    def event(self) -> dict:
+        stage, _, key = self.name.partition(":")
+        return {"job": self.name, "stage": stage if key else None,
+                "recording_id": key if is_recording_id(key) else None}
+
+
+class JobQueue:
+    """Cola de trabajos en segundo plano con un numero fijo de hilos.
+
+    Reemplaza un hilo por peticion: las conversiones, transcripciones y actas
+    esperan turno en lugar de competir todas a la vez por la CPU. Los
+    trabajos con menor prioridad numerica se ejecutan primero y, a igual
+    prioridad, en orden de llegada.
+    """
+
+    def __init__(self, workers: int = 2, name: str = "jobs"):
+        self.workers = max(1, workers)
+        self.name = name
+        self._heap: list[tuple[int, int, Job]] = []
+        self._cond = threading.Condition()
+        self._seq = itertools.count(1)
+        self._running: dict[int, Job] = {}
+        self._stopped = False
+        self._threads = [
+            threading.Thread(target=self._worker, name=f"{name}-{i}", daemon=True)
+            for i in range(self.workers)
+        ]
+        for t in self._threads:
+            t.start()
+
+    def submit(self, fn, *args, priority: int = PRIORITY_NORMAL, name: str = "",
+               **kwargs) -> Job:
+        with self._cond:
+            if self._stopped:
+                raise RuntimeError("La cola de trabajos esta detenida")
+            job = Job(next(self._seq), name or fn.__name__, priority, fn, args, kwargs)
+            heapq.heappush(self._heap, (priority, job.id, job))
+            self._cond.notify()
+        events.publish("job.queued", queue=self.name, **job.event())
+        return job
+
+    def pending(self) -> int:
+        with self._cond:
+            return len(self._heap)
+
+    def running(self) -> int:
+        with self._cond:
+            return len(self._running)
+
+    def stats(self) -> dict:
+        with self._cond:
+            return {
+                "workers": self.workers,
+                "running": [job.name for job in self._running.values()],
+                "pending": len(self._heap),
+            }
+
+    def _worker(self):
+        while True:
+            with self._cond:
+                while not self._heap and not self._stopped:
+                    self._cond.wait()
+                if self._stopped:
+                    return
+                _, _, job = heapq.heappop(self._heap)
+                self._running[job.id] = job
+
+            job.started_at = time.monotonic()
+            events.publish("job.started", queue=self.name, **job.event())
+            try:
+                with _job_context(job.name):
+                    job.result = job.fn(*job.args, **job.kwargs)
+            except Exception as e:
+                job.error = e
+                logger.exception("Error en trabajo %s", job.name)
+            finally:
+                job.finished_at = time.monotonic()
+                # Published before the job counts as done, so waiters see it delivered
+                events.publish("job.finished", queue=self.name,
+                               secs=round(job.finished_at - job.started_at, 3),
+                               error=str(job.error) if job.error else None, **job.event())
+                with self._cond:
+                    self._running.pop(job.id, None)
+                    self._cond.notify_all()
+                job._done.set()
+
+    def wait_idle(self, timeout: float | None = None) -> bool:
+        """Espera a que no queden trabajos en cola ni en ejecucion."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while self._heap or self._running:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+        return True
+
+    def shutdown(self, wait: bool = False, timeout: float = 5):
+        with self._cond:
+            self._stopped = True
+            self._heap.clear()
+            self._cond.notify_all()
+        if wait:
+            for t in self._threads:
+                t.join(timeout=timeout)
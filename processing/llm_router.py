@@ -0,0 +1,246 @@
+"""Enrutado de llamadas al LLM entre proveedores.
+
+Cada proveedor lleva su propio estado de salud: tras `failure_threshold` fallos
+seguidos el circuito se abre y el proveedor se salta durante el cooldown;
+despues se le deja un intento (semiabierto) que lo cierra o lo vuelve a abrir.
+
+Con hedging activado, si el proveedor principal no termina en
+`hedge_after_secs` se lanza el siguiente en paralelo y se usa la primera
+respuesta que llegue; la otra se cancela en el siguiente token recibido.
+Se registran por proveedor el tiempo hasta el primer token (TTFT) y la
+latencia total.
+"""
+import logging
+import statistics
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Callable
+
+from processing import profiler, timeline
+
+logger = logging.getLogger(__name__)
+
+# Latency samples kept per provider for the percentiles
+STATS_WINDOW = 100
+
+
+class CallCancelled(Exception):
+    """La llamada perdio la carrera contra otro proveedor."""
+
+
+class CallContext:
+    """Lo que recibe un proveedor en cada llamada: la marca de cancelacion y
+    el aviso del primer token.
+    """
+
+    def __init__(self):
+        self.cancel = threading.Event()
+        self.started = time.monotonic()
+        self.first_token_at: float | None = None
+        # Filled in by the provider: input, cached (None when the provider does
+        # not report it) and output tokens
+        self.usage: dict | None = None
+
+    def token(self):
+        """Llamar por cada fragmento recibido; corta la llamada si se cancelo."""
+        if self.first_token_at is None:
+            self.first_token_at = time.monotonic()
+        if self.cancel.is_set():
+            raise CallCancelled()
+
+
+# fn(system, user_prompt, ctx) -> text
+ProviderFn = Callable[[str, str, CallContext], str]
+
+
+def _percentile(samples, q: float) -> float | None:
+    if not samples:
+        return None
+    if len(samples) == 1:
+        return round(samples[0], 3)
+    return round(statistics.quantiles(samples, n=100, method="inclusive")[int(q) - 1], 3)
+
+
+class ProviderHealth:
+    def __init__(self, name: str, failure_threshold: int, cooldown_secs: float):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.cooldown_secs = cooldown_secs
+        self.consecutive_failures = 0
+        self.open_until = 0.0
+        self.calls = 0
+        self.failures = 0
+        self.cancelled = 0
+        self.input_tokens = 0
+        self.cached_tokens = 0
+        self.output_tokens = 0
+        self.last_error: str | None = None
+        self.ttft: deque[float] = deque(maxlen=STATS_WINDOW)
+        self.latency: deque[float] = deque(maxlen=STATS_WINDOW)
+        self._lock = threading.Lock()
+
+    def state(self) -> str:
+        if self.consecutive_failures < self.failure_threshold:
+            return "closed"
+        return "open" if time.monotonic() < self.open_until else "half-open"
+
+    def available(self) -> bool:
+        return self.state() != "open"
+
+    def record_success(self, ctx: CallContext):
+        with self._lock:
+            self.calls += 1
+            self.consecutive_failures = 0
+            end = time.monotonic()
+            self.latency.append(end - ctx.started)
+            if ctx.first_token_at is not None:
+                self.ttft.append(ctx.first_token_at - ctx.started)
+            if ctx.usage:
+                self.input_tokens += ctx.usage["input"]
+                if ctx.usage["cached"] is not None:
+                    self.cached_tokens += ctx.usage["cached"]
+                self.output_tokens += ctx.usage["output"]
+
+    def record_failure(self, error: Exception):
+        with self._lock:
+            self.calls += 1
+            self.failures += 1
+            self.consecutive_failures += 1
+            self.last_error = str(error)[:200]
+            if self.consecutive_failures >= self.failure_threshold:
+                self.open_until = time.monotonic() + self.cooldown_secs
+                logger.warning("LLM '%s': circuito abierto durante %.0f s tras %d fallos (%s)",
+                               self.name, self.cooldown_secs, self.consecutive_failures, error)
+
+    def record_cancelled(self):
+        with self._lock:
+            self.cancelled += 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            ttft, latency = list(self.ttft), list(self.latency)
+            return {
+                "state": self.state(),
+                "calls": self.calls,
+                "failures": self.failures,
+                "cancelled": self.cancelled,
+                "consecutive_failures": self.consecutive_failures,
+                "cooldown_remaining_secs": round(max(0.0, self.open_until - time.monotonic()), 1),
+                "last_error": self.last_error,
+                "ttft_p50": _percentile(ttft, 50),
+                "ttft_p95": _percentile(ttft, 95),
+                "latency_p50": _percentile(latency, 50),
+                "latency_p95": _percentile(latency, 95),
+                "input_tokens": self.input_tokens,
+                "cached_input_tokens": self.cached_tokens,
+                "output_tokens": self.output_tokens,
+            }
+
+
+class ProviderRouter:
+    def __init__(self, providers: list[tuple[str, ProviderFn]], hedge_after_secs: float = 0,
+                 failure_threshold: int = 3, cooldown_secs: float = 300):
+        if not providers:
+            raise ValueError("Se necesita al menos un proveedor de LLM")
+        self.providers = providers
+        self.hedge_after_secs = hedge_after_secs
+        self.health = {name: ProviderHealth(name, failure_threshold, cooldown_secs)
+                       for name, _ in providers}
+        self.hedged = 0
+        self.hedges_won = 0
+        # Two slots per concurrent call: the primary and its hedge
+        self._executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="llm")
+
+    def _candidates(self) -> list[tuple[str, ProviderFn]]:
+        ready = [p for p in self.providers if self.health[p[0]].available()]
+        if ready:
+            return ready
+        # Every circuit is open: try the one closest to reopening rather than fail outright
+        return [min(self.providers, key=lambda p: self.health[p[0]].open_until)]
+
+    def _run(self, name: str, fn: ProviderFn, system: str, prompt: str, ctx: CallContext,
+             profile: profiler.Profile | None = None, trace=None) -> str:
+        health = self.health[name]
+        try:
+            with profiler.bind(profile), timeline.bind(trace), \
+                    timeline.span(f"provider:{name}") as attrs:
+                try:
+                    text = fn(system, prompt, ctx)
+                finally:
+                    if ctx.first_token_at is not None:
+                        attrs["ttft_ms"] = round((ctx.first_token_at - ctx.started) * 1000)
+                    attrs["cancelled"] = ctx.cancel.is_set()
+                    attrs.update(ctx.usage or {})
+        except CallCancelled:
+            health.record_cancelled()
+            raise
+        except Exception as e:
+            if ctx.cancel.is_set():
+                health.record_cancelled()
+            else:
+                health.record_failure(e)
+            raise
+        health.record_success(ctx)
+        return text
+
+    def _start(self, name: str, fn: ProviderFn, system: str, prompt: str,
+               running: dict[Future, tuple[str, CallContext]]):
+        ctx = CallContext()
+        # The provider thread is sampled and traced as part of the calling job
+        running[self._executor.submit(self._run, name, fn, system, prompt, ctx,
+                                      profiler.current(), timeline.current())] = (name, ctx)
+
+    def call(self, system: str, prompt: str) -> str:
+        queue = self._candidates()
+        running: dict[Future, tuple[str, CallContext]] = {}
+        last_error: Exception | None = None
+        hedge_pending = False
+
+        primary, fn = queue.pop(0)
+        self._start(primary, fn, system, prompt, running)
+
+        while running:
+            timeout = None
+            if queue and self.hedge_after_secs > 0 and not hedge_pending:
+                timeout = self.hedge_after_secs
+            done, _ = wait(running, timeout=timeout, return_when=FIRST_COMPLETED)
+
+            if not done:
+                # Primary is slow: race the next provider against it
+                name, fn = queue.pop(0)
+                logger.info("LLM lento, lanzando '%s' en paralelo", name)
+                self.hedged += 1
+                hedge_pending = True
+                self._start(name, fn, system, prompt, running)
+                continue
+
+            for future in done:
+                name, ctx = running.pop(future)
+                try:
+                    text = future.result()
+                except Exception as e:
+                    last_error = e
+                    logger.warning("LLM '%s' fallo: %s", name, e)
+                    continue
+                for _, other in running.values():
+                    other.cancel.set()
+                if hedge_pending and name != primary:
+                    self.hedges_won += 1
+                return text
+
+            if not running and queue:
+                # Everything in flight failed: fall back to the next provider
+                name, fn = queue.pop(0)
+                self._start(name, fn, system, prompt, running)
+
+        raise last_error
+
+    def stats(self) -> dict:
+        return {
+            "providers": {name: h.snapshot() for name, h in self.health.items()},
+            "hedge_after_secs": self.hedge_after_secs,
+            "hedged": self.hedged,
+            "hedges_won": self.hedges_won,
+        }
@@ -0,0 +1,42 @@
+"""Metricas en memoria alimentadas por el bus de eventos."""
+import threading
+from collections import Counter
+
+from processing.events import EventBus
+
+
+class EventMetrics:
+    """Cuenta eventos por tema y acumula la duracion de los trabajos por etapa."""
+
+    def __init__(self, bus: EventBus):
+        self._lock = threading.Lock()
+        self.events: Counter[str] = Counter()
+        self.stages: dict[str, dict] = {}
+        self.last_event_at: str | None = None
+        self.unsubscribe = bus.subscribe(self._on_event)
+
+    def _on_event(self, event: dict):
+        with self._lock:
+            self.events[event["topic"]] += 1
+            self.last_event_at = event["at"]
+            if event["topic"] == "job.finished" and event.get("stage"):
+                stage = self.stages.setdefault(event["stage"], {
+                    "count": 0, "errors": 0, "total_secs": 0.0, "max_secs": 0.0, "last_secs": None,
+                })
+                secs = event.get("secs") or 0.0
+                stage["count"] += 1
+                stage["errors"] += 1 if event.get("error") else 0
+                stage["total_secs"] = round(stage["total_secs"] + secs, 3)
+                stage["max_secs"] = max(stage["max_secs"], secs)
+                stage["last_secs"] = secs
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "events": dict(self.events),
+                "last_event_at": self.last_event_at,
+                "stages": {
+                    name: {**s, "avg_secs": round(s["total_secs"] / s["count"], 3) if s["count"] else None}
+                    for name, s in self.stages.items()
+                },
+            }
@@ -0,0 +1,379 @@
+import hashlib
+import json
+import logging
+import os
+import shutil
+import time
+import uuid
+from datetime import datetime, timezone
+from pathlib import Path
+
+import config
+from db.database import Database
+from processing import events, filecache, profiler, speech, timeline
+from processing.jobs import PRIORITY_LOW, JobQueue
+from processing.summarizer import COMPACT_STATS_SUFFIX, Summarizer
+from processing.transcriber import JOURNAL_SUFFIX, Transcriber, choose_profile
+from recorder.mixer import convert_to_mp3
+
+logger = logging.getLogger(__name__)
+
+# Estados en los que una grabacion tiene un trabajo en curso
+BUSY_STATUSES = ("recording", "finalizing", "transcribing", "summarizing")
+# Conversion output when an imported .mp3 already sits at its final path
+IMPORT_TEMP_SUFFIX = ".import.mp3"
+
+HASH_BLOCK_SIZE = 1024 * 1024
+# Free space required to start a recording
+MIN_FREE_BYTES = 500 * 1024 * 1024
+
+# Transcription progress (0-1) of the recordings being transcribed here
+_progress: dict[str, float] = {}
+# recording.progress is published at most this often per recording
+PROGRESS_EVENT_SECS = 1.0
+
+
+def file_hash(path: Path) -> str:
+    """SHA-256 del contenido de un archivo, leido por bloques."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        while block := f.read(HASH_BLOCK_SIZE):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def recording_date(rec: dict) -> str:
+    return rec["started_at"][:10] if rec["started_at"] else "Fecha desconocida"
+
+
+def import_file(db: Database, source_path: Path, title: str,
+                recording_id: str | None = None, started_at: str | None = None,
+                source_hash: str | None = None) -> dict:
+    """Convierte un archivo de audio/video a MP3 y registra la grabacion."""
+    recording_id = recording_id or str(uuid.uuid4())
+    mp3_path = config.RECORDINGS_DIR / f"{recording_id}.mp3"
+    # ffmpeg cannot write over its own input: an uploaded .mp3 is converted
+    # to a temporary file that then replaces it
+    in_place = source_path.resolve() == mp3_path.resolve()
+    output_path = mp3_path.with_suffix(IMPORT_TEMP_SUFFIX) if in_place else mp3_path
+
+    try:
+        with timeline.trace(recording_id, "import"), profiler.profile(recording_id, "import"):
+            with timeline.span("convert", input_bytes=source_path.stat().st_size) as attrs:
+                duration_secs = convert_to_mp3(source_path, output_path)
+                attrs["output_bytes"] = output_path.stat().st_size
+                attrs["audio_secs"] = round(duration_secs, 1)
+        if in_place:
+            os.replace(output_path, mp3_path)
+    except Exception:
+        output_path.unlink(missing_ok=True)
+        raise
+
+    now = datetime.now(timezone.utc).isoformat()
+    db.insert_recording(recording_id, title, started_at or now)
+    return db.update_recording(
+        recording_id,
+        status="stopped",
+        ended_at=now,
+        duration_secs=int(duration_secs),
+        audio_path=str(mp3_path.relative_to(config.BASE_DIR)),
+        source_hash=source_hash,
+    )
+
+
+class CaptureError(RuntimeError):
+    """No se pudo iniciar o detener la grabacion; `status` es el codigo HTTP."""
+
+    def __init__(self, message: str, status: int = 500):
+        super().__init__(message)
+        self.status = status
+
+
+def start_recording(db: Database, recorder, title: str | None = None,
+                    sources: list | None = None) -> dict:
+    """Inicia una captura y registra la grabacion. Lo usan la API y la bandeja."""
+    if recorder.is_recording():
+        raise CaptureError("Ya hay una grabacion en curso", 400)
+    if shutil.disk_usage(config.DATA_DIR).free < MIN_FREE_BYTES:
+        raise CaptureError("Espacio en disco insuficiente (menos de 500MB)", 507)
+    try:
+        recording_id = recorder.start(sources)
+    except RuntimeError as e:
+        raise CaptureError(str(e)) from e
+
+    now = datetime.now(timezone.utc).isoformat()
+    title = title or f"Grabacion {datetime.now().strftime('%Y-%m-%d %H:%M')}"
+    rec = db.insert_recording(recording_id, title, now)
+    return rec
+
+
+def stop_recording(db: Database, recorder, jobs: JobQueue, finalizer: JobQueue) -> dict:
+    """Detiene la captura en curso; la mezcla y el MP3 quedan en `finalizer`."""
+    if not recorder.is_recording():
+        raise CaptureError("No hay grabacion en curso", 400)
+    try:
+        session = recorder.stop()
+    except RuntimeError as e:
+        raise CaptureError(str(e)) from e
+
+    recording_id = session.recording_id
+    rec = db.update_recording(
+        recording_id,
+        status="finalizing",
+        ended_at=datetime.now(timezone.utc).isoformat(),
+        duration_secs=int(session.elapsed_secs),
+    )
+    finalizer.submit(finalize_recording, db, recorder, jobs, session,
+                     name=f"finalize:{recording_id}")
+    return rec
+
+
+def finalize_recording(db: Database, recorder, jobs: JobQueue, session):
+    recording_id = session.recording_id
+    try:
+        result = recorder.finalize(session)
+        rec = db.update_recording(
+            recording_id,
+            status="stopped",
+            duration_secs=result["duration_secs"],
+            audio_path=result["path"],
+        )
+    except Exception as e:
+        logger.error("Error finalizando grabacion %s: %s", recording_id, e)
+        db.update_recording(recording_id, status="error", error_message=str(e))
+        return
+    try:
+        jobs.submit(ensure_speech_map, db, rec, priority=PRIORITY_LOW, name=f"speech:{recording_id}")
+    except RuntimeError:
+        # Shutting down: the speech map is computed on first use instead
+        pass
+
+
+def load_speech_map(rec: dict) -> dict | None:
+    if not rec.get("speech_path"):
+        return None
+    return speech.load(config.BASE_DIR / rec["speech_path"])
+
+
+def ensure_speech_map(db: Database, rec: dict) -> dict | None:
+    """Retorna el mapa de voz de la grabacion, calculandolo si aun no existe.
+    Si no se puede calcular se sigue sin mapa (la transcripcion usa su VAD).
+    """
+    rec = db.get_recording(rec["id"]) or rec
+    speech_map = load_speech_map(rec)
+    if speech_map is not None or not rec["audio_path"]:
+        return speech_map
+
+    audio_path = config.BASE_DIR / rec["audio_path"]
+    try:
+        with timeline.span("vad", audio_bytes=audio_path.stat().st_size) as attrs:
+            speech_map = speech.compute(audio_path)
+            attrs["speech_secs"] = round(speech_map["talk_time"]["total"], 1)
+    except Exception as e:
+        logger.warning("No se pudo calcular el mapa de voz de %s: %s", rec["id"], e)
+        return None
+
+    map_path = speech.map_path_for(audio_path)
+    speech.save(speech_map, map_path)
+    db.update_recording(rec["id"], speech_path=str(map_path.relative_to(config.BASE_DIR)))
+    logger.info("Mapa de voz de %s: %.0fs con voz de %.0fs",
+                rec["id"], speech_map["talk_time"]["total"], speech_map["duration"])
+    return speech_map
+
+
+def progress(recording_id: str) -> int | None:
+    """Porcentaje transcrito de una grabacion en curso, o None."""
+    fraction = _progress.get(recording_id)
+    return None if fraction is None else int(fraction * 100)
+
+
+def _run_transcriber(transcriber: Transcriber, rec: dict, output_dir: Path,
+                     speech_map: dict | None, profile: str) -> dict:
+    audio_path = config.BASE_DIR / rec["audio_path"]
+    _progress[rec["id"]] = 0.0
+    last_event = 0.0
+
+    def on_progress(fraction: float):
+        nonlocal last_event
+        _progress[rec["id"]] = fraction
+        # The detail view refreshes its progress and partial text on these
+        now = time.monotonic()
+        if now - last_event >= PROGRESS_EVENT_SECS:
+            last_event = now
+            events.publish("recording.progress", recording_id=rec["id"], progress=int(fraction * 100))
+
+    try:
+        return transcriber.transcribe(
+            str(audio_path), str(output_dir), speech_map=speech_map, profile=profile,
+            on_progress=on_progress,
+        )
+    finally:
+        _progress.pop(rec["id"], None)
+
+
+def journal_text(rec: dict) -> str | None:
+    """Texto transcrito hasta ahora por una transcripcion en curso."""
+    if not rec["audio_path"]:
+        return None
+    journal_path = config.TRANSCRIPTS_DIR / f"{Path(rec['audio_path']).stem}{JOURNAL_SUFFIX}"
+    try:
+        lines = journal_path.read_text(encoding="utf-8").splitlines()[1:]
+    except OSError:
+        return None
+    texts = []
+    for line in lines:
+        try:
+            texts.append(json.loads(line)["text"])
+        except (ValueError, KeyError):
+            break
+    return "\n".join(texts)
+
+
+def recover_interrupted(db: Database) -> int:
+    """Marca como error las transcripciones/actas que quedaron a medias por un
+    cierre inesperado. Al reintentar, la transcripcion retoma desde el diario.
+    """
+    interrupted = db.list_recordings_by_status(("transcribing", "summarizing"))
+    for rec in interrupted:
+        if rec["status"] == "transcribing":
+            message = "Transcripcion interrumpida; al reintentar se retoma desde el ultimo segmento"
+        else:
+            message = "Generacion del acta interrumpida"
+        db.update_recording(rec["id"], status="error", error_message=message)
+        logger.warning("%s: %s", rec["id"], message)
+
+    # Drafts whose background refinement died with the process
+    for rec in db.list_draft_recordings():
+        if not rec["error_message"]:
+            db.update_recording(rec["id"], error_message="Refinado interrumpido, se conserva el borrador")
+    return len(interrupted)
+
+
+def transcribe(db: Database, transcriber: Transcriber, rec: dict,
+               next_status: str = "transcribed", profile: str | None = None,
+               backlog: int = 0) -> dict:
+    """Transcribe la grabacion. `profile` es un perfil de decodificacion o
+    "auto"; `backlog` son los trabajos en espera que considera la politica auto.
+    """
+    speech_map = ensure_speech_map(db, rec)
+    profile = choose_profile(profile, rec["duration_secs"], backlog)
+    result = _run_transcriber(transcriber, rec, config.TRANSCRIPTS_DIR, speech_map, profile)
+    rel_path = str(Path(result["txt_path"]).relative_to(config.BASE_DIR))
+    return db.set_transcript(rec["id"], rel_path, status=next_status)
+
+
+def transcribe_group(db: Database, transcriber: Transcriber, recs: list[dict],
+                     next_statuses: list[str], profile: str = "fast") -> list[dict]:
+    """Transcribe varias grabaciones cortas en una sola pasada por lotes."""
+    items = [(config.BASE_DIR / rec["audio_path"], ensure_speech_map(db, rec)) for rec in recs]
+    for rec in recs:
+        _progress[rec["id"]] = 0.0
+    try:
+        results = transcriber.transcribe_many(items, str(config.TRANSCRIPTS_DIR), profile=profile)
+    finally:
+        for rec in recs:
+            _progress.pop(rec["id"], None)
+
+    updated = []
+    for rec, result, next_status in zip(recs, results, next_statuses):
+        rel_path = str(Path(result["txt_path"]).relative_to(config.BASE_DIR))
+        updated.append(db.set_transcript(rec["id"], rel_path, status=next_status))
+    return updated
+
+
+def draft_transcriber(transcriber: Transcriber) -> Transcriber:
+    return Transcriber(model_size=config.WHISPER_DRAFT_MODEL, language=transcriber.language,
+                       capture_active=transcriber.capture_active)
+
+
+def transcribe_two_pass(db: Database, transcriber: Transcriber, rec: dict, jobs: JobQueue,
+                        next_status: str = "draft_ready", profile: str | None = None,
+                        then=None) -> dict:
+    """Primera pasada: transcripcion borrador con el modelo pequenio.
+    El refinado con el modelo configurado queda en `jobs` con prioridad baja;
+    `then(rec)` se ejecuta cuando termina (por ejemplo, generar el acta).
+    """
+    result = _run_transcriber(draft_transcriber(transcriber), rec, config.TRANSCRIPTS_DIR,
+                              ensure_speech_map(db, rec), "fast")
+    rel_path = str(Path(result["txt_path"]).relative_to(config.BASE_DIR))
+    rec = db.set_transcript(rec["id"], rel_path, status=next_status, transcript_draft=1)
+    logger.info("Borrador de %s listo, refinando en segundo plano", rec["id"])
+    jobs.submit(refine, db, transcriber, rec, profile=profile, backlog=jobs.pending(),
+                then=then, priority=PRIORITY_LOW, name=f"refine:{rec['id']}")
+    return rec
+
+
+def refine(db: Database, transcriber: Transcriber, rec: dict, profile: str | None = None,
+           backlog: int = 0, then=None) -> dict | None:
+    """Segunda pasada: transcribe con el modelo configurado y reemplaza el
+    borrador. Si falla, el borrador se conserva.
+    """
+    staging_dir = config.TRANSCRIPTS_DIR / ".refine"
+    try:
+        result = _run_transcriber(transcriber, rec, staging_dir, ensure_speech_map(db, rec),
+                                  choose_profile(profile, rec["duration_secs"], backlog))
+    except Exception as e:
+        logger.error("Error refinando %s, se conserva el borrador: %s", rec["id"], e)
+        refined = False
+        error = f"No se pudo refinar la transcripcion, se conserva el borrador: {e}"
+    else:
+        refined = True
+
+    current = db.get_recording(rec["id"])
+    if (current is None or current["status"] == "transcribing"
+            or current["transcript_generation"] != rec["transcript_generation"]):
+        # Deleted, re-transcribed or being re-transcribed meanwhile: the refined text is stale
+        if refined:
+            for key in ("txt_path", "json_path", "srt_path", "vtt_path"):
+                Path(result[key]).unlink(missing_ok=True)
+        return None
+
+    if refined:
+        # Each file is replaced whole (readers never see a half-written file),
+        # but the four are swapped one after another, not as a set
+        txt_path = config.BASE_DIR / rec["transcript_path"]
+        for key, suffix in (("json_path", ".json"), ("srt_path", ".srt"), ("vtt_path", ".vtt")):
+            os.replace(result[key], txt_path.with_suffix(suffix))
+        os.replace(result["txt_path"], txt_path)
+        fields = {"transcript_draft": 0}
+        if current["status"] == "draft_ready" and then is None:
+            fields["status"] = "transcribed"
+        current = db.update_recording(rec["id"], **fields)
+        logger.info("Transcripcion de %s refinada", rec["id"])
+    else:
+        current = db.update_recording(rec["id"], error_message=error)
+
+    if then is not None:
+        then(current)
+    return current
+
+
+def decoding_info(rec: dict) -> dict | None:
+    """Perfil y factor de tiempo real de la ultima transcripcion."""
+    if not rec["transcript_path"]:
+        return None
+    data = filecache.read_json((config.BASE_DIR / rec["transcript_path"]).with_suffix(".json"))
+    return data.get("decoding") if data else None
+
+
+def compaction_info(rec: dict) -> dict | None:
+    """Reduccion de tokens de la transcripcion enviada al LLM para el acta."""
+    if not rec["summary_path"]:
+        return None
+    return filecache.read_json((config.BASE_DIR / rec["summary_path"]).with_suffix(COMPACT_STATS_SUFFIX))
+
+
+def summarize(db: Database, summarizer: Summarizer, rec: dict) -> dict:
+    txt_path = config.BASE_DIR / rec["transcript_path"]
+    result_path = summarizer.summarize(str(txt_path), str(config.SUMMARIES_DIR), recording_date(rec),
+                                       speech_map=load_speech_map(rec))
+    rel_path = str(Path(result_path).relative_to(config.BASE_DIR))
+    return db.update_recording(rec["id"], status="completed", summary_path=rel_path)
+
+
+def process(db: Database, transcriber: Transcriber, summarizer: Summarizer, rec: dict,
+            profile: str | None = None, backlog: int = 0) -> dict:
+    """Transcribe y genera el acta en secuencia."""
+    rec = transcribe(db, transcriber, rec, next_status="summarizing",
+                     profile=profile, backlog=backlog)
+    return summarize(db, summarizer, rec)
@@ -0,0 +1,190 @@
+"""Profiler por muestreo de los trabajos de procesamiento (opcional).
+
+Con `CALLSCRIBE_PROFILE_JOBS=1` cada trabajo en segundo plano de una
+grabacion (finalizar, importar, transcribir, refinar, acta...) se muestrea
+cada `CALLSCRIBE_PROFILE_INTERVAL_MS`: un unico hilo lee la pila de los hilos
+registrados con `sys._current_frames()`, sin instrumentar el codigo, asi que
+el coste es el de una lectura de pilas por intervalo.
+
+El resultado se guarda en `data/profiles/<id>/<etapa>.folded` en formato de
+pilas colapsadas (`raiz;...;hoja N`), el que leen flamegraph.pl, speedscope e
+Inferno, con un `<etapa>.json` de metadatos al lado. Los hilos auxiliares de
+un trabajo (las llamadas al LLM) se suman al perfil con `bind()`.
+"""
+import json
+import logging
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+
+import config
+
+logger = logging.getLogger(__name__)
+
+FOLDED_SUFFIX = ".folded"
+STAGE_RE = re.compile(r"^\w+$")
+
+
+class Profile:
+    def __init__(self, recording_id: str, stage: str):
+        self.recording_id = recording_id
+        self.stage = stage
+        self.started_at = datetime.now(timezone.utc).isoformat()
+        self.started_mono = time.monotonic()
+        self.stacks: Counter[str] = Counter()
+        self.samples = 0
+        # Thread ident -> thread name, for every thread sampled into this profile
+        self.threads: dict[int, str] = {}
+
+
+_active: dict[int, Profile] = {}
+_local = threading.local()
+_lock = threading.Lock()
+_sampler: threading.Thread | None = None
+
+
+def enabled() -> bool:
+    return config.PROFILE_JOBS
+
+
+def current() -> Profile | None:
+    """Perfil en curso en este hilo, para pasarlo a hilos auxiliares."""
+    return getattr(_local, "profile", None)
+
+
+def _frame_label(code) -> str:
+    path = Path(code.co_filename)
+    try:
+        where = path.relative_to(config.BASE_DIR).as_posix()
+    except ValueError:
+        # Libraries: keep the package and the file
+        where = "/".join(path.parts[-2:])
+    return f"{code.co_name} ({where}:{code.co_firstlineno})".replace(";", ",")
+
+
+def _collapse(frame, thread_name: str) -> str:
+    labels = []
+    while frame is not None:
+        labels.append(_frame_label(frame.f_code))
+        frame = frame.f_back
+    labels.append(thread_name)
+    return ";".join(reversed(labels))
+
+
+def _sample_loop():
+    global _sampler
+    interval = max(1, config.PROFILE_INTERVAL_MS) / 1000
+    while True:
+        time.sleep(interval)
+        with _lock:
+            if not _active:
+                _sampler = None
+                return
+            frames = sys._current_frames()  # noqa: SLF001
+            for ident, profile in _active.items():
+                frame = frames.get(ident)
+                if frame is not None:
+                    profile.stacks[_collapse(frame, profile.threads[ident])] += 1
+                    profile.samples += 1
+
+
+def _register(profile: Profile):
+    global _sampler
+    thread = threading.current_thread()
+    with _lock:
+        _active[thread.ident] = profile
+        profile.threads[thread.ident] = thread.name
+        if _sampler is None:
+            _sampler = threading.Thread(target=_sample_loop, name="job-profiler", daemon=True)
+            _sampler.start()
+    _local.profile = profile
+
+
+def _unregister(previous: Profile | None):
+    with _lock:
+        _active.pop(threading.get_ident(), None)
+    _local.profile = previous
+
+
+@contextmanager
+def bind(profile: Profile | None):
+    """Suma el hilo actual al perfil de otro hilo mientras dura el bloque."""
+    if profile is None:
+        yield
+        return
+    previous = current()
+    _register(profile)
+    try:
+        yield
+    finally:
+        if previous is not None:
+            _register(previous)
+        else:
+            _unregister(None)
+
+
+@contextmanager
+def profile(recording_id: str, stage: str):
+    """Muestrea el bloque y guarda el perfil de la etapa de esa grabacion.
+    Sin profiling activado, o dentro de otro perfil, no hace nada.
+    """
+    if not enabled() or current() is not None:
+        yield
+        return
+    prof = Profile(recording_id, stage)
+    _register(prof)
+    try:
+        yield
+    finally:
+        _unregister(None)
+        # Helper threads still bound to this profile stop being sampled too
+        with _lock:
+            for ident in [i for i, p in _active.items() if p is prof]:
+                _active.pop(ident)
+        try:
+            _save(prof, time.monotonic() - prof.started_mono)
+        except OSError as e:
+            logger.warning("No se pudo guardar el perfil %s/%s: %s", recording_id, stage, e)
+
+
+def _save(prof: Profile, wall_secs: float):
+    out_dir = config.PROFILES_DIR / prof.recording_id
+    out_dir.mkdir(parents=True, exist_ok=True)
+    folded = "".join(f"{stack} {count}\n" for stack, count in prof.stacks.most_common())
+    (out_dir / f"{prof.stage}{FOLDED_SUFFIX}").write_text(folded, encoding="utf-8")
+    meta = {
+        "stage": prof.stage,
+        "started_at": prof.started_at,
+        "wall_secs": round(wall_secs, 3),
+        "samples": prof.samples,
+        "interval_ms": config.PROFILE_INTERVAL_MS,
+        "threads": sorted(set(prof.threads.values())),
+    }
+    (out_dir / f"{prof.stage}.json").write_text(json.dumps(meta, indent=2), encoding="utf-8")
+    logger.info("Perfil %s/%s: %d muestras en %.1fs", prof.recording_id, prof.stage,
+                prof.samples, wall_secs)
+
+
+def list_profiles(recording_id: str) -> list[dict]:
+    out_dir = config.PROFILES_DIR / recording_id
+    if not out_dir.is_dir():
+        return []
+    profiles = []
+    for meta_path in sorted(out_dir.glob("*.json")):
+        try:
+            profiles.append(json.loads(meta_path.read_text(encoding="utf-8")))
+        except (OSError, ValueError):
+            continue
+    return sorted(profiles, key=lambda p: p["started_at"])
+
+
+def folded_path(recording_id: str, stage: str) -> Path | None:
+    if not STAGE_RE.match(stage):
+        return None
+    path = config.PROFILES_DIR / recording_id / f"{stage}{FOLDED_SUFFIX}"
+    return path if path.exists() else None
@@ -2,10 +2,16 @@ SUMMARY_SYSTEM_PROMPT = """Eres un asistente especializado en generar actas de \
 reuniones. Genera actas claras, concisas y bien estructuradas en espanol. \
 No uses emojis. No inventes informacion que no este en la transcripcion."""
 
-SUMMARY_USER_PROMPT = """A partir de la siguiente transcripcion de una llamada, \
-genera un acta de reunion con el siguiente formato exacto en Markdown:
+# Static instructions: they go right after the system prompt so every call
+# (chunks, consolidation, other recordings) shares the same prefix, which Ollama
+# reuses while the model stays loaded. Anthropic does not cache it: it is well
+# below the API's 1024-token minimum for prompt caching.
+# Anything that varies per call belongs in SUMMARY_USER_PROMPT.
+SUMMARY_INSTRUCTIONS = """A partir de la transcripcion de una llamada que se \
+indica al final, genera un acta de reunion con el siguiente formato exacto en \
+Markdown:
 
-# Acta de Reunion - {fecha}
+# Acta de Reunion - [fecha de la llamada]
 
 ## Participantes
 - Lista de participantes identificados (si no se pueden identificar, indicar \
@@ -40,6 +46,12 @@ Si no se asignaron tareas, indicar "No se asignaron tareas explicitas."
 anteriores.
 - Si no hay notas adicionales, omitir esta seccion.
 
+Responde solo con el acta."""
+
+SUMMARY_PREFIX = f"{SUMMARY_SYSTEM_PROMPT}\n\n{SUMMARY_INSTRUCTIONS}"
+
+SUMMARY_USER_PROMPT = """Fecha de la llamada: {fecha}
+
 ---
 Transcripcion:
 {transcription}"""
@@ -0,0 +1,193 @@
+"""Mapa de actividad de voz por grabacion.
+
+Se calcula una vez (al finalizar una grabacion o al importar un archivo) con
+el VAD Silero incluido en faster-whisper y se guarda como JSON. Lo reutilizan
+la transcripcion (para no decodificar silencio ni repetir el VAD al cambiar de
+modelo), el troceo de transcripciones largas para el LLM y el reporte de tiempo
+de habla por canal.
+"""
+import json
+import logging
+from pathlib import Path
+
+import config
+from processing import audio_stream
+
+logger = logging.getLogger(__name__)
+
+MAP_VERSION = 1
+# Speech regions closer than this are merged into one
+MERGE_GAP_SECS = 0.5
+# Padding kept around each region so word edges are not clipped
+PAD_SECS = 0.2
+
+
+def map_path_for(audio_path: Path) -> Path:
+    return config.SPEECH_DIR / f"{Path(audio_path).stem}.speech.json"
+
+
+def detect_regions(audio, rate: int) -> list[list[float]]:
+    from faster_whisper.vad import VadOptions, get_speech_timestamps
+
+    stamps = get_speech_timestamps(audio, VadOptions(speech_pad_ms=int(PAD_SECS * 1000)))
+    return merge([[s["start"] / rate, s["end"] / rate] for s in stamps])
+
+
+def merge(regions: list[list[float]], gap: float = MERGE_GAP_SECS) -> list[list[float]]:
+    merged: list[list[float]] = []
+    for start, end in sorted(regions):
+        if merged and start - merged[-1][1] <= gap:
+            merged[-1][1] = max(merged[-1][1], end)
+        else:
+            merged.append([start, end])
+    return [[round(s, 2), round(e, 2)] for s, e in merged]
+
+
+def _talk_time(regions: list[list[float]]) -> float:
+    return round(sum(e - s for s, e in regions), 1)
+
+
+def _stereo_windows(audio_path: Path, rate: int):
+    """(inicio, izquierdo, derecho) del archivo: de una vez si es corto, por
+    ventanas de ffmpeg si es largo para no cargarlo entero en memoria.
+    """
+    duration = audio_stream.probe_duration(audio_path)
+    if duration is None or duration <= config.STREAM_DECODE_SECS:
+        from faster_whisper.audio import decode_audio
+
+        left, right = decode_audio(str(audio_path), sampling_rate=rate, split_stereo=True)
+        yield 0.0, left, right
+        return
+    with audio_stream.PcmStream(audio_path, rate, channels=2) as stream:
+        for offset, audio, _ in stream.windows(config.DECODE_WINDOW_SECS):
+            yield offset, audio[:, 0], audio[:, 1]
+
+
+def compute(audio_path: Path) -> dict:
+    """Calcula el mapa de voz de un archivo (stereo: loopback a la izquierda, mic a la derecha)."""
+    import numpy as np
+
+    rate = config.SAMPLE_RATE
+    left_regions, right_regions = [], []
+    mono = True
+    frames = 0
+    for offset, left, right in _stereo_windows(Path(audio_path), rate):
+        # Mono source: both channels were duplicated by the decoder
+        same = np.array_equal(left, right)
+        mono = mono and same
+        found = [[offset + s, offset + e] for s, e in detect_regions(left, rate)]
+        left_regions += found
+        right_regions += found if same else [[offset + s, offset + e]
+                                             for s, e in detect_regions(right, rate)]
+        frames += len(left)
+    duration = round(frames / rate, 2)
+
+    # Regions cut at a window edge are joined again by merge()
+    if mono:
+        channels = {"mix": merge(left_regions)}
+    else:
+        channels = {"loopback": merge(left_regions), "mic": merge(right_regions)}
+
+    speech = merge([r for regions in channels.values() for r in regions])
+    return {
+        "version": MAP_VERSION,
+        "duration": duration,
+        "speech": speech,
+        "channels": channels,
+        "talk_time": {
+            **{name: _talk_time(regions) for name, regions in channels.items()},
+            "total": _talk_time(speech),
+        },
+    }
+
+
+def save(speech_map: dict, path: Path):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(speech_map), encoding="utf-8")
+
+
+def load(path: Path | None) -> dict | None:
+    if path is None or not path.exists():
+        return None
+    try:
+        speech_map = json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+    return speech_map if speech_map.get("version") == MAP_VERSION else None
+
+
+def collect(audio, regions: list[list[float]], rate: int):
+    """Concatena solo las regiones con voz.
+    Retorna (audio recortado, offsets) para restaurar los tiempos originales.
+    """
+    import numpy as np
+
+    parts = []
+    offsets = []  # (start in clipped audio, start in original audio)
+    clipped_pos = 0
+    for start, end in regions:
+        a, b = int(start * rate), min(len(audio), int(end * rate))
+        if b <= a:
+            continue
+        offsets.append((clipped_pos / rate, start))
+        parts.append(audio[a:b])
+        clipped_pos += b - a
+    clipped = np.concatenate(parts) if parts else np.zeros(0, dtype=np.float32)
+    return clipped, offsets
+
+
+def restore(t: float, offsets: list[tuple[float, float]]) -> float:
+    """Convierte un tiempo del audio recortado al tiempo de la grabacion original."""
+    original = t
+    for clipped_start, original_start in offsets:
+        if clipped_start > t:
+            break
+        original = original_start + (t - clipped_start)
+    return original
+
+
+def trim(regions: list[list[float]], start_secs: float) -> list[list[float]]:
+    """Regiones a partir de start_secs (la primera se recorta si lo cruza)."""
+    return [[max(start, start_secs), end] for start, end in regions if end > start_secs]
+
+
+def split_regions(regions: list[list[float]], max_secs: float) -> list[list[float]]:
+    """Parte las regiones mas largas que max_secs en trozos consecutivos."""
+    result = []
+    for start, end in regions:
+        while end - start > max_secs:
+            result.append([start, start + max_secs])
+            start += max_secs
+        result.append([start, end])
+    return result
+
+
+def split_at_pauses(speech_map: dict, max_secs: float) -> list[tuple[float, float]]:
+    """Divide la grabacion en tramos de como mucho max_secs de duracion,
+    cortando en la pausa mas larga disponible del ultimo tercio de cada tramo.
+    """
+    regions = speech_map["speech"]
+    if not regions:
+        return []
+
+    ranges = []
+    start = regions[0][0]
+    i = 0
+    while i < len(regions):
+        # Regions that fit in the current window
+        j = i
+        while j + 1 < len(regions) and regions[j + 1][1] - start <= max_secs:
+            j += 1
+        if j + 1 >= len(regions):
+            ranges.append((start, regions[-1][1]))
+            break
+
+        # Longest pause among the cut candidates in the last third of the window
+        candidates = [
+            k for k in range(i, j + 1) if regions[k][1] - start >= max_secs * 2 / 3
+        ] or [j]
+        cut = max(candidates, key=lambda k: regions[k + 1][0] - regions[k][1])
+        ranges.append((start, regions[cut][1]))
+        i = cut + 1
+        start = regions[i][0]
+    return ranges
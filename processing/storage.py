@@ -0,0 +1,368 @@
+import logging
+import re
+import shutil
+import threading
+import time
+import wave
+from datetime import datetime, timezone
+from pathlib import Path
+
+import config
+from db.database import Database
+from processing import pipeline, timeline
+from processing.jobs import RECORDING_ID_PATTERN
+from processing.summarizer import COMPACT_STATS_SUFFIX, COMPACT_TEXT_SUFFIX
+from processing.transcriber import JOURNAL_SUFFIX
+from recorder.mixer import encode_speech, mix_sources, repair_wav_header, wav_to_mp3
+from recorder.sources import Source, default_sources, load_manifest, manifest_path, mix_inputs
+
+logger = logging.getLogger(__name__)
+
+# Temporary capture files: <id>_<source>.wav per source, <id>_stereo.wav and
+# the <id>_sources.json manifest
+TEMP_RE = re.compile(rf"^({RECORDING_ID_PATTERN})_(\w+)$")
+COMPACT_SUFFIX = ".opus"
+
+
+def audio_media_type(path: Path) -> str:
+    return "audio/ogg" if path.suffix == COMPACT_SUFFIX else "audio/mpeg"
+
+
+def recording_files(rec: dict) -> dict[str, list[Path]]:
+    """Archivos de una grabacion agrupados por tipo."""
+    files = {"audio": [], "transcript": [], "summary": [], "other": []}
+    if rec["audio_path"]:
+        files["audio"].append(config.BASE_DIR / rec["audio_path"])
+        stem = Path(rec["audio_path"]).stem
+        files["other"].append(config.TRANSCRIPTS_DIR / f"{stem}{JOURNAL_SUFFIX}")
+    if rec["transcript_path"]:
+        txt_path = config.BASE_DIR / rec["transcript_path"]
+        files["transcript"] += [txt_path] + [
+            txt_path.with_suffix(s) for s in (".json", ".srt", ".vtt")
+        ]
+    if rec["summary_path"]:
+        summary_path = config.BASE_DIR / rec["summary_path"]
+        files["summary"].append(summary_path)
+        files["other"] += [summary_path.with_suffix(s)
+                           for s in (COMPACT_TEXT_SUFFIX, COMPACT_STATS_SUFFIX)]
+    if rec["speech_path"]:
+        files["other"].append(config.BASE_DIR / rec["speech_path"])
+    # Job profiles, only present with CALLSCRIBE_PROFILE_JOBS
+    files["other"] += sorted((config.PROFILES_DIR / rec["id"]).glob("*"))
+    files["other"].append(timeline.timeline_path(rec["id"]))
+    return files
+
+
+def delete_files(rec: dict, kinds: tuple[str, ...] = ("audio", "transcript", "summary", "other")):
+    files = recording_files(rec)
+    for kind in kinds:
+        for path in files[kind]:
+            path.unlink(missing_ok=True)
+    if "other" in kinds:
+        shutil.rmtree(config.PROFILES_DIR / rec["id"], ignore_errors=True)
+
+
+def _size(path: Path) -> int:
+    try:
+        return path.stat().st_size
+    except OSError:
+        return 0
+
+
+def _age_days(rec: dict, now: datetime) -> float:
+    started = datetime.fromisoformat(rec["started_at"])
+    if started.tzinfo is None:
+        started = started.replace(tzinfo=timezone.utc)
+    return (now - started).total_seconds() / 86400
+
+
+class StorageCompactor:
+    """Mantenimiento del almacenamiento en segundo plano.
+
+    Al iniciar recupera (o elimina) los WAV temporales de capturas
+    interrumpidas. Luego, cada `interval_secs`: recodifica a Opus las
+    grabaciones con mas de `compact_after_days`, aplica las reglas de
+    retencion y actualiza el indice de uso de disco por grabacion. Nunca toca
+    grabaciones con un trabajo en curso y no recodifica mientras se graba.
+    """
+
+    def __init__(self, db: Database, capture_active=None, interval_secs: float = 3600,
+                 compact_after_days: int = 30, compact_bitrate: str = "24k",
+                 retention_audio_days: int = 0, retention_days: int = 0,
+                 storage_limit_mb: int = 0):
+        self.db = db
+        self.capture_active = capture_active
+        self.interval_secs = interval_secs
+        self.compact_after_days = compact_after_days
+        self.compact_bitrate = compact_bitrate
+        self.retention_audio_days = retention_audio_days
+        self.retention_days = retention_days
+        self.storage_limit_mb = storage_limit_mb
+        self.last_run: dict | None = None
+        self._run_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._wake = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="storage-compactor", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+        if self._thread:
+            self._thread.join(timeout=5)
+
+    def trigger(self):
+        """Adelanta la proxima pasada."""
+        self._wake.set()
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.run_once()
+            except Exception as e:
+                logger.error("Error en el mantenimiento de almacenamiento: %s", e)
+            self._wake.wait(self.interval_secs)
+            self._wake.clear()
+
+    def _capturing(self) -> bool:
+        return self.capture_active is not None and self.capture_active()
+
+    # -- Startup recovery --
+
+    def recover_orphans(self) -> dict:
+        """Recupera las capturas que quedaron a medias en un cierre inesperado.
+        Debe llamarse antes de empezar a grabar.
+        """
+        result = {"recovered": [], "removed": [], "failed": []}
+        temps: dict[str, dict[str, Path]] = {}
+        for path in [*config.RECORDINGS_DIR.glob("*.wav"), *config.RECORDINGS_DIR.glob("*_sources.json")]:
+            match = TEMP_RE.match(path.stem)
+            if match:
+                temps.setdefault(match.group(1), {})[match.group(2)] = path
+
+        for recording_id, files in temps.items():
+            rec = self.db.get_recording(recording_id)
+            audio_ok = bool(
+                rec and rec["audio_path"] and (config.BASE_DIR / rec["audio_path"]).exists()
+            )
+            if not audio_ok:
+                try:
+                    self._recover(recording_id, rec, files)
+                    result["recovered"].append(recording_id)
+                except Exception as e:
+                    logger.error("No se pudo recuperar la captura %s: %s", recording_id, e)
+                    if rec:
+                        self.db.update_recording(recording_id, status="error",
+                                                 error_message=f"Captura no recuperable: {e}")
+                    result["failed"].append(recording_id)
+                    continue
+            else:
+                result["removed"].append(recording_id)
+            for path in files.values():
+                path.unlink(missing_ok=True)
+
+        # Conversions of imported .mp3 files cut short by the crash
+        for path in config.RECORDINGS_DIR.glob(f"*{pipeline.IMPORT_TEMP_SUFFIX}"):
+            path.unlink(missing_ok=True)
+
+        # Rows left mid-capture with nothing on disk to recover
+        for rec in self.db.list_recordings_by_status(("recording", "finalizing")):
+            mp3_path = config.RECORDINGS_DIR / f"{rec['id']}.mp3"
+            if rec["id"] in temps:
+                continue
+            if mp3_path.exists():
+                # Finalize got as far as the MP3 before the process died
+                self.db.update_recording(rec["id"], status="stopped",
+                                         audio_path=str(mp3_path.relative_to(config.BASE_DIR)))
+                result["recovered"].append(rec["id"])
+            else:
+                self.db.update_recording(
+                    rec["id"], status="error",
+                    error_message="Grabacion interrumpida sin audio recuperable",
+                )
+                result["failed"].append(rec["id"])
+
+        shutil.rmtree(config.TRANSCRIPTS_DIR / ".refine", ignore_errors=True)
+        if any(result.values()):
+            logger.info("Capturas interrumpidas: %d recuperadas, %d temporales eliminados, %d perdidas",
+                        len(result["recovered"]), len(result["removed"]), len(result["failed"]))
+        return result
+
+    def _recover(self, recording_id: str, rec: dict | None, files: dict[str, Path]):
+        usable = {name: path for name, path in files.items()
+                  if path.suffix == ".wav" and repair_wav_header(path)}
+        if not usable:
+            raise ValueError("los temporales no contienen audio")
+
+        # Remix from the sources when present: a stereo file may be half-written
+        sources_wav = {name: path for name, path in usable.items() if name != "stereo"}
+        if sources_wav:
+            stereo_wav = config.RECORDINGS_DIR / f"{recording_id}_stereo.wav"
+            sources, offsets = self._capture_sources(recording_id, sources_wav)
+            mix_sources(mix_inputs(sources, sources_wav, offsets), stereo_wav)
+            files["stereo"] = stereo_wav
+        else:
+            stereo_wav = usable["stereo"]
+
+        mp3_path = config.RECORDINGS_DIR / f"{recording_id}.mp3"
+        wav_to_mp3(stereo_wav, mp3_path)
+        with wave.open(str(stereo_wav), "rb") as wf:
+            duration_secs = wf.getnframes() // wf.getframerate()
+
+        if rec is None:
+            started_at = datetime.fromtimestamp(
+                min(p.stat().st_mtime for p in usable.values()) - duration_secs, timezone.utc
+            ).isoformat()
+            self.db.insert_recording(recording_id, f"Recuperada - {started_at[:16]}", started_at)
+        self.db.update_recording(
+            recording_id,
+            status="stopped",
+            duration_secs=duration_secs,
+            audio_path=str(mp3_path.relative_to(config.BASE_DIR)),
+            error_message="Recuperada tras un cierre inesperado",
+        )
+        logger.info("Captura %s recuperada (%ds)", recording_id, duration_secs)
+
+    @staticmethod
+    def _capture_sources(recording_id: str, wavs: dict[str, Path]) -> tuple[list[Source], dict]:
+        """Fuentes de una captura segun su manifiesto; sin el (capturas
+        anteriores), loopback a la izquierda y el resto a la derecha.
+        """
+        manifest = load_manifest(manifest_path(config.RECORDINGS_DIR, recording_id))
+        sources, offsets = manifest or (default_sources(), {})
+        known = {s.name for s in sources}
+        sources += [Source(name, "input") for name in wavs if name not in known]
+        return sources, offsets
+
+    # -- Periodic pass --
+
+    def run_once(self) -> dict:
+        with self._run_lock:
+            start = time.monotonic()
+            stats = {"compacted": 0, "audio_removed": 0, "recordings_removed": 0, "freed_bytes": 0}
+            now = datetime.now(timezone.utc)
+            for rec in self.db.list_recordings():
+                if rec["status"] in pipeline.BUSY_STATUSES or rec["status"] == "draft_ready":
+                    continue
+                self._apply_rules(rec, now, stats)
+            self._enforce_limit(stats)
+            self.refresh_index()
+            stats["duration_secs"] = round(time.monotonic() - start, 1)
+            stats["finished_at"] = now.isoformat()
+            self.last_run = stats
+            if stats["compacted"] or stats["audio_removed"] or stats["recordings_removed"]:
+                logger.info("Almacenamiento: %s", stats)
+            return stats
+
+    def _apply_rules(self, rec: dict, now: datetime, stats: dict):
+        age = _age_days(rec, now)
+        if self.retention_days and age >= self.retention_days:
+            stats["freed_bytes"] += self._total_bytes(rec)
+            delete_files(rec)
+            self.db.delete_recording(rec["id"])
+            stats["recordings_removed"] += 1
+            return
+
+        # Audio is only dropped once it has a transcript
+        if (self.retention_audio_days and age >= self.retention_audio_days
+                and rec["audio_path"] and rec["transcript_path"]):
+            self._drop_audio(rec, stats)
+            return
+
+        if (self.compact_after_days and age >= self.compact_after_days and rec["audio_path"]
+                and not rec["audio_path"].endswith(COMPACT_SUFFIX) and not self._capturing()):
+            self._compact(rec, stats)
+
+    def _drop_audio(self, rec: dict, stats: dict):
+        audio_path = config.BASE_DIR / rec["audio_path"]
+        stats["freed_bytes"] += _size(audio_path)
+        audio_path.unlink(missing_ok=True)
+        self.db.update_recording(rec["id"], audio_path=None)
+        stats["audio_removed"] += 1
+
+    def _compact(self, rec: dict, stats: dict):
+        src = config.BASE_DIR / rec["audio_path"]
+        if not src.exists():
+            return
+        dst = src.with_suffix(COMPACT_SUFFIX)
+        try:
+            encode_speech(src, dst, self.compact_bitrate)
+        except Exception as e:
+            dst.unlink(missing_ok=True)
+            logger.warning("No se pudo recodificar %s: %s", rec["id"], e)
+            return
+
+        # A job may have started on this recording while encoding
+        current = self.db.get_recording(rec["id"])
+        if current is None or current["status"] in pipeline.BUSY_STATUSES \
+                or current["audio_path"] != rec["audio_path"]:
+            dst.unlink(missing_ok=True)
+            return
+
+        self.db.update_recording(rec["id"], audio_path=str(dst.relative_to(config.BASE_DIR)))
+        freed = _size(src) - _size(dst)
+        try:
+            src.unlink()
+        except OSError as e:
+            # Still open elsewhere (Windows): freed on a later pass as an orphan
+            logger.warning("No se pudo borrar %s: %s", src.name, e)
+        stats["compacted"] += 1
+        stats["freed_bytes"] += max(0, freed)
+        logger.info("%s recodificada a Opus (%.1f MB liberados)", rec["id"], freed / 1e6)
+
+    def _enforce_limit(self, stats: dict):
+        """Con un limite de espacio, borra el audio de las grabaciones
+        transcritas mas antiguas hasta quedar por debajo.
+        """
+        if not self.storage_limit_mb:
+            return
+        recordings = sorted(self.db.list_recordings(), key=lambda r: r["started_at"])
+        total = sum(self._total_bytes(r) for r in recordings)
+        limit = self.storage_limit_mb * 1024 * 1024
+        for rec in recordings:
+            if total <= limit:
+                break
+            if (rec["audio_path"] and rec["transcript_path"]
+                    and rec["status"] not in pipeline.BUSY_STATUSES):
+                before = stats["freed_bytes"]
+                self._drop_audio(rec, stats)
+                total -= stats["freed_bytes"] - before
+
+    # -- Disk usage index --
+
+    def _usage(self, rec: dict) -> dict:
+        return {kind: sum(_size(p) for p in paths) for kind, paths in recording_files(rec).items()}
+
+    def _total_bytes(self, rec: dict) -> int:
+        return sum(self._usage(rec).values())
+
+    def index_recording(self, rec: dict):
+        usage = self._usage(rec)
+        self.db.upsert_storage_usage(
+            rec["id"], usage["audio"], usage["transcript"], usage["summary"], usage["other"],
+        )
+
+    def refresh_index(self):
+        for rec in self.db.list_recordings():
+            self.index_recording(rec)
+
+    def summary(self) -> dict:
+        rows = self.db.list_storage_usage()
+        disk = shutil.disk_usage(config.DATA_DIR)
+        kinds = ("audio_bytes", "transcript_bytes", "summary_bytes", "other_bytes")
+        return {
+            "total_bytes": sum(r[k] for r in rows for k in kinds),
+            "by_kind": {k: sum(r[k] for r in rows) for k in kinds},
+            "free_bytes": disk.free,
+            "recordings": [{**r, "total_bytes": sum(r[k] for k in kinds)} for r in rows],
+            "last_run": self.last_run,
+            "rules": {
+                "compact_after_days": self.compact_after_days,
+                "retention_audio_days": self.retention_audio_days,
+                "retention_days": self.retention_days,
+                "storage_limit_mb": self.storage_limit_mb,
+            },
+        }
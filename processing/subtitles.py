@@ -0,0 +1,35 @@
+"""Subtitulos SRT/VTT a partir de los segmentos de una transcripcion."""
+
+
+def _timestamp(secs: float, separator: str) -> str:
+    millis = int(round(secs * 1000))
+    h, rest = divmod(millis, 3600_000)
+    m, rest = divmod(rest, 60_000)
+    s, ms = divmod(rest, 1000)
+    return f"{h:02d}:{m:02d}:{s:02d}{separator}{ms:03d}"
+
+
+def srt_cue(index: int, segment: dict) -> str:
+    return (
+        f"{index}\n"
+        f"{_timestamp(segment['start'], ',')} --> {_timestamp(segment['end'], ',')}\n"
+        f"{segment['text']}\n\n"
+    )
+
+
+def vtt_cue(segment: dict) -> str:
+    return (
+        f"{_timestamp(segment['start'], '.')} --> {_timestamp(segment['end'], '.')}\n"
+        f"{segment['text']}\n\n"
+    )
+
+
+VTT_HEADER = "WEBVTT\n\n"
+
+
+def to_srt(segments: list[dict]) -> str:
+    return "".join(srt_cue(i, seg) for i, seg in enumerate(segments, start=1))
+
+
+def to_vtt(segments: list[dict]) -> str:
+    return VTT_HEADER + "".join(vtt_cue(seg) for seg in segments)
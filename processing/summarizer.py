@@ -1,28 +1,94 @@
+import json
 import logging
+import threading
+from contextlib import contextmanager
 from pathlib import Path
 
 import requests
 
-from processing.prompts import SUMMARY_SYSTEM_PROMPT, SUMMARY_USER_PROMPT
+from processing import compaction, speech, timeline
+from processing.llm_router import CallContext, ProviderRouter
+from processing.prompts import SUMMARY_PREFIX, SUMMARY_USER_PROMPT
 
 logger = logging.getLogger(__name__)
 
 MAX_TRANSCRIPT_CHARS = 100_000
+COMPACT_TEXT_SUFFIX = ".compact.txt"
+COMPACT_STATS_SUFFIX = ".compaction.json"
 
 
 class Summarizer:
     def __init__(self, provider: str = "anthropic", api_key: str = None,
-                 model: str = None, ollama_url: str = None, ollama_model: str = None):
+                 model: str = None, ollama_url: str = None, ollama_model: str = None,
+                 compact: bool = True, minute_markers: bool = True,
+                 hedge_after_secs: float = 0, breaker_failures: int = 3,
+                 breaker_cooldown_secs: float = 300, idle_timeout_secs: float = 120,
+                 keep_alive: str = "30m", idle_keep_alive: str = "5m"):
         self.provider = provider
         self.api_key = api_key
         self.model = model
         self.ollama_url = ollama_url or "http://localhost:11434"
         self.ollama_model = ollama_model or "llama3"
+        self.compact = compact
+        self.minute_markers = minute_markers
+        self.idle_timeout_secs = idle_timeout_secs
+        self.keep_alive = keep_alive
+        self.idle_keep_alive = idle_keep_alive
+        self._active_jobs = 0
+        self._jobs_lock = threading.Lock()
+        self.router = ProviderRouter(self._providers(), hedge_after_secs=hedge_after_secs,
+                                     failure_threshold=breaker_failures,
+                                     cooldown_secs=breaker_cooldown_secs)
+
+    def _providers(self) -> list[tuple[str, callable]]:
+        """Orden de proveedores: el configurado primero. Anthropic solo entra con
+        API key, y como proveedor principal no cae a Ollama (como hasta ahora).
+        """
+        anthropic_ = ("anthropic", self._call_anthropic)
+        ollama = ("ollama", self._call_ollama)
+        if self.provider == "anthropic" and self.api_key:
+            return [anthropic_]
+        return [ollama, anthropic_] if self.api_key else [ollama]
+
+    def stats(self) -> dict:
+        return self.router.stats()
 
     def summarize(self, transcript_path: str, output_dir: str,
-                  recording_date: str) -> str:
-        transcript_path = Path(transcript_path)
-        output_dir = Path(output_dir)
+                  recording_date: str, speech_map: dict | None = None) -> str:
+        with self._keep_warm():
+            return self._summarize(Path(transcript_path), Path(output_dir),
+                                   recording_date, speech_map)
+
+    @contextmanager
+    def _keep_warm(self):
+        """Mientras haya actas en curso las llamadas a Ollama piden keep_alive
+        largo para que el modelo no se descargue entre partes; al terminar la
+        ultima se vuelve al keep_alive normal.
+        """
+        with self._jobs_lock:
+            self._active_jobs += 1
+        try:
+            yield
+        finally:
+            with self._jobs_lock:
+                self._active_jobs -= 1
+                last = self._active_jobs == 0
+            if last and "ollama" in self.router.health:
+                threading.Thread(target=self._release_ollama, daemon=True).start()
+
+    def _release_ollama(self):
+        if not self.router.health["ollama"].available():
+            return
+        try:
+            # A request without prompt only updates the model's keep_alive
+            requests.post(f"{self.ollama_url}/api/generate",
+                          json={"model": self.ollama_model, "keep_alive": self.idle_keep_alive},
+                          timeout=(5, 30))
+        except Exception as e:
+            logger.debug("No se pudo actualizar keep_alive de Ollama: %s", e)
+
+    def _summarize(self, transcript_path: Path, output_dir: Path,
+                   recording_date: str, speech_map: dict | None) -> str:
         output_dir.mkdir(parents=True, exist_ok=True)
 
         transcript = transcript_path.read_text(encoding="utf-8")
@@ -30,26 +96,78 @@ class Summarizer:
             raise ValueError("La transcripcion esta vacia")
 
         output_path = output_dir / f"{transcript_path.stem}.md"
+        segments = self._load_segments(transcript_path)
+        paragraphs = None
+        if self.compact:
+            with timeline.span("compaction") as attrs:
+                transcript, paragraphs, stats = compaction.compact(
+                    transcript, segments, speech_map, self.minute_markers)
+                self._write_compaction(output_dir, transcript_path.stem, transcript, stats)
+                attrs.update(raw_tokens=stats["raw_tokens"], compact_tokens=stats["compact_tokens"])
 
         if len(transcript) > MAX_TRANSCRIPT_CHARS:
-            summary = self._summarize_long(transcript, recording_date)
+            chunks = self._split_transcript(transcript, segments, paragraphs, speech_map)
+            summary = self._summarize_long(chunks, recording_date)
         else:
             summary = self._call_llm(transcript, recording_date)
 
-        output_path.write_text(summary, encoding="utf-8")
+        with timeline.span("write", bytes=len(summary.encode("utf-8"))):
+            output_path.write_text(summary, encoding="utf-8")
         logger.info("Acta generada: %s", output_path)
         return str(output_path)
 
-    def _summarize_long(self, transcript: str, recording_date: str) -> str:
-        # Split into chunks and summarize each, then consolidate
-        chunks = []
-        for i in range(0, len(transcript), MAX_TRANSCRIPT_CHARS):
-            chunks.append(transcript[i : i + MAX_TRANSCRIPT_CHARS])
+    def _write_compaction(self, output_dir: Path, stem: str, text: str, stats: dict):
+        """Guarda el texto que recibe el LLM y la reduccion de tokens junto al acta."""
+        (output_dir / f"{stem}{COMPACT_TEXT_SUFFIX}").write_text(text, encoding="utf-8")
+        (output_dir / f"{stem}{COMPACT_STATS_SUFFIX}").write_text(json.dumps(stats), encoding="utf-8")
+        logger.info("Transcripcion compactada: %d -> %d tokens (-%.0f%%), %d alucinaciones, "
+                    "%d bucles, %d muletillas", stats["raw_tokens"], stats["compact_tokens"],
+                    stats["reduction"] * 100, stats["hallucinations"], stats["loops"],
+                    stats["fillers"])
+
+    def _split_transcript(self, transcript: str, segments: list[dict] | None,
+                          paragraphs: list[dict] | None, speech_map: dict | None) -> list[str]:
+        """Divide la transcripcion en partes de como mucho MAX_TRANSCRIPT_CHARS.
+        Con mapa de voz y segmentos se corta en las pausas largas de la
+        conversacion en lugar de a mitad de frase.
+        """
+        units = paragraphs if paragraphs is not None else segments
+        if speech_map and speech_map["speech"] and units and units[0].get("start") is not None:
+            chars_per_sec = len(transcript) / max(1.0, speech_map["talk_time"]["total"])
+            ranges = speech.split_at_pauses(speech_map, MAX_TRANSCRIPT_CHARS * 0.9 / chars_per_sec)
+            groups: list[list[dict]] = [[] for _ in ranges]
+            idx = 0
+            for unit in units:
+                while idx < len(ranges) - 1 and unit["start"] >= ranges[idx][1]:
+                    idx += 1
+                groups[idx].append(unit)
+            if paragraphs is not None:
+                chunks = [compaction.render(g, self.minute_markers) for g in groups if g]
+            else:
+                chunks = ["\n".join(seg["text"] for seg in g) for g in groups if g]
+            if chunks and all(len(c) <= MAX_TRANSCRIPT_CHARS for c in chunks):
+                return chunks
+
+        return [
+            transcript[i : i + MAX_TRANSCRIPT_CHARS]
+            for i in range(0, len(transcript), MAX_TRANSCRIPT_CHARS)
+        ]
 
+    def _load_segments(self, transcript_path: Path) -> list[dict] | None:
+        json_path = transcript_path.with_suffix(".json")
+        if not json_path.exists():
+            return None
+        try:
+            return json.loads(json_path.read_text(encoding="utf-8"))["segments"]
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def _summarize_long(self, chunks: list[str], recording_date: str) -> str:
+        # Summarize each chunk, then consolidate
         partial_summaries = []
         for idx, chunk in enumerate(chunks):
             logger.info("Resumiendo parte %d/%d...", idx + 1, len(chunks))
-            partial = self._call_llm(chunk, recording_date)
+            partial = self._call_llm(chunk, recording_date, "llm_part", part=idx + 1, parts=len(chunks))
             partial_summaries.append(partial)
 
         if len(partial_summaries) == 1:
@@ -62,50 +180,82 @@ class Summarizer:
             "Consolida toda la informacion en una sola acta final con el mismo formato. "
             "Elimina redundancias y combina las secciones.\n\n" + combined
         )
-        return self._call_llm(consolidation_prompt, recording_date)
+        return self._call_llm(consolidation_prompt, recording_date, "consolidate",
+                              parts=len(partial_summaries))
 
-    def _call_llm(self, transcript: str, recording_date: str) -> str:
+    def _call_llm(self, transcript: str, recording_date: str, span: str = "llm", **attrs) -> str:
         user_prompt = SUMMARY_USER_PROMPT.format(
             fecha=recording_date,
             transcription=transcript,
         )
 
-        if self.provider == "anthropic" and self.api_key:
-            return self._call_anthropic(user_prompt)
-
-        if self.provider == "ollama" or not self.api_key:
-            try:
-                return self._call_ollama(user_prompt)
-            except Exception as e:
-                if self.api_key:
-                    logger.warning("Ollama fallo (%s), intentando con Anthropic...", e)
-                    return self._call_anthropic(user_prompt)
-                raise
+        with timeline.span(span, prompt_chars=len(user_prompt), **attrs) as span_attrs:
+            text = self.router.call(SUMMARY_PREFIX, user_prompt)
+            span_attrs["response_chars"] = len(text)
+        return text
 
-        return self._call_anthropic(user_prompt)
+    # Providers stream so the router can measure time to first token and
+    # abandon the slower side of a hedged call
 
-    def _call_anthropic(self, user_prompt: str) -> str:
+    def _call_anthropic(self, system: str, user_prompt: str, ctx: CallContext) -> str:
         import anthropic
 
-        client = anthropic.Anthropic(api_key=self.api_key)
-        message = client.messages.create(
+        client = anthropic.Anthropic(api_key=self.api_key, timeout=self.idle_timeout_secs)
+        parts = []
+        with client.messages.stream(
             model=self.model or "claude-sonnet-4-5-20250929",
             max_tokens=4096,
-            system=SUMMARY_SYSTEM_PROMPT,
+            # No cache_control: the static prefix (~400 tokens) is below the
+            # 1024-token minimum, so the API would never cache it
+            system=system,
             messages=[{"role": "user", "content": user_prompt}],
-        )
-        return message.content[0].text
+        ) as stream:
+            for text in stream.text_stream:
+                ctx.token()
+                parts.append(text)
+            usage = stream.get_final_message().usage
 
-    def _call_ollama(self, user_prompt: str) -> str:
-        response = requests.post(
+        ctx.usage = {"input": usage.input_tokens, "cached": 0, "output": usage.output_tokens}
+        logger.info("Anthropic: %d tokens de entrada, %d de salida",
+                    usage.input_tokens, usage.output_tokens)
+        return "".join(parts)
+
+    def _call_ollama(self, system: str, user_prompt: str, ctx: CallContext) -> str:
+        # The read timeout applies between streamed lines, so a hung server is
+        # detected after idle_timeout_secs instead of after the whole generation
+        with requests.post(
             f"{self.ollama_url}/api/generate",
             json={
                 "model": self.ollama_model,
-                "system": SUMMARY_SYSTEM_PROMPT,
+                "system": system,
                 "prompt": user_prompt,
-                "stream": False,
+                "stream": True,
+                "keep_alive": self.keep_alive,
             },
-            timeout=300,
-        )
-        response.raise_for_status()
-        return response.json()["response"]
+            stream=True,
+            timeout=(10, self.idle_timeout_secs),
+        ) as response:
+            response.raise_for_status()
+            parts = []
+            for line in response.iter_lines():
+                if not line:
+                    continue
+                chunk = json.loads(line)
+                if chunk.get("error"):
+                    raise RuntimeError(f"Ollama: {chunk['error']}")
+                if chunk.get("response"):
+                    ctx.token()
+                    parts.append(chunk["response"])
+                if chunk.get("done"):
+                    self._ollama_usage(chunk, ctx)
+                    break
+        return "".join(parts)
+
+    def _ollama_usage(self, final: dict, ctx: CallContext):
+        """Tokens segun Ollama. prompt_eval_count solo cuenta lo que evaluo
+        (no el prefijo reutilizado), y Ollama no informa cuanto reutilizo.
+        """
+        ctx.usage = {"input": final.get("prompt_eval_count") or 0, "cached": None,
+                     "output": final.get("eval_count") or 0}
+        logger.info("Ollama: %d tokens de entrada evaluados, %d de salida",
+                    ctx.usage["input"], ctx.usage["output"])
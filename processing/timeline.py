@@ -0,0 +1,164 @@
+"""Linea de tiempo del pipeline de cada grabacion.
+
+Cada trabajo de una grabacion (captura, finalizar, importar, mapa de voz,
+transcribir, acta...) es una "corrida" con sus tramos: esperar los hilos de
+captura, mezclar, codificar, cargar el modelo, decodificar, cada llamada al
+LLM, consolidar, escribir archivos. Cada tramo lleva su desplazamiento y
+duracion dentro de la corrida y atributos como tamanios o tokens.
+
+Las corridas se agregan a `data/timelines/<id>.json` al terminar. Los tramos
+se abren con `span()` desde cualquier parte del codigo y se asignan a la
+corrida activa en el hilo; fuera de una corrida no hacen nada. Los hilos
+auxiliares (llamadas al LLM) se suman con `bind()`.
+"""
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+
+import config
+
+logger = logging.getLogger(__name__)
+
+# Oldest runs are dropped beyond this, and spans beyond MAX_SPANS in one run
+MAX_RUNS = 50
+MAX_SPANS = 500
+
+
+class Run:
+    def __init__(self, recording_id: str, stage: str):
+        self.recording_id = recording_id
+        self.stage = stage
+        self.started_at = datetime.now(timezone.utc).isoformat()
+        self.started = time.perf_counter()
+        self.spans: list[dict] = []
+        self._lock = threading.Lock()
+
+    def add(self, span: dict):
+        with self._lock:
+            if len(self.spans) < MAX_SPANS:
+                self.spans.append(span)
+
+    def to_dict(self, duration_ms: float, error: str | None) -> dict:
+        return {
+            "stage": self.stage,
+            "started_at": self.started_at,
+            "duration_ms": round(duration_ms, 1),
+            "error": error,
+            "spans": sorted(self.spans, key=lambda s: s["offset_ms"]),
+        }
+
+
+_local = threading.local()
+_file_lock = threading.Lock()
+
+
+def current() -> tuple[Run, int] | None:
+    """(corrida, profundidad) activas en este hilo, para pasarlas a otro hilo."""
+    run = getattr(_local, "run", None)
+    return (run, getattr(_local, "depth", 0)) if run is not None else None
+
+
+def timeline_path(recording_id: str) -> Path:
+    return config.TIMELINES_DIR / f"{recording_id}.json"
+
+
+@contextmanager
+def bind(context: tuple[Run, int] | None):
+    """Asigna los tramos de este hilo a la corrida de otro hilo."""
+    if context is None:
+        yield
+        return
+    previous = (getattr(_local, "run", None), getattr(_local, "depth", 0))
+    _local.run, _local.depth = context
+    try:
+        yield
+    finally:
+        _local.run, _local.depth = previous
+
+
+@contextmanager
+def span(name: str, **attrs):
+    """Tramo dentro de la corrida activa. Produce el dict de atributos para
+    completarlo desde el bloque (tamanios, tokens...).
+    """
+    run = getattr(_local, "run", None)
+    if run is None:
+        yield attrs
+        return
+    depth = getattr(_local, "depth", 0)
+    start = time.perf_counter()
+    _local.depth = depth + 1
+    error = None
+    try:
+        yield attrs
+    except BaseException as e:
+        error = type(e).__name__
+        raise
+    finally:
+        _local.depth = depth
+        end = time.perf_counter()
+        run.add({
+            "name": name,
+            "offset_ms": round((start - run.started) * 1000, 1),
+            "duration_ms": round((end - start) * 1000, 1),
+            "depth": depth,
+            "thread": threading.current_thread().name,
+            "attrs": attrs,
+            "error": error,
+        })
+
+
+@contextmanager
+def trace(recording_id: str, stage: str):
+    """Corrida de una etapa; al terminar se agrega a la linea de tiempo de la
+    grabacion. Dentro de otra corrida solo abre un tramo.
+    """
+    if current() is not None:
+        with span(stage):
+            yield
+        return
+    run = Run(recording_id, stage)
+    _local.run, _local.depth = run, 0
+    error = None
+    try:
+        yield
+    except BaseException as e:
+        error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        _local.run, _local.depth = None, 0
+        _append(recording_id, run.to_dict((time.perf_counter() - run.started) * 1000, error))
+
+
+def record(recording_id: str, stage: str, started_at: str, duration_ms: float, **attrs):
+    """Agrega una corrida ya medida por otro medio (p. ej. la captura)."""
+    _append(recording_id, {"stage": stage, "started_at": started_at,
+                           "duration_ms": round(duration_ms, 1), "error": None,
+                           "spans": [], "attrs": attrs})
+
+
+def _append(recording_id: str, run: dict):
+    path = timeline_path(recording_id)
+    try:
+        with _file_lock:
+            runs = load(recording_id)
+            runs.append(run)
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = path.with_suffix(".tmp")
+            tmp.write_text(json.dumps({"runs": runs[-MAX_RUNS:]}, ensure_ascii=False), encoding="utf-8")
+            os.replace(tmp, path)
+    except OSError as e:
+        logger.warning("No se pudo guardar la linea de tiempo de %s: %s", recording_id, e)
+
+
+def load(recording_id: str) -> list[dict]:
+    path = timeline_path(recording_id)
+    try:
+        return json.loads(path.read_text(encoding="utf-8"))["runs"]
+    except (OSError, ValueError, KeyError):
+        return []
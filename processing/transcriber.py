@@ -1,21 +1,73 @@
+import bisect
 import json
 import logging
+import threading
+import time
+from collections import namedtuple
+from contextlib import contextmanager
 from pathlib import Path
 
+import config
+from processing import audio_stream, speech, subtitles, timeline, tuning
+
 logger = logging.getLogger(__name__)
 
 _model_cache = {}
+_batched_cache = {}
+
+# Decodes running in this process, limited while a capture is active
+_decode_cond = threading.Condition()
+_running_decodes = 0
+# Capture state is polled: nothing signals when a recording stops
+CAPTURE_POLL_SECS = 1.0
+
+# Perfiles de decodificacion, de mas rapido a mas preciso.
+# "fast" usa busqueda greedy y el pipeline por lotes de faster-whisper.
+PROFILES = {
+    "fast": {"beam_size": 1, "best_of": 1, "batched": True},
+    "balanced": {"beam_size": 2, "best_of": 2, "batched": False},
+    "accurate": {"beam_size": 5, "best_of": 5, "batched": False},
+}
+AUTO_PROFILE = "auto"
+
+# Longest window the batched pipeline decodes in one piece
+BATCH_CHUNK_SECS = 30
+
+# Append-only segment journal written while a transcription runs
+JOURNAL_SUFFIX = ".partial.jsonl"
+
+# Segment of a windowed decode, with times already relative to the whole recording
+WindowSegment = namedtuple("WindowSegment", "start end text")
+
+
+def choose_profile(requested: str | None, duration_secs: float | None, backlog: int) -> str:
+    """Resuelve el perfil a usar. Con "auto" se elige uno mas rapido cuanto
+    mayor es la cola de trabajos pendientes o mas larga la grabacion.
+    """
+    requested = requested or config.WHISPER_PROFILE
+    if requested != AUTO_PROFILE:
+        return requested
+    duration_secs = duration_secs or 0
+    if backlog >= config.PROFILE_FAST_BACKLOG or duration_secs >= config.PROFILE_FAST_SECS:
+        return "fast"
+    if backlog > 0 or duration_secs >= config.PROFILE_FAST_SECS / 2:
+        return "balanced"
+    return "accurate"
 
 
 class Transcriber:
-    def __init__(self, model_size: str = "medium", language: str = "es"):
+    def __init__(self, model_size: str = "medium", language: str = "es", capture_active=None):
         self.model_size = model_size
         self.language = language
+        # Callable returning True while a recording is being captured
+        self.capture_active = capture_active
         self._model = None
+        self._device = None
+        self._compute_type = None
 
     def _load_model(self):
         if self.model_size in _model_cache:
-            self._model = _model_cache[self.model_size]
+            self._model, self._device, self._compute_type = _model_cache[self.model_size]
             return
 
         from faster_whisper import WhisperModel
@@ -31,69 +83,440 @@ class Transcriber:
         except ImportError:
             pass
 
+        options = {}
+        if device == "cpu":
+            profile = tuning.load(self.model_size)
+            if profile is None and config.WHISPER_AUTOTUNE:
+                try:
+                    profile = tuning.calibrate(self.model_size, self.language)
+                except Exception as e:
+                    logger.warning("No se pudo calibrar Whisper: %s", e)
+            if profile:
+                compute_type = profile["compute_type"]
+                options = {"cpu_threads": profile["cpu_threads"],
+                           "num_workers": profile["num_workers"]}
+
         logger.info(
-            "Cargando modelo Whisper '%s' en %s (compute_type=%s)...",
-            self.model_size, device, compute_type,
+            "Cargando modelo Whisper '%s' en %s (compute_type=%s, %s)...",
+            self.model_size, device, compute_type, options or "opciones por defecto",
         )
         self._model = WhisperModel(
             self.model_size,
             device=device,
             compute_type=compute_type,
+            **options,
         )
-        _model_cache[self.model_size] = self._model
+        self._device, self._compute_type = device, compute_type
+        _model_cache[self.model_size] = (self._model, device, compute_type)
         logger.info("Modelo Whisper cargado")
 
+    def _capturing(self) -> bool:
+        return self._device == "cpu" and self.capture_active is not None and self.capture_active()
+
+    @contextmanager
+    def _decode_slot(self):
+        """Mientras se graba, como mucho WHISPER_RECORDING_DECODES decodificaciones
+        a la vez (0 = esperar a que termine la captura), con el mismo modelo:
+        una segunda instancia con menos hilos duplicaria la memoria justo
+        cuando la captura la necesita. Las ya empezadas no se interrumpen.
+        """
+        global _running_decodes
+        with _decode_cond:
+            if self._capturing() and _running_decodes >= config.WHISPER_RECORDING_DECODES:
+                with timeline.span("capture_wait"):
+                    logger.info("Captura activa: transcripcion en espera")
+                    while (self._capturing()
+                           and _running_decodes >= config.WHISPER_RECORDING_DECODES):
+                        _decode_cond.wait(CAPTURE_POLL_SECS)
+            _running_decodes += 1
+        try:
+            yield
+        finally:
+            with _decode_cond:
+                _running_decodes -= 1
+                _decode_cond.notify_all()
+
     @property
     def is_loaded(self) -> bool:
         return self._model is not None or self.model_size in _model_cache
 
-    def transcribe(self, audio_path: str, output_dir: str) -> dict:
-        if self._model is None:
-            self._load_model()
+    def _decode(self, audio_path: Path, speech_map: dict | None, options: dict,
+                start_secs: float = 0):
+        """Retorna (segmentos, idioma, duracion, offsets) con los tiempos de los
+        segmentos relativos a `offsets` cuando el audio se recorto. Con
+        start_secs > 0 se ignora el audio anterior (reanudacion).
+        """
+        decode = {
+            "language": self.language,
+            "beam_size": options["beam_size"],
+            "best_of": options["best_of"],
+        }
+        model = self._model
+        if options["batched"]:
+            model = self._batched_model(model)
+            decode["batch_size"] = config.WHISPER_BATCH_SIZE
+
+        duration = speech_map["duration"] if speech_map else audio_stream.probe_duration(audio_path)
+        if duration is not None and duration > config.STREAM_DECODE_SECS:
+            return self._decode_windowed(model, audio_path, speech_map, decode, options["batched"],
+                                         start_secs, duration)
+
+        if speech_map is None and not start_secs:
+            segments, info = model.transcribe(str(audio_path), vad_filter=True, **decode)
+            return segments, info.language, info.duration, None
+
+        from faster_whisper.audio import decode_audio
+
+        audio = decode_audio(str(audio_path), sampling_rate=config.SAMPLE_RATE)
+        if speech_map is None:
+            audio = audio[int(start_secs * config.SAMPLE_RATE):]
+            segments, info = model.transcribe(audio, vad_filter=True, **decode)
+            return segments, info.language, start_secs + info.duration, [(0.0, start_secs)]
+
+        logger.info("Mapa de voz: %.0fs de %.0fs con voz",
+                    speech_map["talk_time"]["total"], speech_map["duration"])
+        regions = speech.trim(speech_map["speech"], start_secs)
+        if not regions:
+            return [], self.language, speech_map["duration"], None
+
+        if options["batched"]:
+            # The batched pipeline decodes the mapped regions in parallel, in place
+            segments, info = model.transcribe(
+                audio,
+                vad_filter=False,
+                clip_timestamps=self._clip_timestamps(regions),
+                **decode,
+            )
+            return segments, info.language, speech_map["duration"], None
+
+        clipped, offsets = speech.collect(audio, regions, config.SAMPLE_RATE)
+        segments, info = model.transcribe(clipped, vad_filter=False, **decode)
+        return segments, info.language, speech_map["duration"], offsets
+
+    def _decode_windowed(self, model, audio_path: Path, speech_map: dict | None, decode: dict,
+                         batched: bool, start_secs: float, duration: float):
+        """Decodifica leyendo el audio de ffmpeg por ventanas, para que la
+        memoria no crezca con la duracion. Sin mapa de voz las ventanas se
+        solapan y cada segmento se asigna a la ventana en cuya mitad del
+        solapamiento empieza; con mapa se corta en las pausas y solo se leen
+        los tramos con voz. Los tiempos de los segmentos ya son absolutos.
+        """
+        stream = audio_stream.PcmStream(audio_path, config.SAMPLE_RATE, start_secs=start_secs)
+        if speech_map is None:
+            pieces = self._window_pieces(stream)
+        else:
+            regions = speech.trim(speech_map["speech"], start_secs)
+            pieces = self._region_pieces(stream, regions, batched)
+        logger.info("Decodificando %s por ventanas de %ds (%.0fs de audio)",
+                    audio_path.name, config.DECODE_WINDOW_SECS, duration - start_secs)
+
+        try:
+            first = next(pieces, None)
+        except Exception:
+            stream.close()
+            raise
+        if first is None:
+            stream.close()
+            return [], self.language, duration, None
+        audio, kwargs, _ = first
+        segments, info = model.transcribe(audio, **decode, **kwargs)
+        # Later windows reuse the language instead of detecting it again
+        decode = {**decode, "language": info.language}
+
+        def generate():
+            piece, piece_segments = first, segments
+            try:
+                while piece is not None:
+                    _, _, place = piece
+                    for segment in piece_segments:
+                        placed = place(segment)
+                        if placed is not None:
+                            yield placed
+                    piece = next(pieces, None)
+                    if piece is not None:
+                        audio, kwargs, _ = piece
+                        piece_segments, _ = model.transcribe(audio, **decode, **kwargs)
+            finally:
+                stream.close()
+
+        return generate(), info.language, duration, None
+
+    def _window_pieces(self, stream):
+        """(audio, opciones, ubicar) por ventana solapada; `ubicar` pasa un
+        segmento a tiempo absoluto o lo descarta si pertenece a la ventana vecina.
+        """
+        half = config.DECODE_OVERLAP_SECS / 2
+        first = True
+        for offset, audio, last in stream.windows(config.DECODE_WINDOW_SECS,
+                                                  config.DECODE_OVERLAP_SECS):
+            keep_from = float("-inf") if first else offset + half
+            keep_until = float("inf") if last else offset + config.DECODE_WINDOW_SECS - half
+
+            def place(segment, offset=offset, keep_from=keep_from, keep_until=keep_until):
+                start = offset + segment.start
+                if not keep_from <= start < keep_until:
+                    return None
+                return WindowSegment(start, offset + segment.end, segment.text)
+
+            yield audio, {"vad_filter": True}, place
+            first = False
+
+    def _region_pieces(self, stream, regions: list[list[float]], batched: bool):
+        """(audio, opciones, ubicar) por tramo del mapa de voz cortado en pausas:
+        solo se decodifican las regiones con voz del tramo.
+        """
+        rate = config.SAMPLE_RATE
+        # Regions longer than a window are split so every range fits in one
+        regions = speech.split_regions(regions, config.DECODE_WINDOW_SECS)
+        ranges = speech.split_at_pauses({"speech": regions}, config.DECODE_WINDOW_SECS)
+        i = 0
+        for (_, end), (offset, audio) in zip(ranges, stream.ranges(ranges)):
+            inner = []
+            while i < len(regions) and regions[i][0] < end:
+                inner.append([regions[i][0] - offset, regions[i][1] - offset])
+                i += 1
+            if batched:
+                kwargs = {"vad_filter": False, "clip_timestamps": self._clip_timestamps(inner)}
+                offsets = None
+            else:
+                audio, offsets = speech.collect(audio, inner, rate)
+                kwargs = {"vad_filter": False}
+
+            def place(segment, offset=offset, offsets=offsets):
+                start, end = segment.start, segment.end
+                if offsets:
+                    start, end = speech.restore(start, offsets), speech.restore(end, offsets)
+                return WindowSegment(offset + start, offset + end, segment.text)
+
+            yield audio, kwargs, place
+
+    def _clip_timestamps(self, regions: list[list[float]]) -> list[dict]:
+        from faster_whisper.vad import VadOptions, merge_segments
+
+        rate = config.SAMPLE_RATE
+        samples = [
+            {"start": int(start * rate), "end": int(end * rate)}
+            for start, end in speech.split_regions(regions, BATCH_CHUNK_SECS)
+        ]
+        return merge_segments(
+            samples, VadOptions(max_speech_duration_s=BATCH_CHUNK_SECS, speech_pad_ms=0), rate
+        )
+
+    def _batched_model(self, model):
+        if id(model) not in _batched_cache:
+            from faster_whisper import BatchedInferencePipeline
+
+            _batched_cache[id(model)] = BatchedInferencePipeline(model=model)
+        return _batched_cache[id(model)]
+
+    def _load_journal(self, journal_path: Path, header: dict) -> list[dict]:
+        """Segmentos ya escritos por una transcripcion interrumpida del mismo
+        audio y modelo. Una ultima linea incompleta se descarta.
+        """
+        if not journal_path.exists():
+            return []
+        segments = []
+        with open(journal_path, encoding="utf-8") as f:
+            for i, line in enumerate(f):
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    break
+                if i == 0:
+                    if entry.get("header") != header:
+                        return []
+                    continue
+                segments.append(entry)
+        return segments
+
+    def transcribe(self, audio_path: str, output_dir: str,
+                   speech_map: dict | None = None, profile: str = "accurate",
+                   on_progress=None) -> dict:
+        """Transcribe un archivo y escribe .txt/.json/.srt/.vtt en output_dir.
+
+        Con speech_map solo se decodifican las regiones con voz ya detectadas,
+        sin volver a ejecutar el VAD. `profile` es una clave de PROFILES.
+        Cada segmento se agrega a un diario `.partial.jsonl` apenas se produce:
+        si la transcripcion se interrumpe, la siguiente retoma desde el ultimo
+        segmento. `on_progress(fraccion)` se llama por cada segmento.
+        """
+        with timeline.span("model", model=self.model_size) as attrs:
+            attrs["cache_hit"] = self.is_loaded
+            if self._model is None:
+                self._load_model()
 
         audio_path = Path(audio_path)
         output_dir = Path(output_dir)
         output_dir.mkdir(parents=True, exist_ok=True)
 
         stem = audio_path.stem
-        txt_path = output_dir / f"{stem}.txt"
-        json_path = output_dir / f"{stem}.json"
+        journal_path = output_dir / f"{stem}{JOURNAL_SUFFIX}"
 
-        logger.info("Transcribiendo %s...", audio_path.name)
-        segments, info = self._model.transcribe(
-            str(audio_path),
-            language=self.language,
-            beam_size=5,
-            vad_filter=True,
-        )
+        header = {"audio_bytes": audio_path.stat().st_size, "model": self.model_size}
+        all_segments = self._load_journal(journal_path, header)
+        resume_from = all_segments[-1]["end"] if all_segments else 0
+        if resume_from:
+            logger.info("Retomando %s desde %.0fs (%d segmentos previos)",
+                        audio_path.name, resume_from, len(all_segments))
+
+        options = PROFILES[profile]
+        logger.info("Transcribiendo %s (perfil %s)...", audio_path.name, profile)
+        t0 = time.perf_counter()
+        # Decoding is lazy: the segments are produced while the journal loop iterates
+        with self._decode_slot(), \
+                timeline.span("decode", profile=profile, resumed_from=resume_from) as decode_attrs:
+            segments, language, duration, offsets = self._decode(
+                audio_path, speech_map, options, start_secs=resume_from,
+            )
+
+            # Rewritten on resume so a torn last line from the crash is dropped
+            with open(journal_path, "w", encoding="utf-8") as journal:
+                for entry in [{"header": header}, *all_segments]:
+                    journal.write(json.dumps(entry, ensure_ascii=False) + "\n")
+                journal.flush()
+
+                for segment in segments:
+                    start, end = segment.start, segment.end
+                    if offsets:
+                        start, end = speech.restore(start, offsets), speech.restore(end, offsets)
+                    seg_data = {
+                        "start": round(start, 2),
+                        "end": round(end, 2),
+                        "text": segment.text.strip(),
+                    }
+                    all_segments.append(seg_data)
+                    journal.write(json.dumps(seg_data, ensure_ascii=False) + "\n")
+                    journal.flush()
+                    if on_progress is not None and duration:
+                        on_progress(min(1.0, end / duration))
+
+            decode_attrs["segments"] = len(all_segments)
+            decode_attrs["audio_secs"] = round(duration - resume_from, 1)
+
+        elapsed = time.perf_counter() - t0
+        decoding = {
+            "profile": profile,
+            "model": self.model_size,
+            "beam_size": options["beam_size"],
+            "batched": options["batched"],
+            "elapsed_secs": round(elapsed, 1),
+            "rtf": round(elapsed / (duration - resume_from), 3) if duration > resume_from else None,
+            "resumed_from": resume_from,
+        }
+        with timeline.span("write", files=4):
+            result = self._write_outputs(output_dir, stem, all_segments, language, duration, decoding)
+        journal_path.unlink(missing_ok=True)
 
-        all_segments = []
-        full_text_parts = []
+        logger.info("Transcripcion completada: %d segmentos (perfil %s, RTF %s)",
+                    len(all_segments), profile, decoding["rtf"])
+        return result
 
-        for segment in segments:
-            seg_data = {
-                "start": round(segment.start, 2),
-                "end": round(segment.end, 2),
-                "text": segment.text.strip(),
-            }
-            all_segments.append(seg_data)
-            full_text_parts.append(segment.text.strip())
+    def _write_outputs(self, output_dir: Path, stem: str, segments: list[dict],
+                       language: str, duration: float, decoding: dict) -> dict:
+        txt_path = output_dir / f"{stem}.txt"
+        json_path = output_dir / f"{stem}.json"
+        srt_path = output_dir / f"{stem}.srt"
+        vtt_path = output_dir / f"{stem}.vtt"
 
-        full_text = "\n".join(full_text_parts)
+        full_text = "\n".join(seg["text"] for seg in segments)
         txt_path.write_text(full_text, encoding="utf-8")
+        srt_path.write_text(subtitles.to_srt(segments), encoding="utf-8")
+        vtt_path.write_text(subtitles.to_vtt(segments), encoding="utf-8")
 
         json_data = {
-            "language": info.language,
-            "duration": round(info.duration, 2),
-            "segments": all_segments,
+            "language": language,
+            "duration": round(duration, 2),
+            "decoding": decoding,
+            "segments": segments,
         }
         json_path.write_text(json.dumps(json_data, ensure_ascii=False, indent=2), encoding="utf-8")
 
-        logger.info("Transcripcion completada: %d segmentos", len(all_segments))
-
         return {
             "txt_path": str(txt_path),
             "json_path": str(json_path),
-            "language": info.language,
-            "duration_secs": round(info.duration),
+            "srt_path": str(srt_path),
+            "vtt_path": str(vtt_path),
+            "language": language,
+            "duration_secs": round(duration),
+            "decoding": decoding,
+        }
+
+    def transcribe_many(self, items: list[tuple[str, dict | None]], output_dir: str,
+                        profile: str = "fast") -> list[dict]:
+        """Transcribe varias grabaciones cortas en una sola pasada del pipeline
+        por lotes y reparte los segmentos entre ellas.
+
+        `items` son pares (audio_path, speech_map). Los audios se concatenan
+        separados por silencio mas largo que una ventana, asi ninguna ventana
+        de decodificacion mezcla dos grabaciones.
+        """
+        import numpy as np
+        from faster_whisper.audio import decode_audio
+
+        if self._model is None:
+            self._load_model()
+
+        output_dir = Path(output_dir)
+        output_dir.mkdir(parents=True, exist_ok=True)
+        rate = config.SAMPLE_RATE
+        gap = np.zeros(int((BATCH_CHUNK_SECS + 1) * rate), dtype=np.float32)
+
+        t0 = time.perf_counter()
+        parts = []
+        regions = []
+        spans = []  # (offset in concatenated audio, duration)
+        offset = 0.0
+        for audio_path, speech_map in items:
+            audio = decode_audio(str(audio_path), sampling_rate=rate)
+            duration = len(audio) / rate
+            item_regions = speech_map["speech"] if speech_map else speech.detect_regions(audio, rate)
+            regions.extend([start + offset, end + offset] for start, end in item_regions)
+            spans.append((offset, duration))
+            parts.extend([audio, gap])
+            offset += duration + len(gap) / rate
+
+        options = PROFILES[profile]
+        logger.info("Transcribiendo %d grabaciones cortas en un lote (perfil %s)...",
+                    len(items), profile)
+        per_item: list[list[dict]] = [[] for _ in items]
+        language = self.language
+        if regions:
+            with self._decode_slot():
+                segments, info = self._batched_model(self._model).transcribe(
+                    np.concatenate(parts),
+                    language=self.language,
+                    beam_size=options["beam_size"],
+                    best_of=options["best_of"],
+                    vad_filter=False,
+                    clip_timestamps=self._clip_timestamps(regions),
+                    batch_size=config.WHISPER_BATCH_SIZE,
+                )
+                language = info.language
+                starts = [start for start, _ in spans]
+                for segment in segments:
+                    idx = bisect.bisect_right(starts, segment.start) - 1
+                    start, duration = spans[idx]
+                    per_item[idx].append({
+                        "start": round(segment.start - start, 2),
+                        "end": round(min(segment.end - start, duration), 2),
+                        "text": segment.text.strip(),
+                    })
+
+        elapsed = time.perf_counter() - t0
+        audio_secs = sum(duration for _, duration in spans)
+        decoding = {
+            "profile": profile,
+            "model": self.model_size,
+            "beam_size": options["beam_size"],
+            "batched": True,
+            "group_size": len(items),
+            "elapsed_secs": round(elapsed, 1),
+            "rtf": round(elapsed / audio_secs, 3) if audio_secs else None,
         }
+        logger.info("Lote de %d grabaciones (%.0fs de audio) en %.1fs, RTF %s",
+                    len(items), audio_secs, elapsed, decoding["rtf"])
+        return [
+            self._write_outputs(output_dir, Path(audio_path).stem, segments, language,
+                                duration, decoding)
+            for (audio_path, _), segments, (_, duration) in zip(items, per_item, spans)
+        ]
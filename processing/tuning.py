@@ -0,0 +1,136 @@
+"""Calibracion de Whisper en CPU.
+
+Prueba algunas combinaciones de compute_type / cpu_threads / num_workers
+sobre una muestra corta generada en memoria y guarda la mas rapida por
+tamanio de modelo en data/whisper_tuning.json. Se ejecuta una sola vez, la
+primera vez que se carga cada modelo en CPU (o con `python main.py calibrate`).
+"""
+import json
+import logging
+import os
+import threading
+import time
+from datetime import datetime, timezone
+
+import config
+
+logger = logging.getLogger(__name__)
+
+SAMPLE_SECS = 20
+COMPUTE_TYPES = ("int8", "float32")
+
+
+def cpu_count() -> int:
+    return os.cpu_count() or 1
+
+
+def load(model_size: str) -> dict | None:
+    try:
+        profiles = json.loads(config.WHISPER_TUNING_PATH.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+    profile = profiles.get(model_size)
+    # Calibrated on another machine (or a different core count)
+    if not profile or profile.get("cores") != cpu_count():
+        return None
+    return profile
+
+
+def save(model_size: str, profile: dict):
+    try:
+        profiles = json.loads(config.WHISPER_TUNING_PATH.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        profiles = {}
+    profiles[model_size] = profile
+    config.WHISPER_TUNING_PATH.parent.mkdir(parents=True, exist_ok=True)
+    config.WHISPER_TUNING_PATH.write_text(json.dumps(profiles, indent=2), encoding="utf-8")
+
+
+def sample_audio(secs: float = SAMPLE_SECS):
+    """Senial con estructura parecida a la voz: armonicos de una fundamental
+    que varia lentamente, moduladas por una envolvente silabica de ~4 Hz.
+    """
+    import numpy as np
+
+    rate = config.SAMPLE_RATE
+    t = np.arange(int(secs * rate), dtype=np.float32) / rate
+    f0 = 140 + 30 * np.sin(2 * np.pi * 0.3 * t)
+    phase = 2 * np.pi * np.cumsum(f0) / rate
+    voice = sum(np.sin(k * phase) / k for k in range(1, 6))
+    envelope = np.clip(np.sin(2 * np.pi * 4 * t), 0, None) * (np.sin(2 * np.pi * 0.25 * t) > -0.3)
+    noise = np.random.default_rng(0).normal(0, 0.01, len(t))
+    return (0.3 * voice * envelope + noise).astype(np.float32)
+
+
+def candidates(cores: int) -> list[dict]:
+    threads = sorted({cores, max(1, cores // 2)}, reverse=True)
+    # Several workers only pay off when jobs transcribe concurrently
+    workers = (1, 2) if config.JOB_WORKERS > 1 else (1,)
+    combos = []
+    for compute_type in COMPUTE_TYPES:
+        for cpu_threads in threads:
+            for num_workers in workers:
+                if cpu_threads * num_workers <= cores:
+                    combos.append({
+                        "compute_type": compute_type,
+                        "cpu_threads": cpu_threads,
+                        "num_workers": num_workers,
+                    })
+    return combos
+
+
+def _measure(model_size: str, language: str, combo: dict, audio) -> float:
+    """Factor de tiempo real con `num_workers` transcripciones simultaneas."""
+    from faster_whisper import WhisperModel
+
+    model = WhisperModel(model_size, device="cpu", **combo)
+
+    def run():
+        segments, _ = model.transcribe(audio, language=language, beam_size=5,
+                                       vad_filter=False, temperature=0.0,
+                                       condition_on_previous_text=False)
+        for _ in segments:
+            pass
+
+    run()  # warm-up
+    threads = [threading.Thread(target=run) for _ in range(combo["num_workers"])]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - start
+    return elapsed / (len(audio) / config.SAMPLE_RATE * combo["num_workers"])
+
+
+def calibrate(model_size: str, language: str) -> dict:
+    cores = cpu_count()
+    audio = sample_audio()
+    logger.info("Calibrando Whisper '%s' en CPU (%d nucleos)...", model_size, cores)
+
+    results = []
+    for combo in candidates(cores):
+        try:
+            rtf = _measure(model_size, language, combo, audio)
+        except Exception as e:
+            logger.warning("Calibracion %s fallida: %s", combo, e)
+            continue
+        logger.info("  %s -> RTF %.3f", combo, rtf)
+        results.append({**combo, "rtf": round(rtf, 4)})
+    if not results:
+        raise RuntimeError("Ninguna combinacion de calibracion funciono")
+
+    best = min(results, key=lambda r: r["rtf"])
+    profile = {
+        "compute_type": best["compute_type"],
+        "cpu_threads": best["cpu_threads"],
+        "num_workers": best["num_workers"],
+        "rtf": best["rtf"],
+        "cores": cores,
+        "calibrated_at": datetime.now(timezone.utc).isoformat(),
+        "results": results,
+    }
+    save(model_size, profile)
+    logger.info("Perfil elegido para '%s': %s (RTF %.3f)", model_size,
+                {k: best[k] for k in ("compute_type", "cpu_threads", "num_workers")}, best["rtf"])
+    return profile
@@ -0,0 +1,160 @@
+import logging
+import threading
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+import config
+from db.database import Database
+from processing import pipeline
+from processing.coordinator import Coordinator
+from processing.jobs import PRIORITY_LOW, JobQueue
+from processing.summarizer import Summarizer
+from processing.transcriber import Transcriber
+
+logger = logging.getLogger(__name__)
+
+
+class FolderWatcher:
+    """Vigila carpetas y envia cada grabacion nueva al pipeline de importacion.
+
+    Un archivo se considera terminado cuando su tamanio y mtime no cambian
+    durante `settle_secs` y puede abrirse para lectura. Los duplicados se
+    detectan por hash de contenido (igual que el modo batch), y como mucho
+    `max_pending` archivos de la carpeta estan en cola o en proceso a la vez;
+    el resto espera al siguiente escaneo. Con `coordinator` el procesamiento
+    se encola para los workers remotos en lugar de correr en esta maquina.
+    """
+
+    def __init__(self, db: Database, jobs: JobQueue, transcriber: Transcriber,
+                 summarizer: Summarizer, directories: list[Path],
+                 poll_secs: float = 5, settle_secs: float = 10, max_pending: int = 2,
+                 auto_process: bool = True, coordinator: Coordinator | None = None):
+        self.db = db
+        self.jobs = jobs
+        self.transcriber = transcriber
+        self.summarizer = summarizer
+        self.directories = [Path(d) for d in directories]
+        self.poll_secs = poll_secs
+        self.settle_secs = settle_secs
+        self.max_pending = max(1, max_pending)
+        self.auto_process = auto_process
+        self.coordinator = coordinator
+        # path -> (size, mtime, first time this signature was seen)
+        self._candidates: dict[Path, tuple[int, float, float]] = {}
+        # path -> (size, mtime) of files already handed to the pipeline
+        self._handled: dict[Path, tuple[int, float]] = {}
+        self._in_flight: set[Path] = set()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def start(self):
+        for d in self.directories:
+            if not d.is_dir():
+                logger.warning("Carpeta vigilada no encontrada: %s", d)
+        logger.info("Vigilando %s", ", ".join(str(d) for d in self.directories))
+        self._thread = threading.Thread(target=self._run, name="folder-watcher", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=self.poll_secs + 1)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "directories": [str(d) for d in self.directories],
+                "waiting": len(self._candidates),
+                "in_flight": len(self._in_flight),
+                "handled": len(self._handled),
+            }
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.scan()
+            except Exception as e:
+                logger.error("Error escaneando carpetas vigiladas: %s", e)
+            self._stop.wait(self.poll_secs)
+
+    def _list_files(self) -> list[Path]:
+        files = []
+        for d in self.directories:
+            if d.is_dir():
+                files.extend(
+                    p for p in d.iterdir()
+                    if p.is_file() and p.suffix.lower() in config.ALLOWED_EXTENSIONS
+                )
+        return sorted(files, key=lambda p: p.stat().st_mtime)
+
+    def scan(self):
+        now = time.monotonic()
+        for path in self._list_files():
+            try:
+                st = path.stat()
+            except OSError:
+                continue
+            signature = (st.st_size, st.st_mtime)
+
+            with self._lock:
+                if path in self._in_flight or self._handled.get(path) == signature:
+                    continue
+                previous = self._candidates.get(path)
+                if previous is None or previous[:2] != signature:
+                    self._candidates[path] = (*signature, now)
+                    continue
+                if now - previous[2] < self.settle_secs or st.st_size == 0:
+                    continue
+                if len(self._in_flight) >= self.max_pending:
+                    # Backpressure: leave the rest for a later scan
+                    return
+                if not self._is_readable(path):
+                    continue
+                del self._candidates[path]
+                self._in_flight.add(path)
+
+            self.jobs.submit(self._ingest, path, signature, priority=PRIORITY_LOW,
+                             name=f"watch:{path.name}")
+
+    def _is_readable(self, path: Path) -> bool:
+        # On Windows a file still being written by another process cannot be opened
+        try:
+            with open(path, "rb"):
+                return True
+        except OSError:
+            return False
+
+    def _ingest(self, path: Path, signature: tuple[int, float]):
+        try:
+            source_hash = pipeline.file_hash(path)
+            existing = self.db.find_by_source_hash(source_hash)
+            if existing:
+                logger.info("%s ya fue importado (%s), se omite", path.name, existing["id"])
+                return
+
+            started_at = datetime.fromtimestamp(path.stat().st_mtime, timezone.utc).isoformat()
+            rec = pipeline.import_file(
+                self.db, path, f"Importado - {path.stem}",
+                started_at=started_at, source_hash=source_hash,
+            )
+            logger.info("Importado desde carpeta vigilada: %s -> %s", path.name, rec["id"])
+
+            if self.auto_process and self.coordinator is not None:
+                self.db.update_recording(rec["id"], status="transcribing")
+                self.coordinator.enqueue(rec["id"], "process")
+            elif self.auto_process:
+                rec = self.db.update_recording(rec["id"], status="transcribing")
+                try:
+                    pipeline.process(self.db, self.transcriber, self.summarizer, rec,
+                                     backlog=self.jobs.pending())
+                except Exception as e:
+                    logger.error("Error procesando %s: %s", rec["id"], e)
+                    self.db.update_recording(rec["id"], status="error", error_message=str(e))
+        except Exception as e:
+            logger.error("Error importando %s: %s", path.name, e)
+        finally:
+            with self._lock:
+                self._in_flight.discard(path)
+                self._handled[path] = signature
@@ -0,0 +1,151 @@
+import json
+import logging
+import shutil
+import socket
+import tempfile
+import threading
+import uuid
+from pathlib import Path
+
+import requests
+
+from processing.summarizer import Summarizer
+from processing.transcriber import Transcriber
+
+logger = logging.getLogger(__name__)
+
+DOWNLOAD_CHUNK_SIZE = 1024 * 1024
+
+
+class LeaseLostError(Exception):
+    pass
+
+
+class RemoteWorker:
+    """Worker que ejecuta solo Transcriber/Summarizer para una instancia principal.
+
+    Reclama trabajos por HTTP, descarga el audio, envia heartbeats mientras
+    procesa y sube la transcripcion y el acta. Si el lease se pierde (por
+    ejemplo tras una pausa larga) abandona el trabajo sin subir nada.
+    """
+
+    def __init__(self, server_url: str, transcriber: Transcriber, summarizer: Summarizer | None,
+                 token: str = "", worker_id: str | None = None, poll_secs: float = 5):
+        self.base = server_url.rstrip("/") + "/api/workers"
+        self.transcriber = transcriber
+        self.summarizer = summarizer
+        self.worker_id = worker_id or f"{socket.gethostname()}-{uuid.uuid4().hex[:8]}"
+        self.poll_secs = poll_secs
+        self.kinds = ["transcribe", "summarize", "process"] if summarizer else ["transcribe"]
+        self._session = requests.Session()
+        if token:
+            self._session.headers["X-Worker-Token"] = token
+        self._stop = threading.Event()
+
+    def _post(self, path: str, **payload) -> requests.Response:
+        resp = self._session.post(f"{self.base}{path}",
+                                  json={"worker_id": self.worker_id, **payload}, timeout=60)
+        if resp.status_code == 409:
+            raise LeaseLostError(path)
+        resp.raise_for_status()
+        return resp
+
+    def _get(self, path: str, **kwargs) -> requests.Response:
+        resp = self._session.get(f"{self.base}{path}", params={"worker_id": self.worker_id},
+                                 timeout=60, **kwargs)
+        if resp.status_code == 409:
+            raise LeaseLostError(path)
+        resp.raise_for_status()
+        return resp
+
+    def run(self):
+        logger.info("Worker %s conectado a %s (%s)", self.worker_id, self.base, ", ".join(self.kinds))
+        while not self._stop.is_set():
+            try:
+                resp = self._post("/claim", kinds=self.kinds)
+            except (requests.RequestException, LeaseLostError) as e:
+                logger.warning("No se pudo contactar al servidor: %s", e)
+                self._stop.wait(self.poll_secs)
+                continue
+
+            if resp.status_code == 204:
+                self._stop.wait(self.poll_secs)
+                continue
+            self.run_job(resp.json())
+
+    def stop(self):
+        self._stop.set()
+
+    def _heartbeat_loop(self, job_id: str, interval: float, lost: threading.Event,
+                        done: threading.Event):
+        while not done.wait(interval):
+            try:
+                self._post(f"/jobs/{job_id}/heartbeat")
+            except LeaseLostError:
+                logger.warning("Lease perdido para el trabajo %s", job_id)
+                lost.set()
+                return
+            except requests.RequestException as e:
+                logger.warning("Heartbeat fallido para %s: %s", job_id, e)
+
+    def run_job(self, job: dict):
+        job_id = job["job_id"]
+        logger.info("Trabajo %s: %s de %s", job_id, job["kind"], job["recording_id"])
+
+        lost = threading.Event()
+        done = threading.Event()
+        heartbeat = threading.Thread(
+            target=self._heartbeat_loop,
+            args=(job_id, max(1.0, job["lease_secs"] / 3), lost, done),
+            daemon=True,
+        )
+        heartbeat.start()
+        workdir = Path(tempfile.mkdtemp(prefix="callscribe-worker-"))
+        try:
+            if job["kind"] in ("transcribe", "process"):
+                txt_path = self._transcribe(job, workdir)
+            else:
+                txt_path = workdir / f"{job['recording_id']}.txt"
+                txt_path.write_text(self._get(f"/jobs/{job_id}/transcript").text, encoding="utf-8")
+
+            if lost.is_set():
+                raise LeaseLostError(job_id)
+
+            if job["kind"] in ("summarize", "process"):
+                md_path = self.summarizer.summarize(str(txt_path), str(workdir), job["recording_date"])
+                if lost.is_set():
+                    raise LeaseLostError(job_id)
+                self._post(f"/jobs/{job_id}/summary",
+                           markdown=Path(md_path).read_text(encoding="utf-8"))
+            logger.info("Trabajo %s completado", job_id)
+        except LeaseLostError:
+            logger.warning("Trabajo %s abandonado: el servidor lo reasigno", job_id)
+        except Exception as e:
+            logger.error("Trabajo %s fallido: %s", job_id, e)
+            try:
+                self._post(f"/jobs/{job_id}/fail", error=str(e))
+            except (requests.RequestException, LeaseLostError):
+                pass
+        finally:
+            done.set()
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    def _transcribe(self, job: dict, workdir: Path) -> Path:
+        job_id = job["job_id"]
+        audio_path = workdir / f"{job['recording_id']}.mp3"
+        with self._get(f"/jobs/{job_id}/audio", stream=True) as resp:
+            with open(audio_path, "wb") as f:
+                for chunk in resp.iter_content(DOWNLOAD_CHUNK_SIZE):
+                    f.write(chunk)
+
+        result = self.transcriber.transcribe(str(audio_path), str(workdir))
+        text = Path(result["txt_path"]).read_text(encoding="utf-8")
+        data = json.loads(Path(result["json_path"]).read_text(encoding="utf-8"))
+        self._post(
+            f"/jobs/{job_id}/transcript",
+            text=text,
+            segments=data["segments"],
+            language=data.get("language"),
+            duration=data.get("duration"),
+        )
+        return Path(result["txt_path"])
@@ -9,286 +9,526 @@ from pathlib import Path
 import pyaudiowpatch as pyaudio
 
 import config
-from recorder.mixer import mix_to_stereo, wav_to_mp3
+from processing import events, timeline
+from recorder.devices import DeviceTopology
+from recorder.mixer import downmix_resample, mix_sources, wav_to_mp3
+from recorder.sources import Source, configured_sources, manifest_path, mix_inputs, save_manifest
 
 logger = logging.getLogger(__name__)
 
 CHUNK_DURATION_MS = 30
 FLUSH_INTERVAL_SECS = 5
-
-
-class AudioRecorder:
-    def __init__(self, output_dir: str):
-        self.output_dir = Path(output_dir)
-        self.output_dir.mkdir(parents=True, exist_ok=True)
-        self._pa: pyaudio.PyAudio | None = None
-        self._recording = False
-        self._recording_id: str | None = None
-        self._started_at: str | None = None
-        self._threads: list[threading.Thread] = []
-        self._lock = threading.Lock()
-        self._loopback_wav: Path | None = None
-        self._mic_wav: Path | None = None
-        self._loopback_wf: wave.Wave_write | None = None
-        self._mic_wf: wave.Wave_write | None = None
-
-    def _get_pa(self) -> pyaudio.PyAudio:
-        if self._pa is None:
-            self._pa = pyaudio.PyAudio()
-        return self._pa
-
-    def list_devices(self) -> list[dict]:
-        pa = self._get_pa()
-        devices = []
-        for i in range(pa.get_device_count()):
-            info = pa.get_device_info_by_index(i)
-            devices.append({
-                "index": i,
-                "name": info["name"],
-                "maxInputChannels": info["maxInputChannels"],
-                "maxOutputChannels": info["maxOutputChannels"],
-                "defaultSampleRate": info["defaultSampleRate"],
-                "isLoopback": info.get("isLoopbackDevice", False),
-            })
-        return devices
-
-    def _find_loopback_device(self) -> dict | None:
-        pa = self._get_pa()
-        try:
-            wasapi_info = pa.get_host_api_info_by_type(pyaudio.paWASAPI)
-        except OSError:
-            logger.warning("WASAPI no disponible")
+# A deficit larger than this between two reads counts as a gap (lost audio)
+GAP_THRESHOLD_MS = 100
+# Failed reads in a row (~1.5 s) before a stream is given up as unplugged
+MAX_CONSECUTIVE_ERRORS = 50
+
+
+class StreamHealth:
+    """Contadores de salud de un stream de captura.
+    Se actualiza desde el hilo de grabacion y se lee desde la API.
+    """
+
+    def __init__(self, name: str, device_rate: int, target_rate: int,
+                 requested_mono: float | None = None):
+        self.name = name
+        self.device_rate = device_rate
+        self.target_rate = target_rate
+        # When recording was requested and when the first audio reached the WAV
+        self.requested_mono = requested_mono
+        self.first_frame_mono: float | None = None
+        self.started_mono: float | None = None
+        self.stopped_mono: float | None = None
+        self.frames_read = 0
+        self.frames_written = 0
+        self.reads = 0
+        self.read_errors = 0
+        self.gaps = 0
+        self.max_gap_ms = 0.0
+        self._last_deficit = 0
+
+    def start(self):
+        self.started_mono = time.monotonic()
+
+    def stop(self):
+        self.stopped_mono = time.monotonic()
+
+    def record_read(self, device_frames: int, written_frames: int):
+        self.reads += 1
+        self.frames_read += device_frames
+        self.frames_written += written_frames
+
+        deficit = self.expected_frames() - self.frames_read
+        jump = deficit - self._last_deficit
+        if jump * 1000 / self.device_rate > GAP_THRESHOLD_MS:
+            self.gaps += 1
+            self.max_gap_ms = max(self.max_gap_ms, jump * 1000 / self.device_rate)
+        self._last_deficit = max(self._last_deficit, deficit)
+
+    def record_error(self):
+        self.read_errors += 1
+
+    def start_latency_ms(self) -> int | None:
+        if self.requested_mono is None or self.first_frame_mono is None:
             return None
+        return round((self.first_frame_mono - self.requested_mono) * 1000)
 
-        default_output_idx = wasapi_info["defaultOutputDevice"]
-        default_output = pa.get_device_info_by_index(default_output_idx)
+    def elapsed_secs(self) -> float:
+        if self.started_mono is None:
+            return 0.0
+        return (self.stopped_mono or time.monotonic()) - self.started_mono
 
-        for i in range(pa.get_device_count()):
-            info = pa.get_device_info_by_index(i)
-            if (
-                info.get("isLoopbackDevice", False)
-                and info["name"].startswith(default_output["name"].split(" (")[0])
-            ):
-                return info
+    def expected_frames(self) -> int:
+        return int(self.elapsed_secs() * self.device_rate)
 
-        # Fallback: any loopback device
-        for i in range(pa.get_device_count()):
-            info = pa.get_device_info_by_index(i)
-            if info.get("isLoopbackDevice", False):
-                return info
+    def effective_rate(self) -> float:
+        elapsed = self.elapsed_secs()
+        return self.frames_read / elapsed if elapsed > 0 else 0.0
 
-        return None
+    def snapshot(self) -> dict:
+        expected = self.expected_frames()
+        missing = max(0, expected - self.frames_read)
+        rate = self.effective_rate()
+        return {
+            "name": self.name,
+            "device_rate": self.device_rate,
+            "elapsed_secs": round(self.elapsed_secs(), 2),
+            "frames_read": self.frames_read,
+            "frames_expected": expected,
+            "captured_secs": round(self.frames_written / self.target_rate, 2),
+            "missing_secs": round(missing / self.device_rate, 2),
+            "fill_ratio": round(self.frames_read / expected, 4) if expected else 1.0,
+            "clock_ppm": round((rate / self.device_rate - 1) * 1e6) if rate else 0,
+            "reads": self.reads,
+            "read_errors": self.read_errors,
+            "gaps": self.gaps,
+            "max_gap_ms": round(self.max_gap_ms),
+            "start_latency_ms": self.start_latency_ms(),
+        }
 
-    def _find_mic_device(self) -> dict | None:
-        pa = self._get_pa()
+
+class CaptureSink:
+    """Destino de un stream durante una grabacion: WAV temporal y su salud."""
+
+    def __init__(self, wav_path: Path, health: StreamHealth):
+        self.wav_path = wav_path
+        self.health = health
+        self.wf = wave.open(str(wav_path), "wb")
+        self.wf.setnchannels(1)
+        self.wf.setsampwidth(2)
+        self.wf.setframerate(config.SAMPLE_RATE)
+        self._frames_since_flush = 0
+        self._flush_frames = int(config.SAMPLE_RATE * FLUSH_INTERVAL_SECS)
+
+    def write(self, device_frames: int, data: bytes):
+        if self.health.first_frame_mono is None:
+            # Expected frames count from here, not from while the device was opening
+            self.health.start()
+            self.health.first_frame_mono = self.health.started_mono
+            logger.info("Captura %s: primer audio %d ms despues de pulsar grabar",
+                        self.health.name, self.health.start_latency_ms())
+        self.wf.writeframes(data)
+        self.health.record_read(device_frames, len(data) // 2)
+        self._frames_since_flush += len(data) // 2
+        if self._frames_since_flush >= self._flush_frames:
+            self.wf._ensure_header_written(0)  # noqa: SLF001
+            self._frames_since_flush = 0
+
+    def close(self):
         try:
-            wasapi_info = pa.get_host_api_info_by_type(pyaudio.paWASAPI)
-            default_input_idx = wasapi_info["defaultInputDevice"]
-            if default_input_idx >= 0:
-                return pa.get_device_info_by_index(default_input_idx)
-        except OSError:
+            self.wf.close()
+        except Exception:
             pass
 
-        default_idx = pa.get_default_input_device_info()
-        if default_idx:
-            return default_idx
-        return None
 
-    def _record_stream(self, device_info: dict, wav_path: Path, is_loopback: bool):
-        pa = self._get_pa()
-        sample_rate = int(device_info["defaultSampleRate"])
+class CaptureStream:
+    """Captura de un dispositivo en su propio hilo.
+
+    El stream se abre dentro del hilo y cada bloque leido se entrega al sink
+    enganchado; sin sink el audio se descarta. Asi un stream "armado" puede
+    quedar abierto entre grabaciones y empezar a escribir en cuanto se
+    engancha el WAV de la siguiente.
+    """
 
+    def __init__(self, pa: pyaudio.PyAudio, name: str, device_info: dict, is_loopback: bool):
+        self.pa = pa
+        self.name = name
+        self.device_info = device_info
+        self.sample_rate = int(device_info["defaultSampleRate"])
         # Para loopback, usar canales de salida; para mic, canales de entrada
         if is_loopback:
             channels = int(device_info.get("maxInputChannels") or device_info.get("maxOutputChannels") or 2)
         else:
             channels = int(device_info["maxInputChannels"])
-        channels = max(1, channels)
-
-        chunk_size = max(1, int(sample_rate * CHUNK_DURATION_MS / 1000))
-        target_rate = config.SAMPLE_RATE
-
-        wf = wave.open(str(wav_path), "wb")
-        wf.setnchannels(1)
-        wf.setsampwidth(2)
-        wf.setframerate(target_rate)
-
-        if is_loopback:
-            self._loopback_wf = wf
-        else:
-            self._mic_wf = wf
+        self.channels = max(1, channels)
+        self.chunk_size = max(1, int(self.sample_rate * CHUNK_DURATION_MS / 1000))
+        self.failed: Exception | None = None
+        self._sink: CaptureSink | None = None
+        self._sink_lock = threading.Lock()
+        self._running = False
+        self._thread: threading.Thread | None = None
+        # Set once the capture thread has exited (or the stream is closed unstarted)
+        self._finished = threading.Event()
+
+    def start(self):
+        self._running = True
+        self._thread = threading.Thread(target=self._run, daemon=True, name=f"capture-{self.name}")
+        self._thread.start()
+
+    def is_alive(self) -> bool:
+        return self._thread is not None and self._thread.is_alive() and self.failed is None
+
+    def is_open(self) -> bool:
+        """Creado y con el hilo de captura aun sin terminar: usa PortAudio."""
+        return not self._finished.is_set()
+
+    def attach(self, sink: CaptureSink):
+        with self._sink_lock:
+            self._sink = sink
+
+    def detach(self) -> CaptureSink | None:
+        with self._sink_lock:
+            sink, self._sink = self._sink, None
+        if sink is not None and sink.health.started_mono is not None:
+            sink.health.stop()
+        return sink
+
+    def close(self, wait: bool = True):
+        self._running = False
+        if self._thread is None:
+            self._finished.set()
+        elif wait:
+            self._thread.join(timeout=5)
+
+    def _run(self):
+        try:
+            self._capture()
+        finally:
+            self._finished.set()
 
-        stream = None
+    def _capture(self):
         try:
-            stream = pa.open(
+            stream = self.pa.open(
                 format=pyaudio.paInt16,
-                channels=channels,
-                rate=sample_rate,
+                channels=self.channels,
+                rate=self.sample_rate,
                 input=True,
-                input_device_index=device_info["index"],
-                frames_per_buffer=chunk_size,
+                input_device_index=self.device_info["index"],
+                frames_per_buffer=self.chunk_size,
             )
         except Exception as e:
-            logger.error("No se pudo abrir stream para %s: %s", device_info["name"], e)
-            wf.close()
+            logger.error("No se pudo abrir stream para %s: %s", self.device_info["name"], e)
+            self.failed = e
             return
 
-        frames_since_flush = 0
-        flush_frames = int(target_rate * FLUSH_INTERVAL_SECS)
-
+        target_rate = config.SAMPLE_RATE
+        consecutive_errors = 0
         try:
-            while self._recording:
+            while self._running:
                 try:
-                    data = stream.read(chunk_size, exception_on_overflow=False)
-                except Exception:
+                    # PyAudio drops the chunk when it raises on overflow; losses
+                    # show up instead as gaps against the wall clock
+                    data = stream.read(self.chunk_size, exception_on_overflow=False)
+                except Exception as e:
+                    consecutive_errors += 1
+                    with self._sink_lock:
+                        sink = self._sink
+                        if sink is not None:
+                            if sink.health.read_errors == 0:
+                                logger.warning("Error leyendo de %s: %s", self.device_info["name"], e)
+                            sink.health.record_error()
+                    if consecutive_errors >= MAX_CONSECUTIVE_ERRORS:
+                        # Device most likely unplugged
+                        logger.error("Stream %s sin datos, se cierra: %s", self.device_info["name"], e)
+                        self.failed = e
+                        return
+                    time.sleep(CHUNK_DURATION_MS / 1000)
                     continue
 
-                # Convert to mono if multichannel
-                if channels > 1:
-                    import struct
-                    samples = struct.unpack(f"<{len(data) // 2}h", data)
-                    mono = []
-                    for i in range(0, len(samples), channels):
-                        frame_samples = samples[i : i + channels]
-                        mono.append(int(sum(frame_samples) / channels))
-                    data = struct.pack(f"<{len(mono)}h", *mono)
-
-                # Resample if needed
-                if sample_rate != target_rate:
-                    import struct
-                    samples = struct.unpack(f"<{len(data) // 2}h", data)
-                    ratio = target_rate / sample_rate
-                    new_len = int(len(samples) * ratio)
-                    if new_len > 0:
-                        resampled = []
-                        for i in range(new_len):
-                            src_idx = min(int(i / ratio), len(samples) - 1)
-                            resampled.append(samples[src_idx])
-                        data = struct.pack(f"<{len(resampled)}h", *resampled)
-
-                wf.writeframes(data)
-                frames_since_flush += len(data) // 2
-                if frames_since_flush >= flush_frames:
-                    wf._ensure_header_written(0)  # noqa: SLF001
-                    frames_since_flush = 0
+                consecutive_errors = 0
+                with self._sink_lock:
+                    if self._sink is None:
+                        continue
+                    device_frames = len(data) // (2 * self.channels)
+                    self._sink.write(device_frames, downmix_resample(
+                        data, self.channels, self.sample_rate, target_rate))
         finally:
-            if stream:
-                try:
-                    stream.stop_stream()
-                    stream.close()
-                except Exception:
-                    pass
-            wf.close()
+            try:
+                stream.stop_stream()
+                stream.close()
+            except Exception:
+                pass
+
 
-    def start(self, loopback_device_index: int | None = None,
-              mic_device_index: int | None = None) -> str:
+class CaptureSession:
+    """Estado de una grabacion: streams enganchados, WAV temporales y salud.
+
+    `stop()` desengancha la sesion del recorder para que pueda empezar otra
+    grabacion mientras esta se finaliza (mezcla + MP3) en segundo plano.
+    """
+
+    def __init__(self, recording_id: str, output_dir: Path, requested_mono: float,
+                 sources: list[Source]):
+        self.recording_id = recording_id
+        self.started_at = datetime.now(timezone.utc).isoformat()
+        self.requested_mono = requested_mono
+        self.started_mono = time.monotonic()
+        self.stopped_mono: float | None = None
+        self.active = True
+        self.armed = False
+        self.setup_ms: float | None = None
+        # Streams attached to this session and, outside armed mode, owned by it
+        self.attached: list[CaptureStream] = []
+        self.owned: list[CaptureStream] = []
+        # One mono WAV per source: <id>_<source>.wav, plus a manifest for recovery
+        self.sources = sources
+        self.wavs = {s.name: output_dir / f"{recording_id}_{s.name}.wav" for s in sources}
+        self.manifest = manifest_path(output_dir, recording_id)
+        self.sinks: dict[str, CaptureSink] = {}
+        self.health: dict[str, StreamHealth] = {}
+
+    @property
+    def elapsed_secs(self) -> float:
+        return (self.stopped_mono or time.monotonic()) - self.started_mono
+
+
+class AudioRecorder:
+    def __init__(self, output_dir: str, refresh_secs: float = 0):
+        self.output_dir = Path(output_dir)
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        # Shared with the topology so PortAudio is never reinitialized while a
+        # stream is being opened (reentrant: the topology is used under it)
+        self._lock = threading.RLock()
+        self.topology = DeviceTopology(busy=self._busy, refresh_secs=refresh_secs, lock=self._lock)
+        self._session: CaptureSession | None = None
+        self._armed: dict[str, CaptureStream] = {}
+        self._armed_request: list[Source] | None = None
+        self._streams: list[CaptureStream] = []
+
+    def _busy(self) -> bool:
+        """Hay streams abiertos: PortAudio no se puede reiniciar."""
         with self._lock:
-            if self._recording:
-                raise RuntimeError("Ya hay una grabacion en curso")
+            return any(s.is_open() for s in self._streams)
 
-            self._recording_id = str(uuid.uuid4())
-            self._started_at = datetime.now(timezone.utc).isoformat()
-            self._recording = True
+    def _get_pa(self) -> pyaudio.PyAudio:
+        return self.topology.pa
 
-            self._loopback_wav = self.output_dir / f"{self._recording_id}_loopback.wav"
-            self._mic_wav = self.output_dir / f"{self._recording_id}_mic.wav"
+    def list_devices(self) -> list[dict]:
+        return self.topology.devices()
 
-            pa = self._get_pa()
-            loopback_info = None
-            mic_info = None
+    def device_topology(self) -> dict:
+        return self.topology.snapshot()
 
-            if loopback_device_index is not None:
-                loopback_info = pa.get_device_info_by_index(loopback_device_index)
+    def refresh_devices(self) -> bool:
+        with self._lock:
+            if self._busy():
+                raise RuntimeError("No se puede refrescar con streams de captura abiertos")
+            return self.topology.refresh(reinit=True)
+
+    def _resolve_devices(self, sources: list[Source]) -> dict[str, dict]:
+        """Dispositivo de cada fuente; las que no se encuentran se omiten."""
+        infos = {}
+        for source in sources:
+            if source.device_index is not None:
+                info = self.topology.device_info(source.device_index)
+            elif source.kind == "loopback":
+                info = self.topology.default_loopback()
             else:
-                loopback_info = self._find_loopback_device()
+                info = self.topology.default_mic()
+            if not info:
+                logger.warning("No se encontro dispositivo para la fuente %s", source.name)
+                continue
+            duplicate = next((n for n, i in infos.items() if i["index"] == info["index"]), None)
+            if duplicate:
+                logger.warning("La fuente %s usa el mismo dispositivo que %s, se omite",
+                               source.name, duplicate)
+                continue
+            infos[source.name] = info
+        return infos
+
+    def _open_streams(self, sources: list[Source], infos: dict[str, dict]) -> dict[str, CaptureStream]:
+        kinds = {s.name: s.kind for s in sources}
+        streams = {
+            name: CaptureStream(self._get_pa(), name, info, is_loopback=kinds[name] == "loopback")
+            for name, info in infos.items()
+        }
+        # Streams whose thread already exited no longer hold PortAudio
+        self._streams = [s for s in self._streams if s.is_open()] + list(streams.values())
+        return streams
 
-            if mic_device_index is not None:
-                mic_info = pa.get_device_info_by_index(mic_device_index)
-            else:
-                mic_info = self._find_mic_device()
-
-            self._threads = []
-
-            if loopback_info:
-                logger.info("Loopback: %s", loopback_info["name"])
-                t = threading.Thread(
-                    target=self._record_stream,
-                    args=(loopback_info, self._loopback_wav, True),
-                    daemon=True,
-                )
-                t.start()
-                self._threads.append(t)
-            else:
-                logger.warning("No se encontro dispositivo loopback, grabando silencio en ese canal")
-                self._create_silent_wav(self._loopback_wav)
-
-            if mic_info:
-                logger.info("Microfono: %s", mic_info["name"])
-                t = threading.Thread(
-                    target=self._record_stream,
-                    args=(mic_info, self._mic_wav, False),
-                    daemon=True,
-                )
-                t.start()
-                self._threads.append(t)
-            else:
-                logger.warning("No se encontro microfono, grabando silencio en ese canal")
-                self._create_silent_wav(self._mic_wav)
+    # -- Armed mode --
 
-            if not loopback_info and not mic_info:
-                self._recording = False
-                raise RuntimeError("No se encontro ningun dispositivo de audio")
+    def arm(self, sources: list[Source] | None = None):
+        """Deja abiertos los streams de las fuentes elegidas, descartando el
+        audio, para que `start()` solo tenga que engancharles los WAV.
+        """
+        with self._lock:
+            self._arm_locked(sources or configured_sources())
 
-            return self._recording_id
+    def _arm_locked(self, sources: list[Source]):
+        if self._armed:
+            return
+        infos = self._resolve_devices(sources)
+        self._armed = self._open_streams(sources, infos)
+        self._armed_request = sources
+        for stream in self._armed.values():
+            stream.start()
+        logger.info("Captura armada: %s", ", ".join(i["name"] for i in infos.values()) or "sin dispositivos")
+
+    def disarm(self):
+        with self._lock:
+            self._armed_request = None
+            self._disarm_locked()
 
-    def _create_silent_wav(self, path: Path):
-        wf = wave.open(str(path), "wb")
-        wf.setnchannels(1)
-        wf.setsampwidth(2)
-        wf.setframerate(config.SAMPLE_RATE)
-        wf.close()
+    def _disarm_locked(self):
+        for stream in self._armed.values():
+            stream.close(wait=False)
+        self._armed = {}
 
-    def stop(self) -> dict:
-        with self._lock:
-            if not self._recording:
-                raise RuntimeError("No hay grabacion en curso")
+    def is_armed(self) -> bool:
+        return self._armed_request is not None
 
-            self._recording = False
-            recording_id = self._recording_id
-            started_at = self._started_at
+    def _take_armed(self, sources: list[Source]) -> dict[str, CaptureStream] | None:
+        """Streams armados utilizables para esta grabacion, o None."""
+        if not self._armed or self._armed_request is None:
+            return None
+        if [s.key() for s in self._armed_request] != [s.key() for s in sources]:
+            return None
+        if all(s.is_alive() for s in self._armed.values()):
+            return self._armed
+        # A device vanished or failed while armed: re-arm after this recording
+        logger.warning("Streams armados no disponibles, abriendo de nuevo")
+        self._disarm_locked()
+        self.topology.invalidate()
+        return None
 
-        # Wait for threads to finish
-        for t in self._threads:
-            t.join(timeout=5)
-        self._threads = []
+    # -- Recording --
 
-        # Force close any lingering WAV file handles
-        for wf_ref in [self._loopback_wf, self._mic_wf]:
-            if wf_ref is not None:
-                try:
-                    wf_ref.close()
-                except Exception:
-                    pass
-        self._loopback_wf = None
-        self._mic_wf = None
+    def start(self, sources: list[Source] | None = None) -> str:
+        """Empieza a grabar las fuentes dadas (por defecto loopback + microfono),
+        cada una en su propio stream y WAV temporal.
+        """
+        requested = time.monotonic()
+        sources = sources or configured_sources()
+        with self._lock:
+            if self._session is not None:
+                raise RuntimeError("Ya hay una grabacion en curso")
+
+            session = CaptureSession(str(uuid.uuid4()), self.output_dir, requested, sources)
+            streams = self._take_armed(sources)
+            session.armed = streams is not None
+            if streams is None:
+                streams = self._open_streams(sources, self._resolve_devices(sources))
+                session.owned = list(streams.values())
+            if not streams:
+                raise RuntimeError("No se encontro ningun dispositivo de audio")
 
-        # Mix to stereo WAV
+            try:
+                save_manifest(session.manifest, sources)
+            except OSError:
+                # Never started: close them or they would count as open forever
+                for stream in session.owned:
+                    stream.close(wait=False)
+                raise
+            for source in sources:
+                stream = streams.get(source.name)
+                if stream is None:
+                    continue
+                logger.info("Fuente %s (%s, canal %s): %s", source.name, source.kind,
+                            source.channel, stream.device_info["name"])
+                health = StreamHealth(stream.device_info["name"], stream.sample_rate,
+                                      config.SAMPLE_RATE, requested_mono=requested)
+                sink = CaptureSink(session.wavs[source.name], health)
+                session.sinks[source.name] = sink
+                session.health[source.name] = health
+                stream.attach(sink)
+                session.attached.append(stream)
+
+            for stream in session.owned:
+                stream.start()
+            session.setup_ms = round((time.monotonic() - requested) * 1000, 1)
+            self._session = session
+        events.publish("capture.started", recording_id=session.recording_id, armed=session.armed,
+                       sources=list(session.sinks))
+        return session.recording_id
+
+    def stop(self) -> CaptureSession:
+        """Detiene la captura y retorna la sesion sin esperar a mezclarla.
+        El recorder queda libre para una nueva grabacion; la sesion se
+        completa con `finalize()`.
+        """
+        with self._lock:
+            session = self._session
+            if session is None:
+                raise RuntimeError("No hay grabacion en curso")
+            session.active = False
+            session.stopped_mono = time.monotonic()
+            # Armed streams keep running and go back to discarding audio
+            for stream in session.attached:
+                stream.detach()
+            for stream in session.owned:
+                stream.close(wait=False)
+            self._session = None
+            if self._armed_request is not None and not self._armed:
+                self._arm_locked(self._armed_request)
+        events.publish("capture.stopped", recording_id=session.recording_id,
+                       elapsed_secs=round(session.elapsed_secs, 1))
+        return session
+
+    def finalize(self, session: CaptureSession) -> dict:
+        """Espera a los hilos de captura, mezcla a stereo, convierte a MP3 y
+        limpia los temporales. Puede tardar minutos en llamadas largas.
+        """
+        recording_id = session.recording_id
+
+        # Wait for the session's own capture threads to finish
+        with timeline.span("join", streams=len(session.owned)):
+            for stream in session.owned:
+                stream.close(wait=True)
+                if stream.failed is not None:
+                    self.topology.invalidate()
+        session.owned = []
+
+        capture_health = self._health_report(session)
+        timeline.record(
+            recording_id, "capture", session.started_at, session.elapsed_secs * 1000,
+            sources=[s.name for s in session.sources if s.name in session.health],
+            armed=session.armed, setup_ms=session.setup_ms,
+            start_latency_ms=capture_health and capture_health["start_latency_ms"],
+        )
+        if capture_health:
+            for name, h in capture_health["streams"].items():
+                if h["read_errors"] or h["gaps"]:
+                    logger.warning(
+                        "Captura %s: %d errores de lectura, %d cortes, %.1fs perdidos",
+                        name, h["read_errors"], h["gaps"], h["missing_secs"],
+                    )
+
+        for sink in session.sinks.values():
+            sink.close()
+        session.sinks = {}
+
+        # Mix the sources to a stereo WAV, aligned on when each one started
         stereo_wav = self.output_dir / f"{recording_id}_stereo.wav"
+        offsets = self._alignment_ms(session)
+        save_manifest(session.manifest, session.sources, offsets)
         try:
-            mix_to_stereo(self._loopback_wav, self._mic_wav, stereo_wav)
+            with timeline.span("mix", sources=len(session.wavs)) as attrs:
+                frames = mix_sources(mix_inputs(session.sources, session.wavs, offsets), stereo_wav)
+                attrs.update(frames=frames, output_bytes=stereo_wav.stat().st_size)
         except Exception as e:
             logger.error("Error mezclando audio: %s", e)
             # Fallback: use whichever file exists and has content
-            if self._loopback_wav.exists() and self._loopback_wav.stat().st_size > 44:
-                stereo_wav = self._loopback_wav
-            elif self._mic_wav.exists() and self._mic_wav.stat().st_size > 44:
-                stereo_wav = self._mic_wav
-            else:
+            stereo_wav = next((p for p in session.wavs.values()
+                               if p.exists() and p.stat().st_size > 44), None)
+            if stereo_wav is None:
                 raise
 
         # Convert to MP3
         mp3_path = self.output_dir / f"{recording_id}.mp3"
-        wav_to_mp3(stereo_wav, mp3_path)
+        with timeline.span("encode", input_bytes=stereo_wav.stat().st_size) as attrs:
+            wav_to_mp3(stereo_wav, mp3_path)
+            attrs["output_bytes"] = mp3_path.stat().st_size
 
         # Calculate duration
         try:
@@ -298,8 +538,8 @@ class AudioRecorder:
             duration_secs = 0
 
         # Cleanup temp files
-        for tmp in [self._loopback_wav, self._mic_wav]:
-            if tmp and tmp.exists():
+        for tmp in [*session.wavs.values(), session.manifest]:
+            if tmp.exists():
                 try:
                     tmp.unlink()
                 except OSError:
@@ -310,28 +550,79 @@ class AudioRecorder:
             except OSError:
                 pass
 
-        self._recording_id = None
-        self._started_at = None
-
+        events.publish("capture.finalized", recording_id=recording_id, duration_secs=duration_secs)
         return {
             "id": recording_id,
             "path": str(mp3_path.relative_to(config.BASE_DIR)),
             "duration_secs": duration_secs,
-            "started_at": started_at,
+            "started_at": session.started_at,
+            "capture_health": capture_health,
         }
 
+    def capture_health(self) -> dict | None:
+        """Salud de la captura en curso: cortes, errores y deriva entre streams."""
+        session = self._session
+        return self._health_report(session) if session else None
+
+    def _health_report(self, session: CaptureSession) -> dict | None:
+        health = dict(session.health)
+        if not health:
+            return None
+
+        streams = {name: h.snapshot() for name, h in health.items()}
+        latencies = [s["start_latency_ms"] for s in streams.values() if s["start_latency_ms"] is not None]
+        result = {
+            "streams": streams,
+            "drift_ms": None,
+            "drift_ppm": None,
+            "armed": session.armed,
+            "setup_ms": session.setup_ms,
+            # Until every stream delivered audio the start of the call is not fully captured
+            "start_latency_ms": max(latencies) if len(latencies) == len(streams) else None,
+        }
+
+        if len(health) > 1:
+            # Where each source's audio ends in the mix: placed at its start
+            # alignment, so a stream that merely started late is not drift
+            offsets = self._alignment_ms(session)
+            ends = [h.frames_written * 1000 / config.SAMPLE_RATE + offsets.get(name, 0.0)
+                    for name, h in health.items() if h.first_frame_mono is not None]
+            ppm = [s["clock_ppm"] for s in streams.values()]
+            if len(ends) > 1:
+                result["drift_ms"] = round(max(ends) - min(ends))
+            result["drift_ppm"] = max(ppm) - min(ppm)
+        return result
+
+    @staticmethod
+    def _alignment_ms(session: CaptureSession) -> dict[str, float]:
+        """Retardo de cada fuente respecto a la primera que dio audio: el WAV
+        de una fuente que arranco mas tarde empieza despues en la llamada.
+        """
+        firsts = {name: h.first_frame_mono for name, h in session.health.items()
+                  if h.first_frame_mono is not None}
+        if not firsts:
+            return {}
+        origin = min(firsts.values())
+        return {name: round((first - origin) * 1000, 1) for name, first in firsts.items()}
+
     def is_recording(self) -> bool:
-        return self._recording
+        return self._session is not None
 
     @property
     def current_recording_id(self) -> str | None:
-        return self._recording_id
+        session = self._session
+        return session.recording_id if session else None
 
     def terminate(self):
-        if self._recording:
-            self._recording = False
-            for t in self._threads:
-                t.join(timeout=3)
-        if self._pa:
-            self._pa.terminate()
-            self._pa = None
+        session = self._session
+        if session is not None:
+            session.active = False
+            self._session = None
+            for stream in session.attached:
+                stream.detach()
+            for sink in session.sinks.values():
+                sink.close()
+        for stream in self._streams:
+            stream.close(wait=True)
+        self._armed = {}
+        self.topology.terminate()
@@ -0,0 +1,173 @@
+"""Topologia de dispositivos de audio en cache.
+
+Enumerar PortAudio en cada inicio de grabacion cuesta tiempo justo cuando la
+llamada ya empezo. La topologia (lista de dispositivos, loopback y microfono
+por defecto) se calcula en una sola pasada y se guarda; se refresca con un
+temporizador, a demanda y cuando falla la apertura de un dispositivo.
+
+PortAudio congela la lista de dispositivos al inicializarse, asi que para
+ver dispositivos conectados o desconectados hay que reiniciarlo. Eso solo se
+hace cuando no hay streams abiertos (`busy()` falso), y con `lock` tomado
+durante la comprobacion y el reinicio: el recorder comparte su lock para que
+nadie abra un stream entre medio.
+"""
+import logging
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Callable
+
+import pyaudiowpatch as pyaudio
+
+logger = logging.getLogger(__name__)
+
+
+class DeviceTopology:
+    def __init__(self, busy: Callable[[], bool], refresh_secs: float = 30,
+                 lock=None):
+        self.busy = busy
+        self.refresh_secs = refresh_secs
+        self._pa: pyaudio.PyAudio | None = None
+        self._lock = lock or threading.RLock()
+        self._devices: list[dict] = []
+        self._default_loopback: dict | None = None
+        self._default_mic: dict | None = None
+        self._fingerprint: tuple = ()
+        self._stale = True
+        self.refreshed_at: str | None = None
+        self.enumerate_ms: float | None = None
+        self.changes = 0
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    @property
+    def pa(self) -> pyaudio.PyAudio:
+        with self._lock:
+            if self._pa is None:
+                self._pa = pyaudio.PyAudio()
+            return self._pa
+
+    def start(self):
+        self.refresh()
+        if self.refresh_secs > 0:
+            self._thread = threading.Thread(target=self._loop, daemon=True, name="device-topology")
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _loop(self):
+        while not self._stop.wait(self.refresh_secs):
+            with self._lock:
+                if self.busy():
+                    continue
+                try:
+                    self.refresh(reinit=True)
+                except Exception as e:
+                    logger.warning("No se pudo refrescar la lista de dispositivos: %s", e)
+
+    def invalidate(self):
+        """Marca la topologia como obsoleta (p. ej. un dispositivo no abrio)."""
+        self._stale = True
+
+    def refresh(self, reinit: bool = False) -> bool:
+        """Vuelve a enumerar los dispositivos. Con `reinit` se reinicia
+        PortAudio para detectar conexiones y desconexiones (solo sin streams
+        abiertos). Retorna True si la topologia cambio.
+        """
+        with self._lock:
+            if reinit and self._pa is not None and not self.busy():
+                self._pa.terminate()
+                self._pa = None
+            started = time.perf_counter()
+            devices, loopback, mic = self._enumerate(self.pa)
+            self.enumerate_ms = round((time.perf_counter() - started) * 1000, 1)
+
+            fingerprint = tuple((d["index"], d["name"], d["isLoopback"]) for d in devices)
+            changed = bool(self._fingerprint) and fingerprint != self._fingerprint
+            if changed:
+                self.changes += 1
+                logger.info("Cambio en los dispositivos de audio (%d dispositivos)", len(devices))
+            self._devices = devices
+            self._default_loopback = loopback
+            self._default_mic = mic
+            self._fingerprint = fingerprint
+            self._stale = False
+            self.refreshed_at = datetime.now(timezone.utc).isoformat()
+            return changed
+
+    def _enumerate(self, pa: pyaudio.PyAudio) -> tuple[list[dict], dict | None, dict | None]:
+        """Una sola pasada por los dispositivos y las APIs de WASAPI."""
+        infos = [pa.get_device_info_by_index(i) for i in range(pa.get_device_count())]
+        devices = [{
+            "index": info["index"],
+            "name": info["name"],
+            "maxInputChannels": info["maxInputChannels"],
+            "maxOutputChannels": info["maxOutputChannels"],
+            "defaultSampleRate": info["defaultSampleRate"],
+            "isLoopback": info.get("isLoopbackDevice", False),
+        } for info in infos]
+
+        try:
+            wasapi_info = pa.get_host_api_info_by_type(pyaudio.paWASAPI)
+        except OSError:
+            logger.warning("WASAPI no disponible")
+            wasapi_info = None
+
+        loopback = None
+        loopbacks = [info for info in infos if info.get("isLoopbackDevice", False)]
+        if wasapi_info is not None and loopbacks:
+            loopback = loopbacks[0]  # Fallback: any loopback device
+            if wasapi_info["defaultOutputDevice"] >= 0:
+                prefix = infos[wasapi_info["defaultOutputDevice"]]["name"].split(" (")[0]
+                loopback = next((info for info in loopbacks if info["name"].startswith(prefix)),
+                                loopback)
+
+        mic = None
+        if wasapi_info is not None and wasapi_info["defaultInputDevice"] >= 0:
+            mic = infos[wasapi_info["defaultInputDevice"]]
+        if mic is None:
+            try:
+                mic = pa.get_default_input_device_info()
+            except OSError:
+                mic = None
+        return devices, loopback, mic
+
+    def _current(self):
+        if self._stale:
+            self.refresh(reinit=not self.busy())
+
+    def devices(self) -> list[dict]:
+        with self._lock:
+            self._current()
+            return list(self._devices)
+
+    def default_loopback(self) -> dict | None:
+        with self._lock:
+            self._current()
+            return self._default_loopback
+
+    def default_mic(self) -> dict | None:
+        with self._lock:
+            self._current()
+            return self._default_mic
+
+    def device_info(self, index: int) -> dict:
+        return self.pa.get_device_info_by_index(index)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "refreshed_at": self.refreshed_at,
+                "enumerate_ms": self.enumerate_ms,
+                "changes": self.changes,
+                "default_loopback": self._default_loopback["name"] if self._default_loopback else None,
+                "default_mic": self._default_mic["name"] if self._default_mic else None,
+            }
+
+    def terminate(self):
+        self.stop()
+        with self._lock:
+            if self._pa is not None:
+                self._pa.terminate()
+                self._pa = None
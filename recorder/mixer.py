@@ -2,29 +2,106 @@ import struct
 import wave
 from pathlib import Path
 
-from pydub import AudioSegment
+import numpy as np
 
-import config
+from processing.audio_stream import probe_duration, transcode
 
+# Header size written by the wave module for PCM files
+WAV_HEADER_BYTES = 44
 
-def _read_wav_samples(wav_path: Path) -> tuple[list[int], int]:
-    """Lee un WAV mono y retorna (samples, framerate).
-    Si el archivo no existe, tiene 0 bytes o 0 frames, retorna lista vacia.
+
+# Frames mixed per block: memory stays bounded whatever the call length
+MIX_BLOCK_FRAMES = 1 << 16
+# Output channel gains for each placement of a source in the stereo mix
+PLACEMENT = {"L": (1.0, 0.0), "R": (0.0, 1.0), "LR": (1.0, 1.0)}
+
+
+class MixInput:
+    """Un WAV mono a mezclar: canal de destino, ganancia y desplazamiento en
+    frames (positivo = la fuente empieza mas tarde en la mezcla).
     """
-    if not wav_path.exists() or wav_path.stat().st_size < 44:
-        return [], config.SAMPLE_RATE
 
+    def __init__(self, path: Path, channel: str = "L", gain: float = 1.0, offset_frames: int = 0):
+        self.path = path
+        self.channel = channel
+        self.gain = gain
+        self.offset_frames = offset_frames
+
+
+def downmix_resample(data: bytes, channels: int, src_rate: int, dst_rate: int) -> bytes:
+    """Convierte un bloque PCM16 capturado a mono y lo remuestrea a dst_rate."""
+    samples = np.frombuffer(data, dtype="<i2")
+    # Convert to mono if multichannel (mean truncated toward zero)
+    if channels > 1:
+        frames = len(samples) // channels
+        samples = samples[: frames * channels].reshape(frames, channels).mean(axis=1).astype("<i2")
+
+    # Resample if needed (nearest previous sample)
+    if src_rate != dst_rate:
+        ratio = dst_rate / src_rate
+        new_len = int(len(samples) * ratio)
+        if new_len > 0:
+            idx = np.minimum((np.arange(new_len) / ratio).astype(np.int64), len(samples) - 1)
+            samples = samples[idx]
+
+    return samples.astype("<i2", copy=False).tobytes()
+
+
+def mix_sources(inputs: list[MixInput], output_wav: Path, block_frames: int = MIX_BLOCK_FRAMES) -> int:
+    """Mezcla N WAV mono en un WAV stereo, bloque a bloque.
+
+    Cada bloque se arma como una matriz (fuentes x frames) y se multiplica por
+    la matriz de ganancias (2 x fuentes): el coste crece linealmente con las
+    fuentes y la memoria depende solo del tamanio de bloque. Las fuentes
+    vacias o ausentes se ignoran; donde una fuente no tiene audio (antes de su
+    desplazamiento o tras su final) aporta silencio. Retorna los frames escritos.
+    """
+    readers = []
     try:
-        with wave.open(str(wav_path), "rb") as wf:
-            rate = wf.getframerate()
-            n_frames = wf.getnframes()
-            if n_frames == 0:
-                return [], rate
-            raw = wf.readframes(n_frames)
-            samples = list(struct.unpack(f"<{n_frames}h", raw))
-            return samples, rate
-    except Exception:
-        return [], config.SAMPLE_RATE
+        for inp in inputs:
+            if not inp.path.exists() or inp.path.stat().st_size <= WAV_HEADER_BYTES:
+                continue
+            wf = wave.open(str(inp.path), "rb")
+            if wf.getnframes() == 0 or wf.getnchannels() != 1 or wf.getsampwidth() != 2:
+                wf.close()
+                continue
+            skip = min(max(0, -inp.offset_frames), wf.getnframes())
+            wf.setpos(skip)
+            start = max(0, inp.offset_frames)
+            readers.append((inp, wf, start, start + wf.getnframes() - skip))
+
+        if not readers:
+            raise ValueError("Todos los archivos WAV estan vacios")
+        rates = {wf.getframerate() for _, wf, _, _ in readers}
+        if len(rates) > 1:
+            raise ValueError(f"Las fuentes tienen frecuencias distintas: {sorted(rates)}")
+
+        gains = np.array([[inp.gain * PLACEMENT[inp.channel][c] for inp, *_ in readers]
+                          for c in range(2)], dtype=np.float32)
+        total = max(end for *_, end in readers)
+        block = np.zeros((len(readers), block_frames), dtype=np.float32)
+
+        with wave.open(str(output_wav), "wb") as out:
+            out.setnchannels(2)
+            out.setsampwidth(2)
+            out.setframerate(rates.pop())
+            for pos in range(0, total, block_frames):
+                frames = min(block_frames, total - pos)
+                view = block[:, :frames]
+                view.fill(0)
+                for i, (_, wf, start, end) in enumerate(readers):
+                    lo, hi = max(pos, start), min(pos + frames, end)
+                    if hi > lo:
+                        data = np.frombuffer(wf.readframes(hi - lo), dtype="<i2")
+                        view[i, lo - pos : lo - pos + len(data)] = data
+                mixed = gains @ view
+                np.clip(mixed, -32768, 32767, out=mixed)
+                # Transpose to frames x channels: interleaved L, R, L, R, ...
+                out.writeframes(np.ascontiguousarray(mixed.T).astype("<i2").tobytes())
+        return total
+    finally:
+        for _, wf, _, _ in readers:
+            wf.close()
 
 
 def mix_to_stereo(loopback_wav: Path, mic_wav: Path, output_wav: Path):
@@ -32,44 +109,55 @@ def mix_to_stereo(loopback_wav: Path, mic_wav: Path, output_wav: Path):
     Canal izquierdo = loopback (sistema), canal derecho = microfono.
     Si uno de los archivos esta vacio, rellena con silencio.
     """
-    samples_l, rate_l = _read_wav_samples(loopback_wav)
-    samples_r, rate_r = _read_wav_samples(mic_wav)
-    rate = rate_l if samples_l else rate_r
+    mix_sources([MixInput(loopback_wav, "L"), MixInput(mic_wav, "R")], output_wav)
 
-    if not samples_l and not samples_r:
-        raise ValueError("Ambos archivos WAV estan vacios")
 
-    n_frames = max(len(samples_l), len(samples_r))
+def wav_to_mp3(wav_path: Path, mp3_path: Path):
+    """Convierte un archivo WAV a MP3 con ffmpeg, sin cargarlo en memoria."""
+    transcode(wav_path, mp3_path, "-c:a", "libmp3lame", "-b:a", "128k")
 
-    # Pad shorter channel with silence
-    if len(samples_l) < n_frames:
-        samples_l.extend([0] * (n_frames - len(samples_l)))
-    if len(samples_r) < n_frames:
-        samples_r.extend([0] * (n_frames - len(samples_r)))
 
-    # Interleave: L, R, L, R, ...
-    stereo = []
-    for l_sample, r_sample in zip(samples_l, samples_r):
-        stereo.append(l_sample)
-        stereo.append(r_sample)
+def _encoded_duration(path: Path) -> float:
+    duration = probe_duration(path)
+    if duration is None:
+        raise RuntimeError(f"No se pudo leer la duracion de {path.name}")
+    return duration
 
-    with wave.open(str(output_wav), "wb") as wf:
-        wf.setnchannels(2)
-        wf.setsampwidth(2)
-        wf.setframerate(rate)
-        wf.writeframes(struct.pack(f"<{len(stereo)}h", *stereo))
 
+def encode_speech(input_path: Path, output_path: Path, bitrate: str = "24k") -> float:
+    """Recodifica a Opus en modo voz, mucho mas compacto que el MP3 de 128k.
+    Retorna la duracion en segundos.
+    """
+    transcode(input_path, output_path, "-c:a", "libopus", "-b:a", bitrate, "-application", "voip")
+    return _encoded_duration(output_path)
 
-def wav_to_mp3(wav_path: Path, mp3_path: Path):
-    """Convierte un archivo WAV a MP3 usando pydub/ffmpeg."""
-    audio = AudioSegment.from_wav(str(wav_path))
-    audio.export(str(mp3_path), format="mp3", bitrate="128k")
+
+def repair_wav_header(wav_path: Path) -> bool:
+    """Corrige los tamanios del encabezado de un WAV que no se cerro (captura
+    interrumpida), a partir del tamanio real del archivo. Retorna False si no
+    tiene datos de audio.
+    """
+    size = wav_path.stat().st_size
+    if size <= WAV_HEADER_BYTES:
+        return False
+    with open(wav_path, "r+b") as f:
+        header = f.read(WAV_HEADER_BYTES)
+        if header[:4] != b"RIFF" or header[36:40] != b"data":
+            return False
+        data_bytes = size - WAV_HEADER_BYTES
+        block_align = struct.unpack("<H", header[32:34])[0] or 1
+        data_bytes -= data_bytes % block_align
+        f.seek(4)
+        f.write(struct.pack("<I", WAV_HEADER_BYTES - 8 + data_bytes))
+        f.seek(40)
+        f.write(struct.pack("<I", data_bytes))
+    return data_bytes > 0
 
 
 def convert_to_mp3(input_path: Path, output_path: Path) -> float:
     """Convierte cualquier formato de audio/video soportado por ffmpeg a MP3.
-    Retorna la duracion en segundos.
+    ffmpeg lee y codifica en streaming, asi que la memoria no depende de la
+    duracion. Retorna la duracion en segundos.
     """
-    audio = AudioSegment.from_file(str(input_path))
-    audio.export(str(output_path), format="mp3", bitrate="128k")
-    return len(audio) / 1000.0
+    transcode(input_path, output_path, "-c:a", "libmp3lame", "-b:a", "128k")
+    return _encoded_duration(output_path)
@@ -0,0 +1,124 @@
+"""Fuentes de captura de una grabacion.
+
+Cada fuente es un dispositivo (loopback de una salida o una entrada) que se
+captura en su propio stream y se mezcla en el WAV stereo final:
+
+- `channel`: L, R o LR. Por convencion el lado remoto (loopback) va a la
+  izquierda y el local (microfonos) a la derecha, que es lo que asumen el
+  mapa de voz y la compactacion de transcripciones.
+- `gain`: ganancia lineal aplicada en la mezcla.
+- `offset_ms`: retardo fijo de la fuente (negativo = adelantarla), sumado a
+  la alineacion automatica por el instante en que cada stream empezo a dar audio.
+"""
+import json
+from pathlib import Path
+
+import config
+from recorder.mixer import MixInput
+
+KINDS = ("loopback", "input")
+CHANNELS = ("L", "R", "LR")
+DEFAULT_CHANNEL = {"loopback": "L", "input": "R"}
+
+
+class Source:
+    def __init__(self, name: str, kind: str, device_index: int | None = None,
+                 channel: str | None = None, gain: float = 1.0, offset_ms: float = 0.0):
+        if not isinstance(name, str) or not name.isidentifier() or name == "stereo":
+            raise ValueError(f"Nombre de fuente no valido: {name}")
+        if kind not in KINDS:
+            raise ValueError(f"Tipo de fuente no valido: {kind} (loopback o input)")
+        channel = channel or DEFAULT_CHANNEL[kind]
+        if channel not in CHANNELS:
+            raise ValueError(f"Canal no valido para {name}: {channel} (L, R o LR)")
+        # bool is an int subclass, but True is not a device index
+        if device_index is not None and (
+            not isinstance(device_index, int) or isinstance(device_index, bool)
+        ):
+            raise ValueError(f"Dispositivo no valido para {name}: {device_index!r}")
+        try:
+            gain, offset_ms = float(gain), float(offset_ms)
+        except (TypeError, ValueError):
+            raise ValueError(f"Ganancia o desplazamiento no validos para {name}")
+        self.name = name
+        self.kind = kind
+        self.device_index = device_index
+        self.channel = channel
+        self.gain = gain
+        self.offset_ms = offset_ms
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "Source":
+        return cls(data["name"], data["kind"], data.get("device"), data.get("channel"),
+                   data.get("gain", 1.0), data.get("offset_ms", 0.0))
+
+    def to_dict(self) -> dict:
+        return {"name": self.name, "kind": self.kind, "device": self.device_index,
+                "channel": self.channel, "gain": self.gain, "offset_ms": self.offset_ms}
+
+    def key(self) -> tuple:
+        return tuple(self.to_dict().values())
+
+
+def default_sources(loopback_index: int | None = None, mic_index: int | None = None,
+                    extra: list[dict] | None = None) -> list["Source"]:
+    """Loopback + microfono (como siempre) mas las fuentes adicionales configuradas."""
+    sources = [Source("loopback", "loopback", loopback_index),
+               Source("mic", "input", mic_index)]
+    return check_unique(sources + [Source.from_dict(d) for d in extra or []])
+
+
+def sources_from_dicts(data: list[dict]) -> list[Source]:
+    """Lista completa de fuentes (mismo formato que CALLSCRIBE_EXTRA_SOURCES),
+    con las mismas comprobaciones que las configuradas. ValueError si alguna
+    no es valida.
+    """
+    if not data:
+        raise ValueError("Se necesita al menos una fuente de captura")
+    try:
+        return check_unique([Source.from_dict(d) for d in data])
+    except (KeyError, TypeError) as e:
+        raise ValueError(f"Falta o no es valido el campo {e}")
+
+
+def check_unique(sources: list[Source]) -> list[Source]:
+    # Two sources with one name would write the same <id>_<name>.wav
+    names = [s.name for s in sources]
+    if len(set(names)) != len(names):
+        raise ValueError("Los nombres de las fuentes de captura deben ser unicos")
+    return sources
+
+
+def configured_sources() -> list[Source]:
+    return default_sources(config.LOOPBACK_DEVICE_INDEX, config.MIC_DEVICE_INDEX, config.EXTRA_SOURCES)
+
+
+def manifest_path(output_dir: Path, recording_id: str) -> Path:
+    return output_dir / f"{recording_id}_sources.json"
+
+
+def save_manifest(path: Path, sources: list[Source], offsets_ms: dict[str, float] | None = None):
+    data = [{**s.to_dict(), "auto_offset_ms": (offsets_ms or {}).get(s.name, 0.0)} for s in sources]
+    path.write_text(json.dumps(data), encoding="utf-8")
+
+
+def load_manifest(path: Path) -> tuple[list[Source], dict[str, float]] | None:
+    try:
+        data = json.loads(path.read_text(encoding="utf-8"))
+        return ([Source.from_dict(d) for d in data],
+                {d["name"]: d.get("auto_offset_ms", 0.0) for d in data})
+    except (OSError, ValueError, KeyError):
+        return None
+
+
+def mix_inputs(sources: list[Source], wavs: dict[str, Path],
+               offsets_ms: dict[str, float] | None = None) -> list[MixInput]:
+    """Entradas del mezclador para los WAV de las fuentes: canal, ganancia y
+    desplazamiento (fijo de la fuente + alineacion automatica) en frames.
+    """
+    offsets_ms = offsets_ms or {}
+    return [
+        MixInput(wavs[s.name], s.channel, s.gain,
+                 round((s.offset_ms + offsets_ms.get(s.name, 0.0)) * config.SAMPLE_RATE / 1000))
+        for s in sources if s.name in wavs
+    ]
@@ -1,17 +1,43 @@
 from fastapi import FastAPI
-from fastapi.staticfiles import StaticFiles
 
 import config
+from processing.coordinator import Coordinator
+from processing.jobs import JobQueue
+from processing.storage import StorageCompactor
+from server.event_routes import create_event_router
+from server.export_routes import create_export_router
+from server.http_cache import CachedStaticFiles, CompressionMiddleware
 from server.routes import create_router
+from server.storage_routes import create_storage_router
+from server.worker_routes import create_worker_router
 
 
-def create_app(db, recorder, transcriber, summarizer) -> FastAPI:
+def create_app(db, recorder, transcriber, summarizer, jobs: JobQueue | None = None,
+               coordinator: Coordinator | None = None,
+               finalizer: JobQueue | None = None,
+               compactor: StorageCompactor | None = None) -> FastAPI:
     app = FastAPI(title="CallScribe", version="0.1.0")
+    app.add_middleware(CompressionMiddleware)
 
-    router = create_router(db, recorder, transcriber, summarizer)
+    if jobs is None:
+        jobs = JobQueue(workers=config.JOB_WORKERS)
+    if finalizer is None:
+        finalizer = JobQueue(workers=1, name="finalize")
+    router = create_router(db, recorder, transcriber, summarizer, jobs, finalizer, coordinator)
     app.include_router(router, prefix="/api")
+    app.include_router(create_export_router(db), prefix="/api")
+    app.include_router(create_event_router(), prefix="/api")
+    if compactor is not None:
+        app.include_router(create_storage_router(compactor), prefix="/api")
 
     static_dir = config.BASE_DIR / "static"
-    app.mount("/", StaticFiles(directory=str(static_dir), html=True), name="static")
+    app.mount("/", CachedStaticFiles(directory=str(static_dir), html=True), name="static")
 
     return app
+
+
+def create_worker_app(db, coordinator: Coordinator) -> FastAPI:
+    """App del listener de workers: solo /api/workers, protegido por el token."""
+    app = FastAPI(title="CallScribe workers", version="0.1.0")
+    app.include_router(create_worker_router(db, coordinator), prefix="/api")
+    return app
@@ -0,0 +1,51 @@
+import asyncio
+import json
+
+from fastapi import APIRouter, Request
+from fastapi.responses import StreamingResponse
+
+from processing import events
+
+# Per-connection buffer; a client that stops reading loses its oldest events
+QUEUE_SIZE = 256
+HEARTBEAT_SECS = 15
+RETRY_MS = 3000
+
+
+def create_event_router() -> APIRouter:
+    router = APIRouter()
+
+    @router.get("/events")
+    async def stream_events(request: Request):
+        """Eventos del bus como Server-Sent Events, para que la interfaz se
+        actualice sin sondear.
+        """
+        loop = asyncio.get_running_loop()
+        queue: asyncio.Queue[dict] = asyncio.Queue(maxsize=QUEUE_SIZE)
+
+        def enqueue(event: dict):
+            if queue.full():
+                queue.get_nowait()
+            queue.put_nowait(event)
+
+        # Handlers run on the publishing thread; hand the event to the loop
+        unsubscribe = events.subscribe(lambda e: loop.call_soon_threadsafe(enqueue, e))
+
+        async def stream():
+            try:
+                yield f"retry: {RETRY_MS}\n\n"
+                while not await request.is_disconnected():
+                    try:
+                        event = await asyncio.wait_for(queue.get(), HEARTBEAT_SECS)
+                    except asyncio.TimeoutError:
+                        yield ": ping\n\n"
+                        continue
+                    data = json.dumps(event, ensure_ascii=False, default=str)
+                    yield f"data: {data}\n\n"
+            finally:
+                unsubscribe()
+
+        return StreamingResponse(stream(), media_type="text/event-stream",
+                                 headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+    return router
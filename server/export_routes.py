@@ -0,0 +1,56 @@
+from datetime import date, datetime, timedelta
+
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import StreamingResponse
+
+from db.database import Database
+from processing import export
+
+
+def _split(value: str | None) -> tuple[str, ...]:
+    return tuple(v.strip() for v in (value or "").split(",") if v.strip())
+
+
+def _parse_date(value: str | None, name: str) -> date | None:
+    if not value:
+        return None
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        raise HTTPException(400, f"Fecha '{name}' no valida (AAAA-MM-DD)")
+
+
+def create_export_router(db: Database) -> APIRouter:
+    router = APIRouter()
+
+    @router.get("/export")
+    def export_recordings(since: str | None = None, until: str | None = None,
+                          status: str | None = None, ids: str | None = None,
+                          include: str | None = None):
+        """ZIP con las grabaciones filtradas. `since`/`until` son fechas inclusivas;
+        `status`, `ids` e `include` (audio,transcript,summary) son listas separadas por comas.
+        """
+        kinds = _split(include) or export.KINDS
+        unknown = set(kinds) - set(export.KINDS)
+        if unknown:
+            raise HTTPException(400, f"Tipos de archivo no validos: {', '.join(sorted(unknown))}")
+        start = _parse_date(since, "since")
+        end = _parse_date(until, "until")
+
+        recordings = db.query_recordings(
+            since=start.isoformat() if start else None,
+            until=(end + timedelta(days=1)).isoformat() if end else None,
+            statuses=_split(status),
+            ids=_split(ids),
+        )
+        if not recordings:
+            raise HTTPException(404, "Ninguna grabacion coincide con el filtro")
+
+        filename = f"callscribe_{datetime.now().strftime('%Y%m%d_%H%M%S')}.zip"
+        return StreamingResponse(
+            export.stream_zip(recordings, kinds),
+            media_type="application/zip",
+            headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+        )
+
+    return router
@@ -0,0 +1,110 @@
+"""Validadores HTTP (ETag / Last-Modified), respuestas 304 y compresion.
+
+Los ETag de los endpoints JSON se derivan del estado de la fila en la base de
+datos y de los mtimes de sus archivos, no del cuerpo, asi que una peticion
+condicional se resuelve con un 304 sin leer ni serializar nada. Todas las
+respuestas llevan `Cache-Control: no-cache`: el navegador guarda la copia
+pero revalida siempre, porque el estado de una grabacion cambia sin aviso.
+"""
+import hashlib
+import re
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Callable
+
+from fastapi import Request, Response
+from fastapi.responses import JSONResponse
+from fastapi.staticfiles import StaticFiles
+from starlette.middleware.gzip import GZipMiddleware
+
+try:
+    from brotli_asgi import BrotliMiddleware
+except ImportError:
+    BrotliMiddleware = None
+
+CACHE_CONTROL = "no-cache"
+# Bodies smaller than this are not worth compressing
+COMPRESS_MIN_BYTES = 1024
+# Already compressed or streamed bodies: audio, the ZIP export, event streams
+NO_COMPRESS_RE = re.compile(r"/audio$|^/api/export|/events$")
+
+
+def etag_for(*parts, weak: bool = True) -> str:
+    digest = hashlib.sha1(repr(parts).encode("utf-8")).hexdigest()[:24]
+    return f'W/"{digest}"' if weak else f'"{digest}"'
+
+
+def http_date(mtime: float) -> str:
+    return format_datetime(datetime.fromtimestamp(int(mtime), timezone.utc), usegmt=True)
+
+
+def _strip_weak(tag: str) -> str:
+    tag = tag.strip()
+    return tag[2:] if tag.startswith("W/") else tag
+
+
+def not_modified(request: Request, etag: str, mtime: float | None = None) -> bool:
+    """Evaluacion de RFC 9110: If-None-Match manda; If-Modified-Since solo
+    se mira si no hay If-None-Match y se conoce la fecha del recurso.
+    """
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        if if_none_match.strip() == "*":
+            return True
+        return _strip_weak(etag) in {_strip_weak(t) for t in if_none_match.split(",")}
+
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since and mtime is not None:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        return int(mtime) <= since.timestamp()
+    return False
+
+
+def validator_headers(etag: str, mtime: float | None = None) -> dict[str, str]:
+    headers = {"ETag": etag, "Cache-Control": CACHE_CONTROL}
+    if mtime is not None:
+        headers["Last-Modified"] = http_date(mtime)
+    return headers
+
+
+def cached_json(request: Request, etag: str, build: Callable[[], object],
+                mtime: float | None = None) -> Response:
+    """304 si el cliente ya tiene esta version; si no, construye el cuerpo."""
+    headers = validator_headers(etag, mtime)
+    if not_modified(request, etag, mtime):
+        return Response(status_code=304, headers=headers)
+    return JSONResponse(build(), headers=headers)
+
+
+class CachedStaticFiles(StaticFiles):
+    """StaticFiles ya responde 304 con ETag/Last-Modified; los recursos de la
+    interfaz no llevan hash en el nombre, asi que deben revalidarse siempre.
+    """
+
+    def file_response(self, *args, **kwargs) -> Response:
+        response = super().file_response(*args, **kwargs)
+        response.headers.setdefault("Cache-Control", CACHE_CONTROL)
+        return response
+
+
+class CompressionMiddleware:
+    """Brotli (con brotli-asgi instalado) o gzip para las respuestas grandes,
+    salvo audio, exportaciones y flujos de eventos.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        if BrotliMiddleware is not None:
+            self.compressed = BrotliMiddleware(app, minimum_size=COMPRESS_MIN_BYTES,
+                                               gzip_fallback=True)
+        else:
+            self.compressed = GZipMiddleware(app, minimum_size=COMPRESS_MIN_BYTES)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http" and not NO_COMPRESS_RE.search(scope["path"]):
+            await self.compressed(scope, receive, send)
+        else:
+            await self.app(scope, receive, send)
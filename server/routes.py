@@ -1,35 +1,99 @@
 import logging
 import shutil
-import threading
 import uuid
-from datetime import datetime, timezone
 from pathlib import Path
 
-from fastapi import APIRouter, HTTPException, UploadFile, File
+from fastapi import APIRouter, HTTPException, Request, Response, UploadFile, File
 from fastapi.responses import FileResponse
 from pydantic import BaseModel
 
 import config
 from db.database import Database
+from processing import events, filecache, pipeline, profiler, storage, timeline
+from processing.coordinator import Coordinator
+from processing.grouping import ShortCallBatcher
+from processing.jobs import PRIORITY_LOW, JobQueue, is_recording_id
+from processing.metrics import EventMetrics
 from processing.summarizer import Summarizer
-from processing.transcriber import Transcriber
+from processing.transcriber import AUTO_PROFILE, PROFILES, Transcriber
 from recorder.audio_capture import AudioRecorder
-from recorder.mixer import convert_to_mp3
+from recorder.sources import configured_sources, sources_from_dicts
+from server import http_cache
 
 logger = logging.getLogger(__name__)
 
+# Uploads are copied to disk in pieces of this size
+UPLOAD_CHUNK_BYTES = 1 << 20
+
+TRANSCRIPT_MEDIA_TYPES = {
+    "txt": "text/plain",
+    "json": "application/json",
+    "srt": "application/x-subrip",
+    "vtt": "text/vtt",
+}
+
 
 class StartRecordingRequest(BaseModel):
     title: str | None = None
+    # Capture sources for this recording only (same format as CALLSCRIBE_EXTRA_SOURCES,
+    # complete list); by default the configured ones
+    sources: list[dict] | None = None
 
 
 class UpdateRecordingRequest(BaseModel):
     title: str
 
 
+class TranscribeRequest(BaseModel):
+    # Perfil de decodificacion; None usa CALLSCRIBE_WHISPER_PROFILE
+    profile: str | None = None
+    # Borrador rapido + refinado en segundo plano; None usa CALLSCRIBE_TWO_PASS
+    two_pass: bool | None = None
+    # En modo dos pasadas, generar el acta con el borrador sin esperar al refinado
+    draft_summary: bool = False
+
+
 def create_router(db: Database, recorder: AudioRecorder,
-                   transcriber: Transcriber, summarizer: Summarizer) -> APIRouter:
+                   transcriber: Transcriber, summarizer: Summarizer,
+                   jobs: JobQueue, finalizer: JobQueue,
+                   coordinator: Coordinator | None = None) -> APIRouter:
     router = APIRouter()
+    metrics = EventMetrics(events.bus)
+
+    def dispatch(kind: str, recording_id: str, fn):
+        # With remote workers enabled, jobs go to the coordinator instead of this machine
+        if coordinator is not None:
+            coordinator.enqueue(recording_id, kind)
+        else:
+            jobs.submit(fn, name=f"{kind}:{recording_id}")
+
+    # Short recordings waiting in the queue are transcribed together in one batched pass
+    batcher = ShortCallBatcher(db, transcriber, jobs, max_secs=config.SHORT_CALL_SECS,
+                               max_group=config.SHORT_CALL_BATCH)
+
+    def groupable(rec: dict, body: TranscribeRequest, two_pass: bool) -> bool:
+        return (
+            coordinator is None
+            and not two_pass
+            and (body.profile or config.WHISPER_PROFILE) == AUTO_PROFILE
+            and batcher.accepts(rec)
+        )
+
+    def check_remote_options(body: TranscribeRequest):
+        # Workers decode with their own configuration; refuse options they would ignore
+        if coordinator is not None and (body.profile or body.two_pass or body.draft_summary):
+            raise HTTPException(
+                400,
+                "Con workers remotos no se puede elegir perfil ni transcribir en dos pasadas",
+            )
+
+    def check_profile(profile: str | None):
+        if profile is not None and profile != AUTO_PROFILE and profile not in PROFILES:
+            raise HTTPException(
+                400,
+                f"Perfil '{profile}' desconocido. "
+                f"Perfiles: {', '.join([AUTO_PROFILE, *PROFILES])}",
+            )
 
     # -- Status --
 
@@ -38,7 +102,15 @@ def create_router(db: Database, recorder: AudioRecorder,
         return {
             "is_recording": recorder.is_recording(),
             "current_recording_id": recorder.current_recording_id,
+            "capture_health": recorder.capture_health() if recorder.is_recording() else None,
+            "capture_armed": recorder.is_armed(),
             "whisper_model_loaded": transcriber.is_loaded,
+            "jobs": jobs.stats(),
+            "short_calls_waiting": batcher.pending(),
+            "finalizing": finalizer.stats(),
+            "remote_workers": coordinator.stats() if coordinator else None,
+            "llm": summarizer.stats(),
+            "metrics": metrics.snapshot(),
         }
 
     # -- Devices --
@@ -48,87 +120,69 @@ def create_router(db: Database, recorder: AudioRecorder,
         devices = recorder.list_devices()
         loopback = [d for d in devices if d.get("isLoopback")]
         inputs = [d for d in devices if d["maxInputChannels"] > 0 and not d.get("isLoopback")]
-        return {"loopback": loopback, "input": inputs}
+        return {"loopback": loopback, "input": inputs, "topology": recorder.device_topology()}
+
+    @router.post("/devices/refresh")
+    def refresh_devices():
+        try:
+            changed = recorder.refresh_devices()
+        except RuntimeError as e:
+            raise HTTPException(409, str(e))
+        return {"changed": changed, "topology": recorder.device_topology()}
 
     # -- Recording control --
 
     @router.post("/recording/start")
     def start_recording(body: StartRecordingRequest = StartRecordingRequest()):
-        if recorder.is_recording():
-            raise HTTPException(400, "Ya hay una grabacion en curso")
-
-        # Check disk space
-        free = shutil.disk_usage(config.DATA_DIR).free
-        if free < 500 * 1024 * 1024:
-            raise HTTPException(507, "Espacio en disco insuficiente (menos de 500MB)")
-
         try:
-            recording_id = recorder.start(
-                loopback_device_index=config.LOOPBACK_DEVICE_INDEX,
-                mic_device_index=config.MIC_DEVICE_INDEX,
-            )
-        except RuntimeError as e:
-            raise HTTPException(500, str(e))
-
-        now = datetime.now(timezone.utc).isoformat()
-        title = body.title or f"Grabacion {datetime.now().strftime('%Y-%m-%d %H:%M')}"
-        rec = db.insert_recording(recording_id, title, now)
+            sources = (sources_from_dicts(body.sources) if body.sources
+                       else configured_sources())
+        except ValueError as e:
+            raise HTTPException(400, f"Fuentes de captura no validas: {e}")
+        try:
+            rec = pipeline.start_recording(db, recorder, body.title, sources)
+        except pipeline.CaptureError as e:
+            raise HTTPException(e.status, str(e))
         return {"id": rec["id"], "status": rec["status"]}
 
     @router.post("/recording/stop")
     def stop_recording():
-        if not recorder.is_recording():
-            raise HTTPException(400, "No hay grabacion en curso")
-
         try:
-            result = recorder.stop()
-        except RuntimeError as e:
-            raise HTTPException(500, str(e))
-
-        rec = db.update_recording(
-            result["id"],
-            status="stopped",
-            ended_at=datetime.now(timezone.utc).isoformat(),
-            duration_secs=result["duration_secs"],
-            audio_path=result["path"],
-        )
+            rec = pipeline.stop_recording(db, recorder, jobs, finalizer)
+        except pipeline.CaptureError as e:
+            raise HTTPException(e.status, str(e))
         return {"id": rec["id"], "status": rec["status"], "duration_secs": rec["duration_secs"]}
 
     # -- Import file --
 
-    ALLOWED_EXTENSIONS = {
-        ".mp4", ".mp3", ".wav", ".webm", ".ogg", ".flac",
-        ".m4a", ".mkv", ".avi", ".mov", ".wma", ".aac",
-    }
-
     @router.post("/recordings/import")
-    async def import_file(file: UploadFile = File(...)):
+    def import_file(file: UploadFile = File(...)):
+        # Sync route: the copy and the ffmpeg conversion run in the threadpool,
+        # not on the event loop that also serves the SSE streams
         if not file.filename:
             raise HTTPException(400, "No se recibio archivo")
 
         ext = Path(file.filename).suffix.lower()
-        if ext not in ALLOWED_EXTENSIONS:
+        if ext not in config.ALLOWED_EXTENSIONS:
             raise HTTPException(
                 400,
                 f"Formato '{ext}' no soportado. "
-                f"Formatos aceptados: {', '.join(sorted(ALLOWED_EXTENSIONS))}",
+                f"Formatos aceptados: {', '.join(sorted(config.ALLOWED_EXTENSIONS))}",
             )
 
         recording_id = str(uuid.uuid4())
         temp_path = config.RECORDINGS_DIR / f"{recording_id}{ext}"
-        mp3_path = config.RECORDINGS_DIR / f"{recording_id}.mp3"
+        title = f"Importado - {Path(file.filename).stem}"
 
         try:
-            # Save uploaded file to disk
-            content = await file.read()
-            temp_path.write_bytes(content)
+            # Copy the upload (already spooled by Starlette) to disk in chunks
+            with open(temp_path, "wb") as out:
+                shutil.copyfileobj(file.file, out, UPLOAD_CHUNK_BYTES)
 
-            # Convert to MP3 and get duration
-            duration_secs = convert_to_mp3(temp_path, mp3_path)
+            # Convert to MP3 and register the recording
+            rec = pipeline.import_file(db, temp_path, title, recording_id=recording_id)
         except Exception as e:
-            # Clean up on failure
             temp_path.unlink(missing_ok=True)
-            mp3_path.unlink(missing_ok=True)
             logger.error("Error importando archivo: %s", e)
             raise HTTPException(500, f"Error al convertir archivo: {e}")
         finally:
@@ -136,20 +190,8 @@ def create_router(db: Database, recorder: AudioRecorder,
             if temp_path.suffix != ".mp3" and temp_path.exists():
                 temp_path.unlink()
 
-        now = datetime.now(timezone.utc).isoformat()
-        original_name = Path(file.filename).stem
-        title = f"Importado - {original_name}"
-        rel_path = str(mp3_path.relative_to(config.BASE_DIR))
-
-        rec = db.insert_recording(recording_id, title, now)
-        db.update_recording(
-            recording_id,
-            status="stopped",
-            ended_at=now,
-            duration_secs=int(duration_secs),
-            audio_path=rel_path,
-        )
-        rec = db.get_recording(recording_id)
+        jobs.submit(pipeline.ensure_speech_map, db, rec, priority=PRIORITY_LOW,
+                    name=f"speech:{rec['id']}")
 
         return {
             "id": rec["id"],
@@ -161,25 +203,40 @@ def create_router(db: Database, recorder: AudioRecorder,
     # -- Recordings CRUD --
 
     @router.get("/recordings")
-    def list_recordings():
+    def list_recordings(request: Request):
         recordings = db.list_recordings()
-        return [
+        items = [
             {
                 "id": r["id"],
                 "title": r["title"],
                 "started_at": r["started_at"],
                 "duration_secs": r["duration_secs"],
                 "status": r["status"],
+                "progress": pipeline.progress(r["id"]),
             }
             for r in recordings
         ]
+        return http_cache.cached_json(request, http_cache.etag_for(items), lambda: items)
 
     @router.get("/recordings/{recording_id}")
-    def get_recording(recording_id: str):
+    def get_recording(recording_id: str, request: Request):
         rec = db.get_recording(recording_id)
         if not rec:
             raise HTTPException(404, "Grabacion no encontrada")
 
+        # Version of everything the detail is built from: the row, the live
+        # progress, the disk index and every file of the recording
+        usage = db.get_storage_usage(rec["id"])
+        files = storage.recording_files(rec)
+        etag = http_cache.etag_for(
+            tuple(rec.values()),
+            pipeline.progress(rec["id"]),
+            usage and usage["updated_at"],
+            [filecache.signature(p) for paths in files.values() for p in paths],
+        )
+        return http_cache.cached_json(request, etag, lambda: recording_detail(rec, usage))
+
+    def recording_detail(rec: dict, usage: dict | None) -> dict:
         result = {
             "id": rec["id"],
             "title": rec["title"],
@@ -190,32 +247,114 @@ def create_router(db: Database, recorder: AudioRecorder,
             "error_message": rec["error_message"],
             "audio_url": f"/api/recordings/{rec['id']}/audio" if rec["audio_path"] else None,
             "transcript_text": None,
+            "transcript_draft": bool(rec["transcript_draft"]),
+            "progress": pipeline.progress(rec["id"]),
             "summary_markdown": None,
+            "talk_time": None,
+            "decoding": pipeline.decoding_info(rec),
+            "compaction": pipeline.compaction_info(rec),
+            "disk_bytes": None,
         }
 
+        if usage:
+            result["disk_bytes"] = sum(
+                usage[k] for k in ("audio_bytes", "transcript_bytes", "summary_bytes", "other_bytes")
+            )
+
+        if rec["speech_path"]:
+            speech_map = filecache.read_json(config.BASE_DIR / rec["speech_path"])
+            if speech_map:
+                result["talk_time"] = speech_map.get("talk_time")
+
         if rec["transcript_path"]:
-            txt_path = config.BASE_DIR / rec["transcript_path"]
-            if txt_path.exists():
-                result["transcript_text"] = txt_path.read_text(encoding="utf-8")
+            result["transcript_text"] = filecache.read_text(config.BASE_DIR / rec["transcript_path"])
+        elif rec["status"] == "transcribing":
+            # Segments written so far by the running transcription
+            result["transcript_text"] = pipeline.journal_text(rec)
 
         if rec["summary_path"]:
-            md_path = config.BASE_DIR / rec["summary_path"]
-            if md_path.exists():
-                result["summary_markdown"] = md_path.read_text(encoding="utf-8")
+            result["summary_markdown"] = filecache.read_text(config.BASE_DIR / rec["summary_path"])
 
         return result
 
     @router.get("/recordings/{recording_id}/audio")
-    def get_audio(recording_id: str):
+    def get_audio(recording_id: str, request: Request):
         rec = db.get_recording(recording_id)
         if not rec or not rec["audio_path"]:
             raise HTTPException(404, "Audio no encontrado")
 
         audio_path = config.BASE_DIR / rec["audio_path"]
-        if not audio_path.exists():
+        try:
+            stat = audio_path.stat()
+        except OSError:
             raise HTTPException(404, "Archivo de audio no encontrado")
 
-        return FileResponse(str(audio_path), media_type="audio/mpeg")
+        etag = http_cache.etag_for(rec["audio_path"], stat.st_mtime_ns, stat.st_size, weak=False)
+        headers = http_cache.validator_headers(etag, stat.st_mtime)
+        if http_cache.not_modified(request, etag, stat.st_mtime):
+            return Response(status_code=304, headers=headers)
+        return FileResponse(str(audio_path), media_type=storage.audio_media_type(audio_path),
+                            headers=headers)
+
+    def transcript_file(request: Request, recording_id: str, fmt: str) -> Response:
+        rec = db.get_recording(recording_id)
+        if not rec or not rec["transcript_path"]:
+            raise HTTPException(404, "No hay transcripcion disponible")
+
+        path = (config.BASE_DIR / rec["transcript_path"]).with_suffix(f".{fmt}")
+        sig = filecache.signature(path)
+        if sig is None:
+            raise HTTPException(404, "Archivo de transcripcion no encontrado")
+        mtime = sig[0] / 1e9
+        etag = http_cache.etag_for(rec["transcript_path"], fmt, sig)
+        headers = http_cache.validator_headers(etag, mtime)
+        if http_cache.not_modified(request, etag, mtime):
+            return Response(status_code=304, headers=headers)
+        return Response(filecache.read_text(path) or "", media_type=TRANSCRIPT_MEDIA_TYPES[fmt],
+                        headers=headers)
+
+    @router.get("/recordings/{recording_id}/transcript.{fmt}")
+    def get_transcript(recording_id: str, fmt: str, request: Request):
+        if fmt not in TRANSCRIPT_MEDIA_TYPES:
+            raise HTTPException(400, "Formato no soportado (txt, json, srt o vtt)")
+        return transcript_file(request, recording_id, fmt)
+
+    @router.get("/recordings/{recording_id}/subtitles.{fmt}")
+    def get_subtitles(recording_id: str, fmt: str, request: Request):
+        if fmt not in ("srt", "vtt"):
+            raise HTTPException(400, "Formato de subtitulos no soportado (srt o vtt)")
+        return transcript_file(request, recording_id, fmt)
+
+    @router.get("/recordings/{recording_id}/timeline")
+    def get_timeline(recording_id: str, request: Request):
+        if not db.get_recording(recording_id):
+            raise HTTPException(404, "Grabacion no encontrada")
+        path = timeline.timeline_path(recording_id)
+        sig = filecache.signature(path)
+        etag = http_cache.etag_for("timeline", recording_id, sig)
+
+        def build():
+            data = filecache.read_json(path) if sig else None
+            return {"id": recording_id, "runs": data["runs"] if data else []}
+
+        return http_cache.cached_json(request, etag, build, sig[0] / 1e9 if sig else None)
+
+    @router.get("/recordings/{recording_id}/profiles")
+    def list_profiles(recording_id: str):
+        if not db.get_recording(recording_id):
+            raise HTTPException(404, "Grabacion no encontrada")
+        return {"enabled": profiler.enabled(), "profiles": profiler.list_profiles(recording_id)}
+
+    @router.get("/recordings/{recording_id}/profiles/{stage}.folded")
+    def get_profile(recording_id: str, stage: str):
+        # The id becomes a directory name: only real recording ids get that far
+        if not is_recording_id(recording_id) or not db.get_recording(recording_id):
+            raise HTTPException(404, "Grabacion no encontrada")
+        path = profiler.folded_path(recording_id, stage)
+        if path is None:
+            raise HTTPException(404, "Perfil no encontrado")
+        return FileResponse(path, media_type="text/plain",
+                            filename=f"{recording_id}-{stage}{profiler.FOLDED_SUFFIX}")
 
     @router.put("/recordings/{recording_id}")
     def update_recording(recording_id: str, body: UpdateRecordingRequest):
@@ -231,17 +370,8 @@ def create_router(db: Database, recorder: AudioRecorder,
         if not rec:
             raise HTTPException(404, "Grabacion no encontrada")
 
-        # Delete files
-        for path_field in ["audio_path", "transcript_path", "summary_path"]:
-            if rec[path_field]:
-                file_path = config.BASE_DIR / rec[path_field]
-                if file_path.exists():
-                    file_path.unlink()
-                # Also delete companion json for transcripts
-                if path_field == "transcript_path":
-                    json_path = file_path.with_suffix(".json")
-                    if json_path.exists():
-                        json_path.unlink()
+        # Delete audio, transcript + companions, summary, speech map and journal
+        storage.delete_files(rec)
 
         db.delete_recording(recording_id)
         return {"deleted": True}
@@ -249,28 +379,35 @@ def create_router(db: Database, recorder: AudioRecorder,
     # -- Processing --
 
     @router.post("/recordings/{recording_id}/transcribe")
-    def transcribe_recording(recording_id: str):
+    def transcribe_recording(recording_id: str, body: TranscribeRequest = TranscribeRequest()):
+        check_profile(body.profile)
+        check_remote_options(body)
         rec = db.get_recording(recording_id)
         if not rec:
             raise HTTPException(404, "Grabacion no encontrada")
         if not rec["audio_path"]:
             raise HTTPException(400, "No hay archivo de audio")
-        if rec["status"] in ("recording", "transcribing", "summarizing"):
+        if rec["status"] in pipeline.BUSY_STATUSES:
             raise HTTPException(400, f"Grabacion en estado '{rec['status']}', no se puede procesar")
 
         db.update_recording(recording_id, status="transcribing")
+        two_pass = config.TWO_PASS if body.two_pass is None else body.two_pass
 
         def _do_transcribe():
             try:
-                audio_path = config.BASE_DIR / rec["audio_path"]
-                result = transcriber.transcribe(str(audio_path), str(config.TRANSCRIPTS_DIR))
-                rel_path = str(Path(result["txt_path"]).relative_to(config.BASE_DIR))
-                db.update_recording(recording_id, status="transcribed", transcript_path=rel_path)
+                if two_pass:
+                    pipeline.transcribe_two_pass(db, transcriber, rec, jobs, profile=body.profile)
+                else:
+                    pipeline.transcribe(db, transcriber, rec, profile=body.profile,
+                                        backlog=jobs.pending())
             except Exception as e:
                 logger.error("Error transcribiendo %s: %s", recording_id, e)
                 db.update_recording(recording_id, status="error", error_message=str(e))
 
-        threading.Thread(target=_do_transcribe, daemon=True).start()
+        if groupable(rec, body, two_pass):
+            batcher.add(rec)
+        else:
+            dispatch("transcribe", recording_id, _do_transcribe)
         return {"status": "transcribing"}
 
     @router.post("/recordings/{recording_id}/summarize")
@@ -280,53 +417,65 @@ def create_router(db: Database, recorder: AudioRecorder,
             raise HTTPException(404, "Grabacion no encontrada")
         if not rec["transcript_path"]:
             raise HTTPException(400, "No hay transcripcion disponible")
-        if rec["status"] in ("recording", "transcribing", "summarizing"):
+        if rec["status"] in pipeline.BUSY_STATUSES:
             raise HTTPException(400, f"Grabacion en estado '{rec['status']}', no se puede procesar")
 
         db.update_recording(recording_id, status="summarizing")
 
         def _do_summarize():
             try:
-                txt_path = config.BASE_DIR / rec["transcript_path"]
-                recording_date = rec["started_at"][:10] if rec["started_at"] else "Fecha desconocida"
-                result_path = summarizer.summarize(str(txt_path), str(config.SUMMARIES_DIR), recording_date)
-                rel_path = str(Path(result_path).relative_to(config.BASE_DIR))
-                db.update_recording(recording_id, status="completed", summary_path=rel_path)
+                pipeline.summarize(db, summarizer, rec)
             except Exception as e:
                 logger.error("Error generando acta %s: %s", recording_id, e)
                 db.update_recording(recording_id, status="error", error_message=str(e))
 
-        threading.Thread(target=_do_summarize, daemon=True).start()
+        dispatch("summarize", recording_id, _do_summarize)
         return {"status": "summarizing"}
 
     @router.post("/recordings/{recording_id}/process")
-    def process_recording(recording_id: str):
+    def process_recording(recording_id: str, body: TranscribeRequest = TranscribeRequest()):
+        check_profile(body.profile)
+        check_remote_options(body)
         rec = db.get_recording(recording_id)
         if not rec:
             raise HTTPException(404, "Grabacion no encontrada")
         if not rec["audio_path"]:
             raise HTTPException(400, "No hay archivo de audio")
-        if rec["status"] in ("recording", "transcribing", "summarizing"):
+        if rec["status"] in pipeline.BUSY_STATUSES:
             raise HTTPException(400, f"Grabacion en estado '{rec['status']}', no se puede procesar")
 
         db.update_recording(recording_id, status="transcribing")
+        two_pass = config.TWO_PASS if body.two_pass is None else body.two_pass
+
+        def _summarize_transcribed(current: dict):
+            try:
+                current = db.update_recording(recording_id, status="summarizing")
+                pipeline.summarize(db, summarizer, current)
+            except Exception as e:
+                logger.error("Error generando acta %s: %s", recording_id, e)
+                db.update_recording(recording_id, status="error", error_message=str(e))
 
         def _do_process():
             try:
-                audio_path = config.BASE_DIR / rec["audio_path"]
-                t_result = transcriber.transcribe(str(audio_path), str(config.TRANSCRIPTS_DIR))
-                rel_transcript = str(Path(t_result["txt_path"]).relative_to(config.BASE_DIR))
-                db.update_recording(recording_id, status="summarizing", transcript_path=rel_transcript)
-
-                recording_date = rec["started_at"][:10] if rec["started_at"] else "Fecha desconocida"
-                s_result = summarizer.summarize(t_result["txt_path"], str(config.SUMMARIES_DIR), recording_date)
-                rel_summary = str(Path(s_result).relative_to(config.BASE_DIR))
-                db.update_recording(recording_id, status="completed", summary_path=rel_summary)
+                if two_pass and body.draft_summary:
+                    draft = pipeline.transcribe_two_pass(db, transcriber, rec, jobs,
+                                                         next_status="summarizing",
+                                                         profile=body.profile)
+                    pipeline.summarize(db, summarizer, draft)
+                elif two_pass:
+                    pipeline.transcribe_two_pass(db, transcriber, rec, jobs, profile=body.profile,
+                                                 then=_summarize_transcribed)
+                else:
+                    pipeline.process(db, transcriber, summarizer, rec, profile=body.profile,
+                                     backlog=jobs.pending())
             except Exception as e:
                 logger.error("Error procesando %s: %s", recording_id, e)
                 db.update_recording(recording_id, status="error", error_message=str(e))
 
-        threading.Thread(target=_do_process, daemon=True).start()
+        if groupable(rec, body, two_pass):
+            batcher.add(rec, next_status="summarizing", then=_summarize_transcribed)
+        else:
+            dispatch("process", recording_id, _do_process)
         return {"status": "processing"}
 
     return router
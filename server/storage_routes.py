@@ -0,0 +1,18 @@
+from fastapi import APIRouter
+
+from processing.storage import StorageCompactor
+
+
+def create_storage_router(compactor: StorageCompactor) -> APIRouter:
+    router = APIRouter(prefix="/storage")
+
+    @router.get("")
+    def get_storage():
+        return compactor.summary()
+
+    @router.post("/compact")
+    def run_compactor():
+        compactor.trigger()
+        return {"scheduled": True}
+
+    return router
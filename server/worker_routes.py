@@ -0,0 +1,123 @@
+import secrets
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Response
+from fastapi.responses import FileResponse, PlainTextResponse
+from pydantic import BaseModel
+
+import config
+from db.database import Database
+from processing.coordinator import JOB_KINDS, Coordinator, LeaseLost
+from processing.storage import audio_media_type
+
+
+class ClaimRequest(BaseModel):
+    worker_id: str
+    kinds: list[str] = list(JOB_KINDS)
+
+
+class WorkerRequest(BaseModel):
+    worker_id: str
+
+
+class TranscriptUpload(BaseModel):
+    worker_id: str
+    text: str
+    segments: list[dict] = []
+    language: str | None = None
+    duration: float | None = None
+
+
+class SummaryUpload(BaseModel):
+    worker_id: str
+    markdown: str
+
+
+class FailureReport(BaseModel):
+    worker_id: str
+    error: str
+
+
+def create_worker_router(db: Database, coordinator: Coordinator) -> APIRouter:
+    def check_token(x_worker_token: str | None = Header(default=None)):
+        if config.WORKER_TOKEN and not secrets.compare_digest(
+            x_worker_token or "", config.WORKER_TOKEN
+        ):
+            raise HTTPException(401, "Token de worker invalido")
+
+    router = APIRouter(prefix="/workers", dependencies=[Depends(check_token)])
+
+    def leased(job_id: str, worker_id: str) -> dict:
+        try:
+            return coordinator.get_leased_job(job_id, worker_id)
+        except LeaseLost:
+            raise HTTPException(409, "El trabajo ya no esta asignado a este worker")
+
+    @router.get("")
+    def list_workers():
+        return coordinator.stats()
+
+    @router.post("/claim")
+    def claim_job(body: ClaimRequest):
+        job = coordinator.claim(body.worker_id, body.kinds)
+        if job is None:
+            return Response(status_code=204)
+        return job
+
+    @router.post("/jobs/{job_id}/heartbeat")
+    def heartbeat(job_id: str, body: WorkerRequest):
+        try:
+            job = coordinator.heartbeat(job_id, body.worker_id)
+        except LeaseLost:
+            raise HTTPException(409, "El trabajo ya no esta asignado a este worker")
+        return {"lease_expires_at": job["lease_expires_at"]}
+
+    @router.get("/jobs/{job_id}/audio")
+    def get_job_audio(job_id: str, worker_id: str):
+        job = leased(job_id, worker_id)
+        rec = db.get_recording(job["recording_id"])
+        if not rec or not rec["audio_path"]:
+            raise HTTPException(404, "Audio no encontrado")
+        audio_path = config.BASE_DIR / rec["audio_path"]
+        if not audio_path.exists():
+            raise HTTPException(404, "Archivo de audio no encontrado")
+        return FileResponse(str(audio_path), media_type=audio_media_type(audio_path),
+                            filename=audio_path.name)
+
+    @router.get("/jobs/{job_id}/transcript")
+    def get_job_transcript(job_id: str, worker_id: str):
+        job = leased(job_id, worker_id)
+        rec = db.get_recording(job["recording_id"])
+        if not rec or not rec["transcript_path"]:
+            raise HTTPException(404, "No hay transcripcion disponible")
+        txt_path = config.BASE_DIR / rec["transcript_path"]
+        if not txt_path.exists():
+            raise HTTPException(404, "Archivo de transcripcion no encontrado")
+        return PlainTextResponse(txt_path.read_text(encoding="utf-8"))
+
+    @router.post("/jobs/{job_id}/transcript")
+    def upload_transcript(job_id: str, body: TranscriptUpload):
+        try:
+            job = coordinator.complete_transcript(
+                job_id, body.worker_id, body.text, body.segments, body.language, body.duration,
+            )
+        except LeaseLost:
+            raise HTTPException(409, "El trabajo ya no esta asignado a este worker")
+        return {"status": job["status"], "kind": job["kind"]}
+
+    @router.post("/jobs/{job_id}/summary")
+    def upload_summary(job_id: str, body: SummaryUpload):
+        try:
+            job = coordinator.complete_summary(job_id, body.worker_id, body.markdown)
+        except LeaseLost:
+            raise HTTPException(409, "El trabajo ya no esta asignado a este worker")
+        return {"status": job["status"]}
+
+    @router.post("/jobs/{job_id}/fail")
+    def report_failure(job_id: str, body: FailureReport):
+        try:
+            job = coordinator.fail(job_id, body.worker_id, body.error)
+        except LeaseLost:
+            raise HTTPException(409, "El trabajo ya no esta asignado a este worker")
+        return {"status": job["status"]}
+
+    return router
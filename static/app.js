@@ -3,21 +3,71 @@ let currentRecordingId = null;
 let isRecording = false;
 let pollInterval = null;
 let detailPollInterval = null;
+let eventsConnected = false;
+let eventRefreshTimer = null;
+
+const POLL_MS = 3000;
+// With the event stream open, polling is only a safety net
+const POLL_CONNECTED_MS = 30000;
 
 // -- Init --
 
 document.addEventListener("DOMContentLoaded", () => {
     loadRecordings();
     startStatusPolling();
+    connectEvents();
 });
 
 // -- Status polling --
 
-function startStatusPolling() {
-    pollInterval = setInterval(pollStatus, 3000);
+function startStatusPolling(ms = POLL_MS) {
+    if (pollInterval) clearInterval(pollInterval);
+    pollInterval = setInterval(pollStatus, ms);
     pollStatus();
 }
 
+// -- Server events --
+
+function connectEvents() {
+    if (!window.EventSource) return;
+    const source = new EventSource(`${API}/events`);
+    source.onopen = () => {
+        eventsConnected = true;
+        startStatusPolling(POLL_CONNECTED_MS);
+    };
+    // EventSource reconnects by itself; poll as before until it does
+    source.onerror = () => {
+        if (!eventsConnected) return;
+        eventsConnected = false;
+        startStatusPolling(POLL_MS);
+    };
+    source.onmessage = (msg) => onServerEvent(JSON.parse(msg.data));
+}
+
+function onServerEvent(event) {
+    if (event.topic.startsWith("capture.")) {
+        pollStatus();
+    }
+    const listChanged = (event.topic.startsWith("recording.") && event.topic !== "recording.progress")
+        || event.topic === "job.finished";
+    if (currentRecordingId ? event.recording_id === currentRecordingId : listChanged) {
+        scheduleEventRefresh();
+    }
+}
+
+function scheduleEventRefresh() {
+    // Jobs publish in bursts; one refresh per burst is enough
+    if (eventRefreshTimer) return;
+    eventRefreshTimer = setTimeout(() => {
+        eventRefreshTimer = null;
+        if (currentRecordingId) {
+            refreshDetail();
+        } else {
+            loadRecordings();
+        }
+    }, 200);
+}
+
 async function pollStatus() {
     try {
         const res = await fetch(`${API}/status`);
@@ -151,7 +201,7 @@ function renderRecordings(recordings) {
                     <div class="recording-card-title">${escapeHtml(r.title)}</div>
                     <div class="recording-card-meta">${date} | ${duration}</div>
                 </div>
-                <span class="badge badge-${r.status}">${r.status}</span>
+                <span class="badge badge-${r.status}">${statusLabel(r)}</span>
             </div>
         `;
     }).join("");
@@ -179,10 +229,10 @@ function showList() {
 function startDetailPolling() {
     stopDetailPolling();
     detailPollInterval = setInterval(async () => {
-        if (currentRecordingId) {
+        if (currentRecordingId && !eventsConnected) {
             await refreshDetail();
         }
-    }, 3000);
+    }, POLL_MS);
 }
 
 function stopDetailPolling() {
@@ -200,21 +250,87 @@ async function refreshDetail() {
         if (!res.ok) return;
         const data = await res.json();
         renderDetail(data);
+        await refreshTimeline();
     } catch (e) {
         console.error("Error cargando detalle:", e);
     }
 }
 
+async function refreshTimeline() {
+    const res = await fetch(`${API}/recordings/${currentRecordingId}/timeline`);
+    if (!res.ok) return;
+    const data = await res.json();
+    renderTimeline(data.runs);
+}
+
+function formatMs(ms) {
+    return ms >= 1000 ? `${(ms / 1000).toFixed(1)}s` : `${Math.round(ms)}ms`;
+}
+
+function renderTimeline(runs) {
+    const section = document.getElementById("timeline-section");
+    section.style.display = runs.length ? "block" : "none";
+    // Top-level spans of each run as bars on the run's own time scale
+    document.getElementById("timeline-runs").innerHTML = runs.map((run) => {
+        const total = Math.max(run.duration_ms, 1);
+        const spans = run.spans.filter((s) => s.depth === 0);
+        const bars = spans.map((s) => {
+            const left = Math.max(0, (s.offset_ms / total) * 100);
+            const width = Math.max(0.5, (s.duration_ms / total) * 100);
+            const attrs = Object.entries(s.attrs || {}).map(([k, v]) => `${k}=${v}`).join(" ");
+            return `<span class="timeline-bar timeline-${escapeHtml(s.name.split(":")[0])}"
+                style="left:${left}%;width:${width}%"
+                title="${escapeHtml(`${s.name} ${formatMs(s.duration_ms)} ${attrs}`)}"></span>`;
+        }).join("");
+        // Runs measured elsewhere (the capture) carry attributes instead of spans
+        const slowest = spans.length
+            ? [...spans].sort((a, b) => b.duration_ms - a.duration_ms).slice(0, 4)
+                .map((s) => `${escapeHtml(s.name)} ${formatMs(s.duration_ms)}`).join(", ")
+            : Object.entries(run.attrs || {}).map(([k, v]) => escapeHtml(`${k}=${v}`)).join(" ");
+        const when = new Date(run.started_at).toLocaleTimeString("es-ES");
+        return `<div class="timeline-run${run.error ? " timeline-error" : ""}">
+            <div class="timeline-label">${escapeHtml(run.stage)} <small>${when} &middot; ${formatMs(run.duration_ms)}</small></div>
+            <div class="timeline-track">${bars}</div>
+            <div class="timeline-legend">${slowest}${run.error ? ` &middot; ${escapeHtml(run.error)}` : ""}</div>
+        </div>`;
+    }).join("");
+}
+
+function statusLabel(rec) {
+    return rec.progress !== null && rec.progress !== undefined
+        ? `${rec.status} ${rec.progress}%`
+        : rec.status;
+}
+
+function formatTalkTime(talkTime) {
+    if (!talkTime) return "";
+    const labels = { loopback: "Remoto", mic: "Microfono", mix: "Voz" };
+    const parts = Object.entries(labels)
+        .filter(([key]) => talkTime[key] !== undefined)
+        .map(([key, label]) => `${label} ${formatDuration(Math.round(talkTime[key]))}`);
+    return `Habla: ${parts.join(" / ")}`;
+}
+
 function renderDetail(rec) {
     document.getElementById("detail-title").value = rec.title;
     const statusBadge = document.getElementById("detail-status");
-    statusBadge.textContent = rec.status;
+    statusBadge.textContent = statusLabel(rec);
     statusBadge.className = `badge badge-${rec.status}`;
 
     const date = rec.started_at ? new Date(rec.started_at).toLocaleString("es-ES") : "";
     document.getElementById("detail-date").textContent = date;
     document.getElementById("detail-duration").textContent =
         rec.duration_secs ? formatDuration(rec.duration_secs) : "--:--";
+    document.getElementById("detail-talk-time").textContent = formatTalkTime(rec.talk_time);
+    document.getElementById("detail-disk").textContent = rec.disk_bytes
+        ? `${(rec.disk_bytes / 1e6).toFixed(1)} MB en disco`
+        : "";
+    document.getElementById("detail-compaction").textContent = rec.compaction
+        ? `Acta: ${rec.compaction.compact_tokens} tokens (-${Math.round(rec.compaction.reduction * 100)}%)`
+        : "";
+    document.getElementById("detail-decoding").textContent = rec.decoding
+        ? `Perfil ${rec.decoding.profile} (RTF ${rec.decoding.rtf})`
+        : "";
 
     // Error
     const errorBox = document.getElementById("detail-error");
@@ -226,7 +342,7 @@ function renderDetail(rec) {
     }
 
     // Buttons
-    const inProgress = ["recording", "transcribing", "summarizing"].includes(rec.status);
+    const inProgress = ["recording", "finalizing", "transcribing", "summarizing"].includes(rec.status);
     document.getElementById("btn-transcribe").disabled =
         inProgress || !rec.audio_url || rec.transcript_text !== null;
     document.getElementById("btn-summarize").disabled =
@@ -252,6 +368,13 @@ function renderDetail(rec) {
     if (rec.transcript_text) {
         transcriptSection.style.display = "block";
         document.getElementById("transcript-text").textContent = rec.transcript_text;
+        const draftLabel = document.getElementById("transcript-draft");
+        draftLabel.style.display = rec.transcript_draft ? "inline" : "none";
+        draftLabel.textContent = rec.error_message ? "borrador" : "borrador, refinando...";
+        const finished = !inProgress || rec.status === "summarizing";
+        document.getElementById("subtitle-links").style.display = finished ? "block" : "none";
+        document.getElementById("srt-link").href = `${API}/recordings/${rec.id}/subtitles.srt`;
+        document.getElementById("vtt-link").href = `${API}/recordings/${rec.id}/subtitles.vtt`;
     } else {
         transcriptSection.style.display = "none";
     }
@@ -270,8 +393,9 @@ function renderDetail(rec) {
         summarySection.style.display = "none";
     }
 
-    // Stop detail polling if final state
-    if (!inProgress && detailPollInterval) {
+    // Stop detail polling if final state (a draft keeps polling until refined)
+    const refining = rec.transcript_draft && !rec.error_message;
+    if (!inProgress && !refining && detailPollInterval) {
         stopDetailPolling();
     }
 }
@@ -290,10 +414,22 @@ async function updateTitle() {
     });
 }
 
+function processingOptions() {
+    const options = { profile: document.getElementById("profile-select").value };
+    const passes = document.getElementById("pass-select").value;
+    if (passes) {
+        options.two_pass = passes !== "single";
+        options.draft_summary = passes === "draft_summary";
+    }
+    return options;
+}
+
 async function transcribeRecording() {
     if (!currentRecordingId) return;
     const res = await fetch(`${API}/recordings/${currentRecordingId}/transcribe`, {
         method: "POST",
+        headers: { "Content-Type": "application/json" },
+        body: JSON.stringify(processingOptions()),
     });
     if (!res.ok) {
         const err = await res.json();
@@ -322,6 +458,8 @@ async function processRecording() {
     if (!currentRecordingId) return;
     const res = await fetch(`${API}/recordings/${currentRecordingId}/process`, {
         method: "POST",
+        headers: { "Content-Type": "application/json" },
+        body: JSON.stringify(processingOptions()),
     });
     if (!res.ok) {
         const err = await res.json();
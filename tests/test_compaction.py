@@ -0,0 +1,66 @@
+from processing import compaction
+
+
+def _seg(start, end, text):
+    return {"start": start, "end": end, "text": text}
+
+
+def test_drops_hallucinations_and_loops():
+    segments = [
+        _seg(0, 2, "Vamos a revisar el presupuesto del trimestre."),
+        _seg(2, 4, "Vamos a revisar el presupuesto del trimestre."),
+        _seg(4, 6, "Subtitulos realizados por la comunidad de Amara.org"),
+        _seg(6, 7, "Si."),
+        _seg(7, 8, "Si."),
+    ]
+    paras, stats = compaction.paragraphs(segments)
+
+    assert stats["loops"] == 1
+    assert stats["hallucinations"] == 1
+    # Short replies repeat legitimately; the gap left by the dropped ones starts a paragraph
+    assert paras == [
+        {"start": 0, "speaker": None, "text": "Vamos a revisar el presupuesto del trimestre."},
+        {"start": 6, "speaker": None, "text": "Si. Si."},
+    ]
+
+
+def test_removes_fillers_and_inline_repeats():
+    paras, stats = compaction.paragraphs([
+        _seg(0, 3, "eh, bueno bueno bueno, mmm cerramos el viernes"),
+    ])
+
+    assert stats["fillers"] == 2
+    assert paras[0]["text"] == "Bueno, cerramos el viernes"
+
+
+def test_splits_paragraphs_on_pause_and_speaker():
+    speech_map = {"channels": {"mic": [[0, 3]], "loopback": [[3, 20]]}}
+    segments = [
+        _seg(0, 1.5, "Hola, te llamo por el contrato."),
+        _seg(1.5, 3, "Queria confirmar la fecha."),
+        _seg(3, 5, "Perfecto, la fecha es el lunes."),
+        _seg(10, 12, "Y el importe no cambia."),
+    ]
+    paras, _ = compaction.paragraphs(segments, speech_map)
+
+    assert [(p["speaker"], p["start"]) for p in paras] == [
+        ("Local", 0), ("Remoto", 3), ("Remoto", 10)]
+    assert paras[0]["text"] == "Hola, te llamo por el contrato. Queria confirmar la fecha."
+
+
+def test_render_minute_markers():
+    paras = [{"start": 5, "speaker": None, "text": "Uno."},
+             {"start": 50, "speaker": None, "text": "Dos."},
+             {"start": 65, "speaker": None, "text": "Tres."}]
+
+    assert compaction.render(paras) == "[min 0]\nUno.\nDos.\n[min 1]\nTres."
+    assert compaction.render(paras, minute_markers=False) == "Uno.\nDos.\nTres."
+
+
+def test_compact_without_segments_uses_text_lines():
+    raw = "Primera linea del acta.\n\nPrimera linea del acta.\nGracias por ver el video\n"
+    text, paras, stats = compaction.compact(raw, None)
+
+    assert text == "Primera linea del acta."
+    assert stats["segments"] == 3
+    assert stats["compact_tokens"] < stats["raw_tokens"]
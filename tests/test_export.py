@@ -0,0 +1,62 @@
+import io
+import json
+import zipfile
+
+import pytest
+
+import config
+from processing import export
+
+RECORDING_ID = "12345678-1234-4234-8234-123456789abc"
+
+
+@pytest.fixture
+def recording(tmp_path, monkeypatch):
+    monkeypatch.setattr(config, "BASE_DIR", tmp_path)
+    monkeypatch.setattr(config, "PROFILES_DIR", tmp_path / "profiles")
+    monkeypatch.setattr(config, "TIMELINES_DIR", tmp_path / "timelines")
+    for rel, content in [("recordings/a.mp3", b"\xff\xfb" * 5000),
+                         ("transcripts/a.txt", "Hola.".encode()),
+                         ("transcripts/a.json", b"{}"),
+                         ("transcripts/a.vtt", b"WEBVTT\n\n"),
+                         ("summaries/a.md", "# Acta".encode())]:
+        path = tmp_path / rel
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(content)
+    return {"id": RECORDING_ID, "title": "Reunion: ventas Q1", "started_at": "2026-03-02T10:00:00",
+            "duration_secs": 60, "status": "completed", "audio_path": "recordings/a.mp3",
+            "transcript_path": "transcripts/a.txt", "summary_path": "summaries/a.md",
+            "speech_path": None}
+
+
+def _unzip(chunks) -> zipfile.ZipFile:
+    return zipfile.ZipFile(io.BytesIO(b"".join(chunks)))
+
+
+def test_stream_zip_contents(recording, monkeypatch):
+    monkeypatch.setattr(export, "CHUNK_BYTES", 1024)
+    chunks = list(export.stream_zip([recording]))
+    zf = _unzip(chunks)
+
+    folder = "2026-03-02_Reunion-ventas-Q1_12345678"
+    assert sorted(zf.namelist()) == sorted([
+        f"{folder}/audio.mp3", f"{folder}/transcript.txt", f"{folder}/transcript.json",
+        f"{folder}/summary.md", "manifest.json",
+    ])
+    assert zf.read(f"{folder}/audio.mp3") == b"\xff\xfb" * 5000
+    assert zf.getinfo(f"{folder}/audio.mp3").compress_type == zipfile.ZIP_STORED
+    assert zf.getinfo(f"{folder}/transcript.txt").compress_type == zipfile.ZIP_DEFLATED
+    manifest = json.loads(zf.read("manifest.json"))
+    assert manifest["recordings"][0]["files"] == [
+        f"{folder}/audio.mp3", f"{folder}/transcript.txt", f"{folder}/transcript.json",
+        f"{folder}/summary.md"]
+    # Streamed in pieces, not built as one buffer
+    assert len(chunks) > 3
+
+
+def test_stream_zip_kinds_and_missing_files(recording, tmp_path):
+    (tmp_path / "summaries/a.md").unlink()
+    zf = _unzip(export.stream_zip([recording], kinds=("summary",)))
+
+    assert zf.namelist() == ["manifest.json"]
+    assert json.loads(zf.read("manifest.json"))["recordings"][0]["files"] == []
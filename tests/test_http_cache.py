@@ -0,0 +1,43 @@
+import pytest
+
+pytest.importorskip("fastapi")
+
+from starlette.requests import Request  # noqa: E402
+
+from server.http_cache import etag_for, http_date, not_modified  # noqa: E402
+
+MTIME = 1772445600.7
+
+
+def _request(**headers):
+    raw = [(k.replace("_", "-").encode(), v.encode()) for k, v in headers.items()]
+    return Request({"type": "http", "method": "GET", "path": "/", "headers": raw})
+
+
+def test_if_none_match_compares_weakly():
+    etag = etag_for(1, "done", MTIME)
+    strong = etag_for(1, "done", MTIME, weak=False)
+
+    assert not_modified(_request(if_none_match=etag), etag)
+    assert not_modified(_request(if_none_match=strong), etag)
+    assert not_modified(_request(if_none_match=f'"otro", {etag}'), etag)
+    assert not_modified(_request(if_none_match="*"), etag)
+    assert not not_modified(_request(if_none_match=etag_for(2)), etag)
+    assert not not_modified(_request(), etag, MTIME)
+
+
+def test_if_modified_since():
+    etag = etag_for(1)
+
+    assert not_modified(_request(if_modified_since=http_date(MTIME)), etag, MTIME)
+    assert not not_modified(_request(if_modified_since=http_date(MTIME - 1)), etag, MTIME)
+    assert not not_modified(_request(if_modified_since="ayer"), etag, MTIME)
+    # Without a known mtime the date alone proves nothing
+    assert not not_modified(_request(if_modified_since=http_date(MTIME)), etag)
+
+
+def test_if_none_match_takes_precedence():
+    etag = etag_for(1)
+    request = _request(if_none_match=etag_for(2), if_modified_since=http_date(MTIME))
+
+    assert not not_modified(request, etag, MTIME)
@@ -0,0 +1,62 @@
+import math
+import shutil
+import struct
+import subprocess
+import wave
+
+import pytest
+
+import config
+from db.database import Database
+from processing import pipeline
+
+pytestmark = pytest.mark.skipif(shutil.which("ffmpeg") is None or shutil.which("ffprobe") is None,
+                                reason="requiere ffmpeg y ffprobe en el PATH")
+
+
+@pytest.fixture
+def data_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(config, "BASE_DIR", tmp_path)
+    monkeypatch.setattr(config, "RECORDINGS_DIR", tmp_path / "recordings")
+    monkeypatch.setattr(config, "TIMELINES_DIR", tmp_path / "timelines")
+    monkeypatch.setattr(config, "PROFILE_JOBS", False)
+    config.RECORDINGS_DIR.mkdir()
+    return tmp_path
+
+
+def _write_tone(path, secs=2, rate=16000):
+    samples = [int(8000 * math.sin(2 * math.pi * 440 * i / rate)) for i in range(secs * rate)]
+    with wave.open(str(path), "wb") as wf:
+        wf.setnchannels(1)
+        wf.setsampwidth(2)
+        wf.setframerate(rate)
+        wf.writeframes(struct.pack(f"<{len(samples)}h", *samples))
+
+
+def test_import_mp3_saved_at_its_final_path(data_dir):
+    # The upload route saves an .mp3 as RECORDINGS_DIR/<id>.mp3, the conversion output
+    wav = data_dir / "tone.wav"
+    _write_tone(wav)
+    recording_id = "12345678-1234-1234-1234-123456789abc"
+    upload = config.RECORDINGS_DIR / f"{recording_id}.mp3"
+    subprocess.run(["ffmpeg", "-nostdin", "-v", "error", "-i", str(wav), str(upload)], check=True)
+
+    db = Database(data_dir / "test.db")
+    rec = pipeline.import_file(db, upload, "Importado - tono", recording_id=recording_id)
+
+    assert rec["status"] == "stopped"
+    assert rec["audio_path"] == f"recordings/{recording_id}.mp3"
+    assert upload.stat().st_size > 0
+    assert 1 <= rec["duration_secs"] <= 3
+    assert not list(config.RECORDINGS_DIR.glob(f"*{pipeline.IMPORT_TEMP_SUFFIX}"))
+
+
+def test_import_wav(data_dir):
+    wav = config.RECORDINGS_DIR / "upload.wav"
+    _write_tone(wav)
+
+    db = Database(data_dir / "test.db")
+    rec = pipeline.import_file(db, wav, "Importado - wav")
+
+    assert (config.BASE_DIR / rec["audio_path"]).stat().st_size > 0
+    assert wav.exists()
@@ -0,0 +1,67 @@
+import threading
+
+from processing import jobs
+from processing.jobs import PRIORITY_HIGH, PRIORITY_LOW, PRIORITY_NORMAL, JobQueue
+
+RECORDING_ID = "12345678-1234-4234-8234-123456789abc"
+
+
+def test_parse_job_name():
+    assert jobs.parse_job_name(f"transcribe:{RECORDING_ID}") == ("transcribe", RECORDING_ID)
+    assert jobs.parse_job_name("transcribe:grupo") is None
+    assert jobs.parse_job_name(f"watch:{RECORDING_ID}.mp3") is None
+    assert jobs.parse_job_name(RECORDING_ID) is None
+
+
+def test_is_recording_id():
+    assert jobs.is_recording_id(RECORDING_ID)
+    assert not jobs.is_recording_id(f"../{RECORDING_ID}")
+    assert not jobs.is_recording_id(f"{RECORDING_ID}/x")
+    assert not jobs.is_recording_id(RECORDING_ID.upper())
+
+
+def test_job_event_recording_id():
+    job = jobs.Job(1, f"summarize:{RECORDING_ID}", PRIORITY_NORMAL, print, (), {})
+    assert job.event() == {"job": job.name, "stage": "summarize", "recording_id": RECORDING_ID}
+    group = jobs.Job(2, "transcribe:grupo", PRIORITY_NORMAL, print, (), {})
+    assert group.event()["recording_id"] is None
+
+
+def test_queue_runs_by_priority_then_arrival():
+    queue = JobQueue(workers=1, name="test")
+    started, gate = threading.Event(), threading.Event()
+    order = []
+
+    def block():
+        started.set()
+        gate.wait()
+
+    try:
+        # Hold the only worker so the rest pile up in the heap
+        blocker = queue.submit(block)
+        assert started.wait(5)
+        for label, priority in [("low", PRIORITY_LOW), ("normal-1", PRIORITY_NORMAL),
+                                ("high", PRIORITY_HIGH), ("normal-2", PRIORITY_NORMAL)]:
+            queue.submit(order.append, label, priority=priority)
+        assert queue.pending() == 4
+        gate.set()
+        assert blocker.wait(5)
+        assert queue.wait_idle(timeout=5)
+    finally:
+        gate.set()
+        queue.shutdown()
+
+    assert order == ["high", "normal-1", "normal-2", "low"]
+
+
+def test_failed_job_keeps_the_worker():
+    queue = JobQueue(workers=1, name="test")
+    try:
+        failed = queue.submit(lambda: 1 / 0)
+        ok = queue.submit(lambda: "ok")
+        assert ok.wait(5)
+    finally:
+        queue.shutdown()
+
+    assert isinstance(failed.error, ZeroDivisionError)
+    assert ok.result == "ok"
@@ -0,0 +1,74 @@
+import threading
+import time
+
+import pytest
+
+from processing.llm_router import ProviderRouter
+
+
+def _failing(calls):
+    def fn(system, prompt, ctx):
+        calls.append("a")
+        raise RuntimeError("503")
+    return fn
+
+
+def _ok(text):
+    def fn(system, prompt, ctx):
+        ctx.token()
+        return text
+    return fn
+
+
+def test_circuit_opens_and_half_opens():
+    calls = []
+    router = ProviderRouter([("a", _failing(calls)), ("b", _ok("respuesta"))],
+                            failure_threshold=2, cooldown_secs=60)
+
+    assert router.call("sys", "p") == "respuesta"
+    assert router.call("sys", "p") == "respuesta"
+    assert router.health["a"].state() == "open"
+
+    # Open circuit: the failing provider is skipped
+    assert router.call("sys", "p") == "respuesta"
+    assert calls == ["a", "a"]
+
+    # Cooldown over: one trial call, which fails and reopens the circuit
+    router.health["a"].open_until = time.monotonic() - 1
+    assert router.health["a"].state() == "half-open"
+    assert router.call("sys", "p") == "respuesta"
+    assert calls == ["a", "a", "a"]
+    assert router.health["a"].state() == "open"
+    assert router.stats()["providers"]["a"]["failures"] == 3
+
+
+def test_all_providers_failing_raises_last_error():
+    router = ProviderRouter([("a", _failing([]))], failure_threshold=1)
+
+    with pytest.raises(RuntimeError, match="503"):
+        router.call("sys", "p")
+    # Every circuit open: the call is still attempted instead of failing outright
+    with pytest.raises(RuntimeError):
+        router.call("sys", "p")
+
+
+def test_hedge_wins_and_cancels_primary():
+    finished = threading.Event()
+
+    def slow(system, prompt, ctx):
+        try:
+            while True:
+                ctx.token()
+                time.sleep(0.01)
+        finally:
+            finished.set()
+
+    router = ProviderRouter([("a", slow), ("b", _ok("rapida"))], hedge_after_secs=0.05)
+
+    assert router.call("sys", "p") == "rapida"
+    assert finished.wait(2)
+    stats = router.stats()
+    assert stats["hedged"] == 1 and stats["hedges_won"] == 1
+    assert stats["providers"]["b"]["calls"] == 1
+    # Losing the race is not a failure of the provider
+    assert stats["providers"]["a"]["failures"] == 0
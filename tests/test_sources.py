@@ -0,0 +1,36 @@
+import pytest
+
+from recorder.sources import default_sources, sources_from_dicts
+
+
+def test_sources_from_dicts():
+    sources = sources_from_dicts([
+        {"name": "loopback", "kind": "loopback", "device": 3},
+        {"name": "headset", "kind": "input", "channel": "LR", "gain": 0.5},
+    ])
+
+    assert [s.name for s in sources] == ["loopback", "headset"]
+    assert sources[0].device_index == 3 and sources[0].channel == "L"
+    assert sources[1].channel == "LR" and sources[1].gain == 0.5
+
+
+@pytest.mark.parametrize("data", [
+    [],
+    [{"name": "mic", "kind": "input"}, {"name": "mic", "kind": "loopback"}],
+    [{"kind": "input"}],
+    [{"name": "mic", "kind": "speaker"}],
+    [{"name": "mic", "kind": "input", "channel": "C"}],
+    [{"name": "mic", "kind": "input", "device": "3"}],
+    [{"name": "mic", "kind": "input", "device": True}],
+    [{"name": "mic", "kind": "input", "gain": "alto"}],
+    [{"name": "../mic", "kind": "input"}],
+    [{"name": "stereo", "kind": "input"}],
+])
+def test_sources_from_dicts_rejects_invalid(data):
+    with pytest.raises(ValueError):
+        sources_from_dicts(data)
+
+
+def test_default_sources_rejects_duplicate_extra():
+    with pytest.raises(ValueError):
+        default_sources(extra=[{"name": "mic", "kind": "input"}])
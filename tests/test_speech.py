@@ -0,0 +1,41 @@
+import numpy as np
+
+from processing import speech
+
+
+def test_merge_joins_close_regions():
+    regions = [[5.0, 6.0], [0.0, 1.0], [1.3, 2.0], [2.6, 3.0]]
+
+    assert speech.merge(regions) == [[0.0, 2.0], [2.6, 3.0], [5.0, 6.0]]
+
+
+def test_collect_and_restore_round_trip():
+    rate = 10
+    audio = np.arange(100, dtype=np.float32)
+    clipped, offsets = speech.collect(audio, [[1.0, 2.0], [5.0, 6.5]], rate)
+
+    assert len(clipped) == 25
+    assert offsets == [(0.0, 1.0), (1.0, 5.0)]
+    # 1.2 s into the clipped audio is 0.2 s into the second region
+    assert speech.restore(1.2, offsets) == 5.2
+    assert speech.restore(0.5, offsets) == 1.5
+
+
+def test_split_at_pauses_cuts_at_longest_late_pause():
+    speech_map = {"speech": [[0, 10], [12, 40], [41, 62], [70, 90], [91, 130], [131, 150]]}
+    ranges = speech.split_at_pauses(speech_map, max_secs=100)
+
+    # Within the first 100 s the last-third candidates end at 90 (pause of 1 s)
+    # and 62 is too early, so the first cut is after 90
+    assert ranges == [(0, 90), (91, 150)]
+    assert all(end - start <= 100 for start, end in ranges)
+
+
+def test_split_at_pauses_prefers_longer_pause_in_last_third():
+    speech_map = {"speech": [[0, 68], [80, 90], [91, 99], [100, 120]]}
+
+    assert speech.split_at_pauses(speech_map, max_secs=100) == [(0, 68), (80, 120)]
+
+
+def test_split_at_pauses_without_speech():
+    assert speech.split_at_pauses({"speech": []}, max_secs=60) == []
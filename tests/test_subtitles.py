@@ -0,0 +1,27 @@
+from processing import subtitles
+
+SEGMENTS = [
+    {"start": 0.0, "end": 2.5, "text": "Buenos dias."},
+    {"start": 3661.2, "end": 3662.9996, "text": "Hasta luego."},
+]
+
+
+def test_to_srt():
+    assert subtitles.to_srt(SEGMENTS) == (
+        "1\n00:00:00,000 --> 00:00:02,500\nBuenos dias.\n\n"
+        "2\n01:01:01,200 --> 01:01:03,000\nHasta luego.\n\n"
+    )
+
+
+def test_to_vtt():
+    assert subtitles.to_vtt(SEGMENTS) == (
+        "WEBVTT\n\n"
+        "00:00:00.000 --> 00:00:02.500\nBuenos dias.\n\n"
+        "01:01:01.200 --> 01:01:03.000\nHasta luego.\n\n"
+    )
+
+
+def test_cues_match_whole_file():
+    srt = "".join(subtitles.srt_cue(i, seg) for i, seg in enumerate(SEGMENTS, start=1))
+    assert srt == subtitles.to_srt(SEGMENTS)
+    assert subtitles.to_vtt([]) == subtitles.VTT_HEADER